@@ -24,7 +24,7 @@ if config.config_file_name is not None:
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from models import job, worker, business_owner, job_application, user
+from models import job, worker, business_owner, job_application, user, notification, outbox, notification_archive
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
@@ -0,0 +1,72 @@
+"""add h3 parent cells to job and worker
+
+Revision ID: 5d1e7a9c3f20
+Revises: a3c9f1d2b7e4
+Create Date: 2026-10-17 23:05:41.902117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import h3
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1e7a9c3f20'
+down_revision: Union[str, Sequence[str], None] = 'a3c9f1d2b7e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARENT_RESOLUTIONS = (4, 5, 6, 7)
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_parent_cells(table_name: str) -> None:
+    """Derive h3_cell_r<N> from the existing h3_cell in primary-key order, one batch at a time."""
+    conn = op.get_bind()
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer),
+        sa.column('h3_cell', sa.String),
+        *[sa.column(f'h3_cell_r{res}', sa.String) for res in PARENT_RESOLUTIONS],
+    )
+    update = table.update().where(table.c.id == sa.bindparam('row_id')).values(
+        {f'h3_cell_r{res}': sa.bindparam(f'r{res}') for res in PARENT_RESOLUTIONS}
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(table.c.id, table.c.h3_cell)
+            .where(table.c.id > last_id, table.c.h3_cell.isnot(None))
+            .order_by(table.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            values = {'row_id': row.id}
+            for res in PARENT_RESOLUTIONS:
+                values[f'r{res}'] = h3.cell_to_parent(row.h3_cell, res)
+            params.append(values)
+        conn.execute(update, params)
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name in ('jobs', 'workers'):
+        for res in PARENT_RESOLUTIONS:
+            op.add_column(table_name, sa.Column(f'h3_cell_r{res}', sa.String(length=16), nullable=True))
+        backfill_parent_cells(table_name)
+        for res in PARENT_RESOLUTIONS:
+            op.create_index(op.f(f'ix_{table_name}_h3_cell_r{res}'), table_name, [f'h3_cell_r{res}'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in ('workers', 'jobs'):
+        for res in reversed(PARENT_RESOLUTIONS):
+            op.drop_index(op.f(f'ix_{table_name}_h3_cell_r{res}'), table_name=table_name)
+            op.drop_column(table_name, f'h3_cell_r{res}')
@@ -0,0 +1,67 @@
+"""add h3_cell to job and worker
+
+Revision ID: a3c9f1d2b7e4
+Revises: 0ea10184559f
+Create Date: 2026-10-17 22:40:12.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import h3
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9f1d2b7e4'
+down_revision: Union[str, Sequence[str], None] = '0ea10184559f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+H3_RESOLUTION = 8
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_h3_cells(table_name: str) -> None:
+    """Compute h3_cell for existing rows in primary-key order, one batch at a time."""
+    conn = op.get_bind()
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer),
+        sa.column('latitude', sa.Float),
+        sa.column('longitude', sa.Float),
+        sa.column('h3_cell', sa.String),
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(table.c.id, table.c.latitude, table.c.longitude)
+            .where(table.c.id > last_id, table.c.latitude.isnot(None), table.c.longitude.isnot(None))
+            .order_by(table.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            table.update().where(table.c.id == sa.bindparam('row_id')).values(h3_cell=sa.bindparam('cell')),
+            [{'row_id': row.id, 'cell': h3.latlng_to_cell(row.latitude, row.longitude, H3_RESOLUTION)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('h3_cell', sa.String(length=16), nullable=True))
+    op.add_column('workers', sa.Column('h3_cell', sa.String(length=16), nullable=True))
+    backfill_h3_cells('jobs')
+    backfill_h3_cells('workers')
+    op.create_index(op.f('ix_jobs_h3_cell'), 'jobs', ['h3_cell'], unique=False)
+    op.create_index(op.f('ix_workers_h3_cell'), 'workers', ['h3_cell'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_workers_h3_cell'), table_name='workers')
+    op.drop_index(op.f('ix_jobs_h3_cell'), table_name='jobs')
+    op.drop_column('workers', 'h3_cell')
+    op.drop_column('jobs', 'h3_cell')
@@ -0,0 +1,30 @@
+"""add worker presence and ack columns
+
+Revision ID: a6f4c2e8d0b7
+Revises: d5c7e9f1a3b4
+Create Date: 2026-10-18 04:22:40.372915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6f4c2e8d0b7'
+down_revision: Union[str, Sequence[str], None] = 'd5c7e9f1a3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workers', sa.Column('last_acked_notification_id', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('workers', sa.Column('presence_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workers', 'presence_expires_at')
+    op.drop_column('workers', 'last_acked_notification_id')
@@ -0,0 +1,97 @@
+"""compact notification storage with type codes
+
+Revision ID: b8d1f3a7e5c2
+Revises: f2b6d8a4c9e3
+Create Date: 2026-10-18 02:58:14.661027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d1f3a7e5c2'
+down_revision: Union[str, Sequence[str], None] = 'f2b6d8a4c9e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Mirrors core.notification_templates; migrations must not import application code
+NOTIFICATION_CUSTOM = 0
+NOTIFICATION_NEW_JOB_NEARBY = 1
+NEW_JOB_NEARBY_PREFIX = 'New job nearby: '
+BACKFILL_BATCH_SIZE = 1000
+
+notifications = sa.table(
+    'notifications',
+    sa.column('id', sa.Integer),
+    sa.column('job_id', sa.Integer),
+    sa.column('type_code', sa.SmallInteger),
+    sa.column('message', sa.Text),
+)
+jobs = sa.table('jobs', sa.column('id', sa.Integer), sa.column('title', sa.String))
+
+
+def backfill_type_codes() -> None:
+    """Turn stored "New job nearby: <title>" texts into type codes, in primary-key order, one batch at a time."""
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(notifications.c.id, notifications.c.message, jobs.c.title)
+            .select_from(notifications.join(jobs, jobs.c.id == notifications.c.job_id))
+            .where(notifications.c.id > last_id)
+            .order_by(notifications.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        templated = [{'row_id': row.id} for row in rows if row.message == NEW_JOB_NEARBY_PREFIX + (row.title or '')]
+        if templated:
+            conn.execute(
+                notifications.update()
+                .where(notifications.c.id == sa.bindparam('row_id'))
+                .values(type_code=NOTIFICATION_NEW_JOB_NEARBY, message=None),
+                templated,
+            )
+        last_id = rows[-1].id
+
+
+def restore_messages() -> None:
+    """Render templated rows back into message text before the column becomes NOT NULL again."""
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(notifications.c.id, jobs.c.title)
+            .select_from(notifications.join(jobs, jobs.c.id == notifications.c.job_id))
+            .where(notifications.c.id > last_id, notifications.c.type_code == NOTIFICATION_NEW_JOB_NEARBY)
+            .order_by(notifications.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            notifications.update().where(notifications.c.id == sa.bindparam('row_id')).values(message=sa.bindparam('text')),
+            [{'row_id': row.id, 'text': NEW_JOB_NEARBY_PREFIX + (row.title or '')} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notifications', sa.Column('type_code', sa.SmallInteger(), nullable=False, server_default=str(NOTIFICATION_CUSTOM)))
+    op.add_column('notifications', sa.Column('params', sa.Text(), nullable=True))
+    with op.batch_alter_table('notifications') as batch_op:
+        batch_op.alter_column('message', existing_type=sa.String(), type_=sa.Text(), nullable=True)
+    backfill_type_codes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    restore_messages()
+    with op.batch_alter_table('notifications') as batch_op:
+        batch_op.alter_column('message', existing_type=sa.Text(), type_=sa.String(), nullable=False)
+    op.drop_column('notifications', 'params')
+    op.drop_column('notifications', 'type_code')
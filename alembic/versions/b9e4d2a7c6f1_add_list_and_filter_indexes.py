@@ -0,0 +1,54 @@
+"""add list and filter indexes for jobs and applications
+
+Revision ID: b9e4d2a7c6f1
+Revises: f8b2d6a0c4e7
+Create Date: 2026-10-18 14:52:18.406213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e4d2a7c6f1'
+down_revision: Union[str, Sequence[str], None] = 'f8b2d6a0c4e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Every list filter and keyset sort gets a (column, id) index, so a page is a range scan in
+# (column, id) order. notifications.worker_id and workers.user_id are already covered by
+# ix_notifications_worker_id_id and the unique constraint on user_id.
+INDEXES = [
+    ('ix_jobs_business_owner_id_id', 'jobs', ['business_owner_id', 'id']),
+    ('ix_jobs_status_id', 'jobs', ['status', 'id']),
+    ('ix_jobs_city_id', 'jobs', ['city', 'id']),
+    ('ix_jobs_posted_date_id', 'jobs', ['posted_date', 'id']),
+    ('ix_jobs_start_date_id', 'jobs', ['start_date', 'id']),
+    ('ix_jobs_hourly_rate_id', 'jobs', ['hourly_rate', 'id']),
+    ('ix_job_applications_worker_id_id', 'job_applications', ['worker_id', 'id']),
+    ('ix_job_applications_status_id', 'job_applications', ['status', 'id']),
+    ('ix_job_applications_applied_date_id', 'job_applications', ['applied_date', 'id']),
+]
+# MySQL drops the index it created for a foreign key once a new index covers it, so the
+# foreign key needs a plain index again before the covering one can be dropped
+FOREIGN_KEY_INDEXES = {
+    'ix_jobs_business_owner_id_id': ('ix_jobs_business_owner_id', ['business_owner_id']),
+    'ix_job_applications_worker_id_id': ('ix_job_applications_worker_id', ['worker_id']),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, columns in reversed(INDEXES):
+        if name in FOREIGN_KEY_INDEXES:
+            fk_index, fk_columns = FOREIGN_KEY_INDEXES[name]
+            op.create_index(fk_index, table, fk_columns, unique=False)
+        op.drop_index(name, table_name=table)
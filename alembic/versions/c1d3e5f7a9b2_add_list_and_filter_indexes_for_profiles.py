@@ -0,0 +1,46 @@
+"""add list and filter indexes for workers, business owners and users
+
+Revision ID: c1d3e5f7a9b2
+Revises: b9e4d2a7c6f1
+Create Date: 2026-10-18 16:27:43.918402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1d3e5f7a9b2'
+down_revision: Union[str, Sequence[str], None] = 'b9e4d2a7c6f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The (column, id) indexes of b9e4d2a7c6f1 for the worker, business owner and user lists.
+# None of these columns is a foreign key, so they drop without the MySQL workaround there.
+INDEXES = [
+    ('ix_workers_name_id', 'workers', ['name', 'id']),
+    ('ix_workers_years_of_experience_id', 'workers', ['years_of_experience', 'id']),
+    ('ix_workers_city_id', 'workers', ['city', 'id']),
+    ('ix_workers_state_id', 'workers', ['state', 'id']),
+    ('ix_business_owners_business_name_id', 'business_owners', ['business_name', 'id']),
+    ('ix_business_owners_year_established_id', 'business_owners', ['year_established', 'id']),
+    ('ix_business_owners_city_id', 'business_owners', ['city', 'id']),
+    ('ix_business_owners_state_id', 'business_owners', ['state', 'id']),
+    ('ix_business_owners_industry_id', 'business_owners', ['industry', 'id']),
+    ('ix_users_username_id', 'users', ['username', 'id']),
+    ('ix_users_role_id', 'users', ['role', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
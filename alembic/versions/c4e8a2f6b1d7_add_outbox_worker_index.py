@@ -0,0 +1,28 @@
+"""add outbox worker index for fcm coalescing
+
+Revision ID: c4e8a2f6b1d7
+Revises: 8b2f4c6d1e93
+Create Date: 2026-10-18 01:03:41.218850
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2f6b1d7'
+down_revision: Union[str, Sequence[str], None] = '8b2f4c6d1e93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_notification_outbox_worker', 'notification_outbox', ['worker_id', 'channel', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notification_outbox_worker', table_name='notification_outbox')
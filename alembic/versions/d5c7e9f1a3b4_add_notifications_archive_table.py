@@ -0,0 +1,42 @@
+"""add notifications archive table
+
+Revision ID: d5c7e9f1a3b4
+Revises: b8d1f3a7e5c2
+Create Date: 2026-10-18 03:36:25.118492
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5c7e9f1a3b4'
+down_revision: Union[str, Sequence[str], None] = 'b8d1f3a7e5c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'notifications_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('worker_id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('type_code', sa.SmallInteger(), nullable=False),
+        sa.Column('params', sa.Text(), nullable=True),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('is_read', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_notifications_archive_worker_id_id', 'notifications_archive', ['worker_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_archive_worker_id_id', table_name='notifications_archive')
+    op.drop_table('notifications_archive')
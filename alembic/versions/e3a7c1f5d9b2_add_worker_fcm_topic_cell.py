@@ -0,0 +1,29 @@
+"""add worker fcm_topic_cell
+
+Revision ID: e3a7c1f5d9b2
+Revises: a6f4c2e8d0b7
+Create Date: 2026-10-18 09:41:12.508316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a7c1f5d9b2'
+down_revision: Union[str, Sequence[str], None] = 'a6f4c2e8d0b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL everywhere: the first topic reconcile subscribes every worker with a token
+    op.add_column('workers', sa.Column('fcm_topic_cell', sa.String(length=16), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workers', 'fcm_topic_cell')
@@ -0,0 +1,30 @@
+"""add notification inbox indexes
+
+Revision ID: e7a3b9d2c5f1
+Revises: c4e8a2f6b1d7
+Create Date: 2026-10-18 01:41:09.537120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3b9d2c5f1'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a2f6b1d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_notifications_worker_id_id', 'notifications', ['worker_id', 'id'], unique=False)
+    op.create_index('ix_notifications_worker_unread', 'notifications', ['worker_id', 'is_read'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_worker_unread', table_name='notifications')
+    op.drop_index('ix_notifications_worker_id_id', table_name='notifications')
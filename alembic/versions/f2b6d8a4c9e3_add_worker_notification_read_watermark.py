@@ -0,0 +1,28 @@
+"""add worker notification read watermark
+
+Revision ID: f2b6d8a4c9e3
+Revises: e7a3b9d2c5f1
+Create Date: 2026-10-18 02:17:52.904416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d8a4c9e3'
+down_revision: Union[str, Sequence[str], None] = 'e7a3b9d2c5f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workers', sa.Column('last_read_notification_id', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workers', 'last_read_notification_id')
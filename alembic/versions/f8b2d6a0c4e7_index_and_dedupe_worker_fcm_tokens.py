@@ -0,0 +1,55 @@
+"""index and de-duplicate worker fcm tokens
+
+Revision ID: f8b2d6a0c4e7
+Revises: e3a7c1f5d9b2
+Create Date: 2026-10-18 11:06:37.214598
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8b2d6a0c4e7'
+down_revision: Union[str, Sequence[str], None] = 'e3a7c1f5d9b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+workers = sa.table(
+    'workers',
+    sa.column('id', sa.Integer),
+    sa.column('fcm_token', sa.String),
+    sa.column('fcm_topic_cell', sa.String),
+)
+
+
+def clear_duplicate_tokens() -> None:
+    """Keep each token only on the newest worker row holding it; older rows are stale installs."""
+    conn = op.get_bind()
+    duplicated = conn.execute(
+        sa.select(workers.c.fcm_token, sa.func.max(workers.c.id).label('keep_id'))
+        .where(workers.c.fcm_token.isnot(None))
+        .group_by(workers.c.fcm_token)
+        .having(sa.func.count() > 1)
+    ).all()
+    for token, keep_id in duplicated:
+        conn.execute(
+            workers.update()
+            .where(workers.c.fcm_token == token, workers.c.id != keep_id)
+            .values(fcm_token=None, fcm_topic_cell=None)
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Token lookups: dead-token pruning and clearing a token from other workers on registration
+    op.create_index(op.f('ix_workers_fcm_token'), 'workers', ['fcm_token'], unique=False)
+    clear_duplicate_tokens()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Cleared duplicate tokens are not restored
+    op.drop_index(op.f('ix_workers_fcm_token'), table_name='workers')
@@ -1,96 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from schemas.job_application_schemas import JobApplicationCreate, JobApplicationResponse, JobApplicationUpdate
-from core.database import get_db
+from schemas.pagination_schemas import Page
+from core.database import get_async_db, get_async_read_db
+from core.db_routing import declare_sticky_keys
+from core.pagination import Keyset, LIST_LIMIT_DEFAULT, LIST_LIMIT_MAX
 from models.job_application import JobApplication
 from models.job import Job
 from models.worker import Worker
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/applications", tags=["applications"])
 
+APPLICATION_SORTS = {"id": JobApplication.id, "applied_date": JobApplication.applied_date}
+SORT_DESCRIPTION = f"One of {', '.join(APPLICATION_SORTS)}; prefix - for descending"
+
 @router.post("/", response_model=JobApplicationResponse)
-def apply_for_job(application: JobApplicationCreate, db: Session = Depends(get_db)):
+async def apply_for_job(application: JobApplicationCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
     # Check if job exists
-    job = db.query(Job).filter(Job.id == application.job_id).first()
+    job = await db.get(Job, application.job_id)
     if not job:
         raise HTTPException(status_code=400, detail=f"Job with id {application.job_id} not found")
     
     # Check if worker exists
-    worker = db.query(Worker).filter(Worker.id == application.worker_id).first()
+    worker = await db.get(Worker, application.worker_id)
     if not worker:
         raise HTTPException(status_code=400, detail=f"Worker with id {application.worker_id} not found")
     
     # Check if application already exists
-    existing_app = db.query(JobApplication).filter(
+    existing_app = await db.scalar(select(JobApplication.id).where(
         JobApplication.job_id == application.job_id,
         JobApplication.worker_id == application.worker_id
-    ).first()
+    ).limit(1))
     if existing_app:
         raise HTTPException(status_code=400, detail=f"Worker {application.worker_id} has already applied for job {application.job_id}")
     
     try:
         db_app = JobApplication(**application.dict())
         db.add(db_app)
-        db.commit()
-        db.refresh(db_app)
+        await db.commit()
+        await db.refresh(db_app)
+        declare_sticky_keys(request, worker_id=db_app.worker_id, job_id=db_app.job_id, application_id=db_app.id)
         return db_app
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Invalid data provided")
 
-@router.get("/", response_model=list[JobApplicationResponse])
-def get_all_applications(db: Session = Depends(get_db)):
-    return db.query(JobApplication).all()
+async def _application_page(db: AsyncSession, query, status, sort, limit, cursor):
+    keyset = Keyset(APPLICATION_SORTS, sort, cursor, JobApplication.id)
+    if status is not None:
+        query = query.where(JobApplication.status == status)
+    applications = (await db.scalars(keyset.apply(query, limit))).all()
+    return keyset.page(applications, limit)
+
+@router.get("/", response_model=Page[JobApplicationResponse])
+async def get_all_applications(
+    status: Optional[str] = Query(None, max_length=20),
+    sort: str = Query("-id", description=SORT_DESCRIPTION),
+    limit: int = Query(LIST_LIMIT_DEFAULT, ge=1, le=LIST_LIMIT_MAX),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await _application_page(db, select(JobApplication), status, sort, limit, cursor)
 
-@router.get("/job/{job_id}", response_model=list[JobApplicationResponse])
-def get_applications_by_job(job_id: int, db: Session = Depends(get_db)):
-    applications = db.query(JobApplication).filter(JobApplication.job_id == job_id).all()
-    return applications
+@router.get("/job/{job_id}", response_model=Page[JobApplicationResponse])
+async def get_applications_by_job(
+    job_id: int,
+    status: Optional[str] = Query(None, max_length=20),
+    sort: str = Query("-id", description=SORT_DESCRIPTION),
+    limit: int = Query(LIST_LIMIT_DEFAULT, ge=1, le=LIST_LIMIT_MAX),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    query = select(JobApplication).where(JobApplication.job_id == job_id)
+    return await _application_page(db, query, status, sort, limit, cursor)
 
-@router.get("/worker/{worker_id}", response_model=list[JobApplicationResponse])
-def get_applications_by_worker(worker_id: int, db: Session = Depends(get_db)):
-    applications = db.query(JobApplication).filter(JobApplication.worker_id == worker_id).all()
-    return applications
+@router.get("/worker/{worker_id}", response_model=Page[JobApplicationResponse])
+async def get_applications_by_worker(
+    worker_id: int,
+    status: Optional[str] = Query(None, max_length=20),
+    sort: str = Query("-id", description=SORT_DESCRIPTION),
+    limit: int = Query(LIST_LIMIT_DEFAULT, ge=1, le=LIST_LIMIT_MAX),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    query = select(JobApplication).where(JobApplication.worker_id == worker_id)
+    return await _application_page(db, query, status, sort, limit, cursor)
 
 @router.get("/{application_id}", response_model=JobApplicationResponse)
-def get_application(application_id: int, db: Session = Depends(get_db)):
-    app = db.query(JobApplication).filter(JobApplication.id == application_id).first()
+async def get_application(application_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    app = await db.get(JobApplication, application_id)
     if not app:
         raise HTTPException(status_code=404, detail="Application not found")
     return app
 
 @router.put("/{application_id}", response_model=JobApplicationResponse)
-def update_application(application_id: int, application_update: JobApplicationUpdate, db: Session = Depends(get_db)):
-    app = db.query(JobApplication).filter(JobApplication.id == application_id).first()
+async def update_application(application_id: int, application_update: JobApplicationUpdate, request: Request,
+                             db: AsyncSession = Depends(get_async_db)):
+    app = await db.get(JobApplication, application_id)
     if not app:
         raise HTTPException(status_code=404, detail="Application not found")
     
     try:
         for key, value in application_update.dict(exclude_unset=True).items():
             setattr(app, key, value)
-        db.commit()
-        db.refresh(app)
+        await db.commit()
+        await db.refresh(app)
+        declare_sticky_keys(request, worker_id=app.worker_id, job_id=app.job_id)
         return app
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Invalid data provided")
 
 @router.delete("/{application_id}")
-def delete_application(application_id: int, db: Session = Depends(get_db)):
+async def delete_application(application_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Delete a job application"""
-    app = db.query(JobApplication).filter(JobApplication.id == application_id).first()
+    app = await db.get(JobApplication, application_id)
     if not app:
         raise HTTPException(status_code=404, detail="Application not found")
     
     # Store application details before deletion for response
     job_id = app.job_id
     worker_id = app.worker_id
+    declare_sticky_keys(request, worker_id=worker_id, job_id=job_id)
     
     # Delete application
-    db.delete(app)
-    db.commit()
+    await db.delete(app)
+    await db.commit()
     
     return {
         "success": True,
@@ -1,18 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from schemas.business_owner_schemas import BusinessOwnerCreate, BusinessOwnerUpdate, BusinessOwnerResponse
-from core.database import get_db
+from schemas.pagination_schemas import Page
+from core.database import get_db, get_read_db
+from core.db_routing import declare_sticky_keys
+from core.pagination import Keyset, LIST_LIMIT_DEFAULT, LIST_LIMIT_MAX
 from models.business_owner import BusinessOwner
 from models.user import User
 from models.job import Job
 from models.job_application import JobApplication
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/business-owners", tags=["business_owners"])
 
+# Every sort and filter has a (column, id) index on BusinessOwner; add one before whitelisting a column
+BUSINESS_OWNER_SORTS = {"id": BusinessOwner.id, "business_name": BusinessOwner.business_name,
+                        "year_established": BusinessOwner.year_established}
+
 @router.post("/", response_model=BusinessOwnerResponse)
-def create_business_owner(owner: BusinessOwnerCreate, db: Session = Depends(get_db)):
+def create_business_owner(owner: BusinessOwnerCreate, request: Request, db: Session = Depends(get_db)):
     # Check if user exists
     user = db.query(User).filter(User.id == owner.user_id).first()
     if not user:
@@ -28,21 +36,38 @@ def create_business_owner(owner: BusinessOwnerCreate, db: Session = Depends(get_
         db.add(db_owner)
         db.commit()
         db.refresh(db_owner)
+        declare_sticky_keys(request, business_owner_id=db_owner.id, user_id=db_owner.user_id)
         return db_owner
     except IntegrityError as e:
         db.rollback()
         raise HTTPException(status_code=400, detail="Invalid data provided")
 
 @router.get("/{owner_id}", response_model=BusinessOwnerResponse)
-def get_business_owner(owner_id: int, db: Session = Depends(get_db)):
+def get_business_owner(owner_id: int, db: Session = Depends(get_read_db)):
     owner = db.query(BusinessOwner).filter(BusinessOwner.id == owner_id).first()
     if not owner:
         raise HTTPException(status_code=404, detail="Business owner not found")
     return owner
 
-@router.get("/", response_model=list[BusinessOwnerResponse])
-def get_all_business_owners(db: Session = Depends(get_db)):
-    return db.query(BusinessOwner).all()
+@router.get("/", response_model=Page[BusinessOwnerResponse])
+def get_all_business_owners(
+    city: Optional[str] = Query(None, max_length=50),
+    state: Optional[str] = Query(None, max_length=50),
+    industry: Optional[str] = Query(None, max_length=50),
+    sort: str = Query("id", description=f"One of {', '.join(BUSINESS_OWNER_SORTS)}; prefix - for descending"),
+    limit: int = Query(LIST_LIMIT_DEFAULT, ge=1, le=LIST_LIMIT_MAX),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_read_db)
+):
+    keyset = Keyset(BUSINESS_OWNER_SORTS, sort, cursor, BusinessOwner.id)
+    query = db.query(BusinessOwner)
+    if city is not None:
+        query = query.filter(BusinessOwner.city == city)
+    if state is not None:
+        query = query.filter(BusinessOwner.state == state)
+    if industry is not None:
+        query = query.filter(BusinessOwner.industry == industry)
+    return keyset.page(keyset.apply(query, limit).all(), limit)
 
 @router.put("/{owner_id}", response_model=BusinessOwnerResponse)
 def update_business_owner(owner_id: int, owner_update: BusinessOwnerUpdate, db: Session = Depends(get_db)):
@@ -1,149 +1,202 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Body
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from schemas.job_schemas import JobCreate, JobResponse, JobUpdate
-from core.database import get_db
+from schemas.job_schemas import JobCreate, JobResponse, JobUpdate, NearbyJobsPage
+from schemas.pagination_schemas import Page
+from core.database import get_async_db, get_async_read_db
+from core.db_routing import declare_sticky_keys
+from core.geo import region_cover, h3_column, haversine_km
+from core.pagination import encode_cursor, decode_cursor, Keyset, LIST_LIMIT_DEFAULT, LIST_LIMIT_MAX
+from core.fanout import fan_out_new_job
+from core.outbox import outbox_relay
+from core.notification_templates import job_titles
 from models.job import Job
 from models.business_owner import BusinessOwner
 from models.job_application import JobApplication
 from datetime import datetime
-import h3
-from sqlalchemy import and_
-from models.worker import Worker
-from models.notification import Notification
-from schemas.notification_schemas import NotificationCreate
-import asyncio
-from api.notification_ws import send_notification_to_worker
-from core.fcm import send_fcm_notification
+from typing import Optional
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
+# Not hourly_rate: it is a single-precision FLOAT on MySQL, so a cursor's value never compares
+# equal to the stored one and a page of tied rates would repeat forever. It is only a filter.
+JOB_SORTS = {"id": Job.id, "posted_date": Job.posted_date, "start_date": Job.start_date}
+
+class JobFilters:
+    """Filters accepted by the job list endpoints"""
+
+    def __init__(
+        self,
+        status: Optional[str] = Query(None, max_length=20, description="Only jobs with this status, e.g. open"),
+        city: Optional[str] = Query(None, max_length=50),
+        min_hourly_rate: Optional[float] = Query(None, ge=0),
+        max_hourly_rate: Optional[float] = Query(None, ge=0),
+        posted_after: Optional[datetime] = Query(None),
+        posted_before: Optional[datetime] = Query(None),
+    ):
+        self.status = status
+        self.city = city
+        self.min_hourly_rate = min_hourly_rate
+        self.max_hourly_rate = max_hourly_rate
+        self.posted_after = posted_after
+        self.posted_before = posted_before
+
+    def apply(self, query):
+        if self.status is not None:
+            query = query.where(Job.status == self.status)
+        if self.city is not None:
+            query = query.where(Job.city == self.city)
+        if self.min_hourly_rate is not None:
+            query = query.where(Job.hourly_rate >= self.min_hourly_rate)
+        if self.max_hourly_rate is not None:
+            query = query.where(Job.hourly_rate <= self.max_hourly_rate)
+        if self.posted_after is not None:
+            query = query.where(Job.posted_date >= self.posted_after)
+        if self.posted_before is not None:
+            query = query.where(Job.posted_date < self.posted_before)
+        return query
+
 @router.post("/", response_model=JobResponse)
-def create_job(job: JobCreate, db: Session = Depends(get_db), background_tasks: BackgroundTasks = None):
+async def create_job(job: JobCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
     # Check if business owner exists
-    business_owner = db.query(BusinessOwner).filter(BusinessOwner.id == job.business_owner_id).first()
+    business_owner = await db.get(BusinessOwner, job.business_owner_id)
     if not business_owner:
         raise HTTPException(status_code=400, detail=f"Business owner with id {job.business_owner_id} not found")
     
     try:
         db_job = Job(**job.dict())
         db.add(db_job)
-        db.commit()
-        db.refresh(db_job)
+        await db.flush()
 
         # --- H3 Geospatial Notification Logic ---
-        if db_job.latitude is not None and db_job.longitude is not None:
-            h3_resolution = 8  # Reasonable for city/neighborhood
-            job_h3 = h3.latlng_to_cell(db_job.latitude, db_job.longitude, h3_resolution)
-            workers = db.query(Worker).filter(and_(Worker.latitude != None, Worker.longitude != None)).all()
-            neighbor_cells = set(h3.grid_disk(job_h3, 1))
-            notify_worker_ids = []
-            for worker in workers:
-                worker_h3 = h3.latlng_to_cell(worker.latitude, worker.longitude, h3_resolution)
-                if worker_h3 in neighbor_cells:
-                    notify_worker_ids.append(worker.id)
-                    # Create notification for this worker
-                    notification = Notification(
-                        worker_id=worker.id,
-                        job_id=db_job.id,
-                        message=f"New job nearby: {db_job.title}",
-                        is_read=False
-                    )
-                    db.add(notification)
-                    # Send real-time WebSocket notification
-                    if background_tasks is not None:
-                        background_tasks.add_task(send_notification_to_worker, worker.id, {
-                            "job_id": db_job.id,
-                            "message": f"New job nearby: {db_job.title}",
-                            "is_read": False,
-                            "created_at": datetime.utcnow().isoformat()
-                        })
-                    # Send FCM push notification if token is available
-                    if getattr(worker, 'fcm_token', None):
-                        send_fcm_notification(
-                            worker.fcm_token,
-                            title="New Job Nearby!",
-                            body=f"New job: {db_job.title}",
-                            data={"job_id": str(db_job.id)}
-                        )
-            db.commit()
-            print(f"[H3] Notifying workers: {notify_worker_ids} for job {db_job.id}")
+        # Notifications and their outbox rows commit atomically with the job
+        if db_job.h3_cell is not None:
+            await db.run_sync(fan_out_new_job, db_job)
         # --- End H3 logic ---
 
+        await db.commit()
+        await db.refresh(db_job)
+        declare_sticky_keys(request, business_owner_id=db_job.business_owner_id, job_id=db_job.id)
+        outbox_relay.wake()
         return db_job
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Invalid data provided")
 
-@router.get("/nearby", response_model=list[JobResponse])
-def get_nearby_jobs(
-    lat: float = Query(..., description="Latitude of worker location"),
-    lng: float = Query(..., description="Longitude of worker location"),
-    radius_km: int = Query(10, description="Search radius in kilometers"),
-    db: Session = Depends(get_db)
+@router.get("/nearby", response_model=NearbyJobsPage)
+async def get_nearby_jobs(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of worker location"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude of worker location"),
+    radius_km: int = Query(10, ge=1, le=100, description="Search radius in kilometers"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of jobs per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    h3_resolution = 8  # Reasonable for city/neighborhood
-    origin_cell = h3.latlng_to_cell(lat, lng, h3_resolution)
-    # Approximate number of rings for the radius (each ring ~1km at res 8)
-    num_rings = max(1, int(radius_km))
-    nearby_cells = set(h3.grid_disk(origin_cell, num_rings))
-    jobs = db.query(Job).filter(Job.latitude != None, Job.longitude != None).all()
-    nearby_jobs = []
-    for job in jobs:
-        job_cell = h3.latlng_to_cell(job.latitude, job.longitude, h3_resolution)
-        if job_cell in nearby_cells:
-            nearby_jobs.append(job)
-    return nearby_jobs
+    # Keyset position on (distance, id)
+    after = None
+    if cursor:
+        position = decode_cursor(cursor)
+        try:
+            after = (float(position["d"]), int(position["id"]))
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Indexed cell filter per cover resolution, reading only the columns the cutoff and sort need
+    nearby = []
+    for resolution, cells in region_cover(lat, lng, radius_km).items():
+        rows = await db.execute(
+            select(Job.id, Job.latitude, Job.longitude).where(h3_column(Job, resolution).in_(cells))
+        )
+        for job_id, job_lat, job_lng in rows:
+            distance = haversine_km(lat, lng, job_lat, job_lng)
+            if distance <= radius_km and (after is None or (distance, job_id) > after):
+                nearby.append((distance, job_id))
+    nearby.sort()
+
+    page = nearby[:limit]
+    next_cursor = None
+    if len(nearby) > limit:
+        next_cursor = encode_cursor({"d": page[-1][0], "id": page[-1][1]})
+    # Full rows for this page only
+    jobs = {job.id: job for job in (await db.scalars(select(Job).where(Job.id.in_([job_id for _, job_id in page])))).all()}
+    items = []
+    for distance, job_id in page:
+        job = jobs.get(job_id)
+        if job is not None:
+            job.distance_km = round(distance, 3)
+            items.append(job)
+    return {"items": items, "next_cursor": next_cursor}
 
 @router.get("/{job_id}", response_model=JobResponse)
-def get_job(job_id: int, db: Session = Depends(get_db)):
-    job = db.query(Job).filter(Job.id == job_id).first()
+async def get_job(job_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return job
 
-@router.get("/", response_model=list[JobResponse])
-def get_all_jobs(db: Session = Depends(get_db)):
-    return db.query(Job).all()
+@router.get("/", response_model=Page[JobResponse])
+async def get_all_jobs(
+    filters: JobFilters = Depends(),
+    sort: str = Query("-id", description=f"One of {', '.join(JOB_SORTS)}; prefix - for descending"),
+    limit: int = Query(LIST_LIMIT_DEFAULT, ge=1, le=LIST_LIMIT_MAX),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    keyset = Keyset(JOB_SORTS, sort, cursor, Job.id)
+    jobs = (await db.scalars(keyset.apply(filters.apply(select(Job)), limit))).all()
+    return keyset.page(jobs, limit)
 
-@router.get("/business/{business_owner_id}", response_model=list[JobResponse])
-def get_jobs_by_business_owner(business_owner_id: int, db: Session = Depends(get_db)):
-    jobs = db.query(Job).filter(Job.business_owner_id == business_owner_id).all()
-    return jobs
+@router.get("/business/{business_owner_id}", response_model=Page[JobResponse])
+async def get_jobs_by_business_owner(
+    business_owner_id: int,
+    filters: JobFilters = Depends(),
+    sort: str = Query("-id", description=f"One of {', '.join(JOB_SORTS)}; prefix - for descending"),
+    limit: int = Query(LIST_LIMIT_DEFAULT, ge=1, le=LIST_LIMIT_MAX),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    keyset = Keyset(JOB_SORTS, sort, cursor, Job.id)
+    query = filters.apply(select(Job).where(Job.business_owner_id == business_owner_id))
+    jobs = (await db.scalars(keyset.apply(query, limit))).all()
+    return keyset.page(jobs, limit)
 
 @router.put("/{job_id}", response_model=JobResponse)
-def update_job(job_id: int, job_update: JobUpdate, db: Session = Depends(get_db)):
-    job = db.query(Job).filter(Job.id == job_id).first()
+async def update_job(job_id: int, job_update: JobUpdate, request: Request, db: AsyncSession = Depends(get_async_db)):
+    job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
     try:
         for key, value in job_update.dict(exclude_unset=True).items():
             setattr(job, key, value)
-        db.commit()
-        db.refresh(job)
+        await db.commit()
+        job_titles.invalidate(job_id)
+        await db.refresh(job)
+        declare_sticky_keys(request, business_owner_id=job.business_owner_id)
         return job
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Invalid data provided")
 
 @router.delete("/{job_id}")
-def delete_job(job_id: int, db: Session = Depends(get_db)):
+async def delete_job(job_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Delete job and all associated applications"""
-    job = db.query(Job).filter(Job.id == job_id).first()
+    job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
     # Get all applications for this job
-    applications = db.query(JobApplication).filter(JobApplication.job_id == job_id).all()
+    applications = (await db.scalars(select(JobApplication).where(JobApplication.job_id == job_id))).all()
     
     # Delete applications first (due to foreign key constraints)
     for application in applications:
-        db.delete(application)
+        await db.delete(application)
     
     # Delete job
-    db.delete(job)
-    db.commit()
+    declare_sticky_keys(request, business_owner_id=job.business_owner_id)
+    await db.delete(job)
+    await db.commit()
     
     return {
         "success": True,
@@ -154,9 +207,9 @@ def delete_job(job_id: int, db: Session = Depends(get_db)):
     } 
 
 @router.post("/batch", response_model=list[JobResponse])
-def get_jobs_by_ids(
-    job_ids: list[int] = Body(..., embed=True, description="List of job IDs to fetch"),
-    db: Session = Depends(get_db)
+async def get_jobs_by_ids(
+    job_ids: list[int] = Body(..., embed=True, max_length=LIST_LIMIT_MAX, description="List of job IDs to fetch"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    jobs = db.query(Job).filter(Job.id.in_(job_ids)).all()
+    jobs = (await db.scalars(select(Job).where(Job.id.in_(job_ids)))).all()
     return jobs 
\ No newline at end of file
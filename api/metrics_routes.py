@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from core.metrics import collect_metrics
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics")
+def get_metrics():
+    """Live counters from the in-process subsystems (indexes, queues, pools)"""
+    return collect_metrics()
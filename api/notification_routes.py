@@ -1,43 +1,117 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from core.database import get_db
+from typing import Optional
+from core.database import get_db, get_async_db, get_async_read_db
+from core.db_routing import declare_sticky_keys
 from models.notification import Notification
 from models.worker import Worker
-from schemas.notification_schemas import NotificationCreate, NotificationResponse, NotificationMarkRead
+from schemas.notification_schemas import NotificationCreate, NotificationResponse, NotificationMarkRead, NotificationPage, NotificationReadWatermark
 from datetime import datetime
 from fastapi import APIRouter
 from api.notification_ws import send_notification_to_worker
 import asyncio
 from core.fcm import send_fcm_notification
+from core.notification_templates import NOTIFICATION_CUSTOM, render_messages
 import models.notification
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
-@router.get("/{worker_id}", response_model=List[NotificationResponse])
-def get_notifications(worker_id: int, db: Session = Depends(get_db)):
-    notifications = db.query(Notification).filter(Notification.worker_id == worker_id).order_by(Notification.created_at.desc()).all()
-    return notifications
+@router.get("/{worker_id}", response_model=NotificationPage)
+async def get_notifications(
+    worker_id: int,
+    before_id: Optional[int] = Query(None, ge=1, description="Return notifications older than this id (next_before_id of the previous page)"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Newest-first inbox page; ids grow with created_at, so paging on id walks the (worker_id, id) index"""
+    watermark = await _read_watermark(db, worker_id)
+    query = select(Notification).where(Notification.worker_id == worker_id)
+    if before_id is not None:
+        query = query.where(Notification.id < before_id)
+    notifications = (await db.scalars(query.order_by(Notification.id.desc()).limit(limit + 1))).all()
+    has_more = len(notifications) > limit
+    notifications = notifications[:limit]
+    messages = await db.run_sync(render_messages, notifications)
+
+    items = [
+        NotificationResponse(
+            id=notification.id,
+            worker_id=notification.worker_id,
+            job_id=notification.job_id,
+            type_code=notification.type_code,
+            message=message,
+            is_read=bool(notification.is_read) or notification.id <= watermark,
+            created_at=notification.created_at
+        )
+        for notification, message in zip(notifications, messages)
+    ]
+
+    # Only rows above the watermark can be unread
+    unread_count = await db.scalar(
+        select(func.count(Notification.id))
+        .where(Notification.worker_id == worker_id, Notification.is_read == False, Notification.id > watermark)
+    )
+    return {
+        "items": items,
+        "unread_count": unread_count,
+        "next_before_id": notifications[-1].id if has_more else None
+    }
+
+async def _read_watermark(db: AsyncSession, worker_id: int) -> int:
+    return await db.scalar(select(Worker.last_read_notification_id).where(Worker.id == worker_id)) or 0
+
+@router.post("/{worker_id}/mark_all_read", response_model=NotificationReadWatermark)
+async def mark_all_notifications_read(
+    worker_id: int,
+    up_to_id: Optional[int] = Query(None, ge=1, description="Mark everything up to and including this id; defaults to the newest notification"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Advance the worker's read watermark: one row write however many notifications it covers"""
+    if not await db.scalar(select(Worker.id).where(Worker.id == worker_id)):
+        raise HTTPException(status_code=404, detail="Worker not found")
+    newest = await db.scalar(select(func.max(Notification.id)).where(Notification.worker_id == worker_id)) or 0
+    # Never past the newest notification, or notifications not yet sent would arrive already read
+    up_to_id = newest if up_to_id is None else min(up_to_id, newest)
+    # The watermark only moves forward, even with concurrent or out-of-order requests
+    await db.execute(
+        update(Worker)
+        .where(Worker.id == worker_id, Worker.last_read_notification_id < up_to_id)
+        .values(last_read_notification_id=up_to_id)
+    )
+    await db.commit()
+    return {"worker_id": worker_id, "last_read_notification_id": await _read_watermark(db, worker_id)}
 
 @router.post("/", response_model=NotificationResponse)
-def create_notification(notification: NotificationCreate, db: Session = Depends(get_db)):
+async def create_notification(notification: NotificationCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
     db_notification = Notification(
         worker_id=notification.worker_id,
         job_id=notification.job_id,
+        type_code=NOTIFICATION_CUSTOM,
         message=notification.message,
         is_read=False,
         created_at=datetime.utcnow()
     )
     db.add(db_notification)
-    db.commit()
-    db.refresh(db_notification)
+    await db.commit()
+    await db.refresh(db_notification)
+    declare_sticky_keys(request, worker_id=db_notification.worker_id)
     return db_notification
 
 @router.post("/mark_read")
-def mark_notifications_read(payload: NotificationMarkRead, db: Session = Depends(get_db)):
-    updated = db.query(Notification).filter(Notification.id.in_(payload.notification_ids)).update({Notification.is_read: True}, synchronize_session=False)
-    db.commit()
-    return {"updated": updated}
+async def mark_notifications_read(payload: NotificationMarkRead, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Per-row read flags for out-of-order reads; use mark_all_read to clear the whole inbox"""
+    # Rows at or below the watermark already read as read, so skip writing them
+    statement = update(Notification).where(
+        Notification.id.in_(payload.notification_ids),
+        Notification.worker_id == payload.worker_id,
+        Notification.id > await _read_watermark(db, payload.worker_id)
+    )
+    result = await db.execute(statement.values(is_read=True).execution_options(synchronize_session=False))
+    await db.commit()
+    declare_sticky_keys(request, worker_id=payload.worker_id)
+    return {"updated": result.rowcount}
 
 @router.post("/test_ws/{worker_id}")
 async def test_ws_notification(worker_id: int, message: str = "Test notification!"):
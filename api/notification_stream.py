@@ -0,0 +1,110 @@
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from api.notification_ws import load_missed_notifications
+from core.ws_hub import hub
+import asyncio
+import json
+import logging
+import os
+import time
+
+# Notification delivery for clients that cannot keep a WebSocket open. Both endpoints are fed
+# by the same hub as /ws/notifications and hold no database connection while they wait.
+router = APIRouter(prefix="/notifications", tags=["notifications"])
+
+logger = logging.getLogger(__name__)
+
+# Comment lines sent on an idle stream so proxies do not time it out
+SSE_KEEPALIVE_SECONDS = float(os.environ.get("WORKBEE_SSE_KEEPALIVE_SECONDS", "15"))
+SSE_RETRY_MILLISECONDS = 3000
+LONG_POLL_MAX_TIMEOUT_SECONDS = 60
+
+@router.get("/{worker_id}/stream")
+async def stream_notifications(
+    worker_id: int,
+    since_id: Optional[int] = Query(None, ge=0, description="Replay notifications newer than this id before going live"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events feed of the same frames the WebSocket sends. Each notification event
+    carries its seq as the SSE id, so a reconnecting EventSource resumes via Last-Event-ID.
+    """
+    resume_from = since_id
+    if last_event_id and last_event_id.isdigit():
+        resume_from = int(last_event_id)
+    return StreamingResponse(
+        _sse_events(worker_id, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _sse_events(worker_id: int, resume_from: Optional[int]):
+    # Attach inside the generator so the finally below always detaches
+    connection = hub.attach(worker_id, hold=resume_from is not None)
+    logger.info(f"SSE stream opened for worker {worker_id}")
+    try:
+        yield f"retry: {SSE_RETRY_MILLISECONDS}\n\n"
+        if resume_from is not None:
+            replayed_through = resume_from
+            try:
+                frames, truncated = await asyncio.to_thread(load_missed_notifications, worker_id, resume_from)
+                for frame in frames:
+                    yield _sse_event(json.dumps(dict(frame, replay=True)), event_id=frame["seq"])
+                if frames:
+                    replayed_through = frames[-1]["seq"]
+                yield _sse_event(json.dumps({"count": len(frames), "last_seen_id": replayed_through, "truncated": truncated}),
+                                 event="replay_complete")
+            finally:
+                hub.release(connection, replayed_through)
+        while not connection.closed:
+            hub.touch(connection)
+            frame = await hub.next_frame(connection, SSE_KEEPALIVE_SECONDS)
+            if frame is None:
+                yield ": keepalive\n\n"
+            else:
+                yield _sse_event(frame.text, event_id=frame.seq)
+    finally:
+        logger.info(f"SSE stream closed for worker {worker_id}")
+        await hub.disconnect(connection)
+
+def _sse_event(data: str, event_id=None, event=None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in (data.splitlines() or [""]))
+    return "\n".join(lines) + "\n\n"
+
+@router.get("/{worker_id}/poll")
+async def poll_notifications(
+    worker_id: int,
+    since_id: int = Query(0, ge=0, description="Highest notification id the client already has"),
+    timeout: float = Query(25, ge=0, le=LONG_POLL_MAX_TIMEOUT_SECONDS),
+    limit: int = Query(100, ge=1, le=500)
+):
+    """
+    Long-poll: answers as soon as the worker has notifications above since_id, or with an empty
+    list after timeout seconds. Pass last_id back as since_id on the next call.
+    """
+    deadline = time.monotonic() + timeout
+    signal = hub.watch(worker_id)
+    try:
+        while True:
+            # Read the version before querying so a frame that lands mid-query still wakes us
+            seen_version = signal.version
+            frames, has_more = await asyncio.to_thread(load_missed_notifications, worker_id, since_id, limit, False)
+            remaining = deadline - time.monotonic()
+            if frames or remaining <= 0:
+                break
+            # Parked on the hub's condition: no thread, no DB connection
+            if not await signal.wait(seen_version, remaining):
+                break
+    finally:
+        hub.unwatch(signal)
+    return {
+        "items": frames,
+        "last_id": frames[-1]["seq"] if frames else since_id,
+        "has_more": has_more
+    }
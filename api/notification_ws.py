@@ -1,47 +1,147 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
-from typing import Dict, List
+from typing import Optional
+from core.database import SessionLocal
+from core.fanout import notification_frame
+from core.notification_templates import render_messages
+from core.presence import presence
+from core.ws_hub import hub, msgpack, available_encodings, ENCODING_JSON
+from models.notification import Notification
+from models.worker import Worker
+import asyncio
 import json
 import logging
+import os
 
 router = APIRouter()
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# In-memory store for connected clients: worker_id -> list of WebSocket connections
-active_connections: Dict[int, List[WebSocket]] = {}
+# Most notifications replayed on reconnect; older ones are left to the paginated inbox
+WS_REPLAY_LIMIT = int(os.environ.get("WORKBEE_WS_REPLAY_LIMIT", "200"))
 
 @router.websocket("/ws/notifications/{worker_id}")
-async def websocket_endpoint(websocket: WebSocket, worker_id: int):
-    await websocket.accept()
+async def websocket_endpoint(websocket: WebSocket, worker_id: int, last_seen_id: Optional[int] = None,
+                             encoding: str = ENCODING_JSON, heartbeat: bool = False):
+    """
+    Live notification feed. Reconnecting clients pass the seq of the last frame they saw as
+    last_seen_id and first receive only the notifications they missed, then live frames.
+
+    encoding=msgpack switches outgoing frames to binary MessagePack; the default is JSON text.
+    Compression is negotiated separately by the server (permessage-deflate).
+
+    heartbeat=true opts in to {"type": "ping"} frames every WORKBEE_WS_HEARTBEAT_SECONDS; such a
+    client must send something (a pong or any frame) within WORKBEE_WS_IDLE_TIMEOUT_SECONDS or it
+    is disconnected. Without it, liveness is left to protocol-level WebSocket pings.
+
+    Clients acknowledge notification frames with {"type": "ack", "seq": N}; acked
+    notifications are not pushed again over FCM.
+    """
+    if encoding not in available_encodings():
+        # Rejects the handshake before accept
+        await websocket.close(code=1003)
+        return
+    connection = await hub.connect(websocket, worker_id, hold=last_seen_id is not None, encoding=encoding,
+                                   heartbeat=heartbeat)
     logger.info(f"WebSocket connection established for worker {worker_id}")
-    
-    if worker_id not in active_connections:
-        active_connections[worker_id] = []
-    active_connections[worker_id].append(websocket)
-    
-    logger.info(f"Active connections for worker {worker_id}: {len(active_connections[worker_id])}")
-    
+    logger.info(f"Active connections for worker {worker_id}: {hub.connection_count(worker_id)}")
+    presence.connected(worker_id)
+
     try:
+        if last_seen_id is not None:
+            await _replay_missed(websocket, connection, worker_id, last_seen_id)
         while True:
-            # Receive messages and broadcast them to all connections for this worker
-            message = await websocket.receive_text()
+            message = _inbound_text(await websocket.receive())
+            hub.touch(connection)
+            presence.heartbeat(worker_id)
+            control = _control_frame(message)
+            if control is not None:
+                if control["type"] == "ack" and isinstance(control.get("seq"), int):
+                    presence.ack(worker_id, control["seq"])
+                continue
             logger.info(f"Received message from worker {worker_id}: {message}")
-            
-            # Broadcast the message to all other connections for this worker
-            for other_ws in active_connections[worker_id]:
-                if other_ws != websocket:  # Don't send back to sender
-                    try:
-                        await other_ws.send_text(message)
-                        logger.info(f"Broadcasted message to worker {worker_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to broadcast message: {e}")
-                        
+            # Relay the message to all other connections for this worker (queued, never awaited)
+            hub.send_to_worker(worker_id, message, exclude=connection)
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for worker {worker_id}")
-        active_connections[worker_id].remove(websocket)
-        if not active_connections[worker_id]:
-            del active_connections[worker_id]
+    finally:
+        await hub.disconnect(connection)
+        if not hub.connection_count(worker_id):
+            presence.disconnected(worker_id)
+
+async def _replay_missed(websocket: WebSocket, connection, worker_id: int, last_seen_id: int):
+    """Send notifications newer than last_seen_id, then let the queued live frames through"""
+    replayed_through = last_seen_id
+    try:
+        frames, truncated = await asyncio.to_thread(load_missed_notifications, worker_id, last_seen_id)
+        for frame in frames:
+            await hub.send_direct(connection, json.dumps(dict(frame, replay=True)))
+        if frames:
+            replayed_through = frames[-1]["seq"]
+        await hub.send_direct(connection, json.dumps({
+            "type": "replay_complete",
+            "count": len(frames),
+            "last_seen_id": replayed_through,
+            # More than WS_REPLAY_LIMIT were missed: page the older ones from the inbox with before_id
+            "truncated": truncated
+        }))
+    finally:
+        # Live frames the replay already covered are skipped by the writer
+        hub.release(connection, replayed_through)
+
+def load_missed_notifications(worker_id: int, last_seen_id: int, limit: int = WS_REPLAY_LIMIT, newest: bool = True):
+    """
+    Frames for notifications above last_seen_id, oldest first, and whether any were left out.
+
+    newest=True keeps the newest `limit` of them (replay); newest=False the oldest, so the
+    caller can continue from the last returned id (long-poll). Uses its own short session.
+    """
+    db = SessionLocal()
+    try:
+        watermark = db.query(Worker.last_read_notification_id).filter(Worker.id == worker_id).scalar() or 0
+        notifications = (
+            db.query(Notification)
+            .filter(Notification.worker_id == worker_id, Notification.id > last_seen_id)
+            .order_by(Notification.id.desc() if newest else Notification.id)
+            .limit(limit + 1)
+            .all()
+        )
+        truncated = len(notifications) > limit
+        notifications = notifications[:limit]
+        if newest:
+            notifications.reverse()
+        return [
+            notification_frame(n.id, n.job_id, n.type_code, message, bool(n.is_read) or n.id <= watermark, n.created_at)
+            for n, message in zip(notifications, render_messages(db, notifications))
+        ], truncated
+    finally:
+        db.close()
+
+def _inbound_text(message: dict) -> str:
+    """Client frame as JSON text, whether it arrived as text or as binary MessagePack"""
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("text") is not None:
+        return message["text"]
+    data = message.get("bytes") or b""
+    if msgpack is not None:
+        try:
+            return json.dumps(msgpack.unpackb(data))
+        except (ValueError, TypeError):
+            pass
+    return data.decode("utf-8", errors="replace")
+
+def _control_frame(message: str) -> Optional[dict]:
+    """Heartbeat answers ({"type": "pong"}) and acks ({"type": "ack", "seq": N}), which are not relayed"""
+    if message == "pong":
+        return {"type": "pong"}
+    try:
+        frame = json.loads(message)
+    except ValueError:
+        return None
+    if isinstance(frame, dict) and frame.get("type") in ("pong", "ack"):
+        return frame
+    return None
 
 # HTTP endpoint to send notifications to workers
 @router.post("/send-notification/{worker_id}")
@@ -50,49 +150,34 @@ async def send_notification_to_worker(worker_id: int, notification: dict):
     Send a notification to a specific worker via WebSocket
     """
     try:
-        if worker_id not in active_connections:
-            logger.warning(f"No active connections for worker {worker_id}")
-            raise HTTPException(status_code=404, detail=f"No active connections for worker {worker_id}")
-        
-        message = json.dumps(notification)
-        sent_count = 0
-        
-        for ws in active_connections[worker_id]:
-            try:
-                await ws.send_text(message)
-                sent_count += 1
-                logger.info(f"Notification sent to worker {worker_id}: {notification.get('title', 'Unknown')}")
-            except Exception as e:
-                logger.error(f"Failed to send notification to worker {worker_id}: {e}")
-        
-        return {
-            "success": True,
-            "message": f"Notification sent to {sent_count} connection(s) for worker {worker_id}",
-            "notification": notification
-        }
-        
-    except Exception as e:
-        logger.error(f"Error sending notification to worker {worker_id}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to send notification: {str(e)}")
+        process_count = await hub.publish(worker_id, json.dumps(notification))
+    except ConnectionError as e:
+        logger.error(f"Notification backplane unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Notification backplane unavailable")
+    if not process_count:
+        logger.warning(f"No active connections for worker {worker_id}")
+        raise HTTPException(status_code=404, detail=f"No active connections for worker {worker_id}")
+
+    logger.info(f"Notification routed to {process_count} process(es) holding worker {worker_id}")
+    return {
+        "success": True,
+        "message": f"Notification sent to {process_count} process(es) with connections for worker {worker_id}",
+        "notification": notification
+    }
 
 # Utility function to send a notification to a worker (for internal use)
 async def send_notification_to_worker_internal(worker_id: int, message: str):
-    if worker_id in active_connections:
-        for ws in active_connections[worker_id]:
-            try:
-                await ws.send_text(message)
-                logger.info(f"Internal notification sent to worker {worker_id}")
-            except Exception as e:
-                logger.error(f"Failed to send internal notification to worker {worker_id}: {e}")
+    await hub.publish(worker_id, message)
 
 # Get active connections info
 @router.get("/active-connections")
 async def get_active_connections():
     """
-    Get information about active WebSocket connections
+    Get information about active WebSocket connections held by this process
     """
+    worker_ids = hub.connected_workers()
     return {
-        "active_workers": list(active_connections.keys()),
-        "total_connections": sum(len(connections) for connections in active_connections.values()),
-        "connections_per_worker": {str(worker_id): len(connections) for worker_id, connections in active_connections.items()}
-    } 
\ No newline at end of file
+        "active_workers": worker_ids,
+        "total_connections": sum(hub.connection_count(worker_id) for worker_id in worker_ids),
+        "connections_per_worker": {str(worker_id): hub.connection_count(worker_id) for worker_id in worker_ids}
+    }
@@ -1,17 +1,19 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from schemas.user_schemas import UserCreate, UserUpdate, UserLogin, UserResponse
 from schemas.business_owner_schemas import BusinessOwnerCreate
-from core.database import get_db
+from schemas.pagination_schemas import Page
+from core.database import get_db, get_read_db
+from core.pagination import Keyset, LIST_LIMIT_DEFAULT, LIST_LIMIT_MAX
 from models.user import User
 from models.business_owner import BusinessOwner
 from models.worker import Worker
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Optional
 from sqlalchemy.exc import IntegrityError
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -84,14 +86,26 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
 def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
-@router.get("/", response_model=List[UserResponse])
-def get_all_users(db: Session = Depends(get_db)):
-    """Get all users"""
-    users = db.query(User).all()
-    return users
+# Every sort and filter has a (column, id) index on User; add one before whitelisting a column
+USER_SORTS = {"id": User.id, "username": User.username}
+
+@router.get("/", response_model=Page[UserResponse])
+def get_all_users(
+    role: Optional[str] = Query(None, max_length=20),
+    sort: str = Query("id", description=f"One of {', '.join(USER_SORTS)}; prefix - for descending"),
+    limit: int = Query(LIST_LIMIT_DEFAULT, ge=1, le=LIST_LIMIT_MAX),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_read_db)
+):
+    """Get users a page at a time"""
+    keyset = Keyset(USER_SORTS, sort, cursor, User.id)
+    query = db.query(User)
+    if role is not None:
+        query = query.filter(User.role == role)
+    return keyset.page(keyset.apply(query, limit).all(), limit)
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, db: Session = Depends(get_read_db)):
     """Get a specific user by ID"""
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
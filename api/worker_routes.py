@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from schemas.worker_schemas import WorkerCreate, WorkerUpdate, WorkerResponse
-from core.database import get_db
+from schemas.pagination_schemas import Page
+from core.database import get_db, get_read_db
+from core.db_routing import declare_sticky_keys
+from core.pagination import Keyset, LIST_LIMIT_DEFAULT, LIST_LIMIT_MAX
 from models.worker import Worker
 from models.user import User
 from models.job_application import JobApplication
+from core.spatial_index import worker_index
+from core.fcm_topics import topic_subscriptions
+from core.fcm_tokens import release_token_elsewhere
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/workers", tags=["workers"])
 
+# Every sort and filter has a (column, id) index on Worker; add one before whitelisting a column
+WORKER_SORTS = {"id": Worker.id, "name": Worker.name, "years_of_experience": Worker.years_of_experience}
+
 @router.post("/", response_model=WorkerResponse)
-def create_worker(worker: WorkerCreate, db: Session = Depends(get_db)):
+def create_worker(worker: WorkerCreate, request: Request, db: Session = Depends(get_db)):
     # Check if user exists
     user = db.query(User).filter(User.id == worker.user_id).first()
     if not user:
@@ -23,6 +33,7 @@ def create_worker(worker: WorkerCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"User {worker.user_id} already has a worker profile")
     
     try:
+        released = release_token_elsewhere(db, None, worker.fcm_token)
         db_worker = Worker(
             user_id=worker.user_id,
             name=worker.name,
@@ -41,21 +52,46 @@ def create_worker(worker: WorkerCreate, db: Session = Depends(get_db)):
         db.add(db_worker)
         db.commit()
         db.refresh(db_worker)
+        _drop_released_tokens(released)
+        worker_index.upsert(db_worker.id, db_worker.h3_cell, db_worker.fcm_token)
+        topic_subscriptions.mark(db_worker.id)
+        declare_sticky_keys(request, worker_id=db_worker.id, user_id=db_worker.user_id)
         return db_worker
     except IntegrityError as e:
         db.rollback()
         raise HTTPException(status_code=400, detail="Invalid data provided")
 
+def _drop_released_tokens(released):
+    for worker_id, cell, subscription in released:
+        worker_index.upsert(worker_id, cell, None)
+        topic_subscriptions.unsubscribe(subscription)
+
 @router.get("/{worker_id}", response_model=WorkerResponse)
-def get_worker(worker_id: int, db: Session = Depends(get_db)):
+def get_worker(worker_id: int, db: Session = Depends(get_read_db)):
     worker = db.query(Worker).filter(Worker.id == worker_id).first()
     if not worker:
         raise HTTPException(status_code=404, detail="Worker not found")
     return worker
 
-@router.get("/", response_model=list[WorkerResponse])
-def get_all_workers(db: Session = Depends(get_db)):
-    return db.query(Worker).all()
+@router.get("/", response_model=Page[WorkerResponse])
+def get_all_workers(
+    city: Optional[str] = Query(None, max_length=50),
+    state: Optional[str] = Query(None, max_length=50),
+    min_years_of_experience: Optional[int] = Query(None, ge=0),
+    sort: str = Query("id", description=f"One of {', '.join(WORKER_SORTS)}; prefix - for descending"),
+    limit: int = Query(LIST_LIMIT_DEFAULT, ge=1, le=LIST_LIMIT_MAX),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_read_db)
+):
+    keyset = Keyset(WORKER_SORTS, sort, cursor, Worker.id)
+    query = db.query(Worker)
+    if city is not None:
+        query = query.filter(Worker.city == city)
+    if state is not None:
+        query = query.filter(Worker.state == state)
+    if min_years_of_experience is not None:
+        query = query.filter(Worker.years_of_experience >= min_years_of_experience)
+    return keyset.page(keyset.apply(query, limit).all(), limit)
 
 @router.put("/{worker_id}", response_model=WorkerResponse)
 def update_worker(worker_id: int, worker_update: WorkerUpdate, db: Session = Depends(get_db)):
@@ -64,10 +100,20 @@ def update_worker(worker_id: int, worker_update: WorkerUpdate, db: Session = Dep
         raise HTTPException(status_code=404, detail="Worker not found")
     
     try:
+        previous_token = worker.fcm_token
         for key, value in worker_update.dict(exclude_unset=True).items():
             setattr(worker, key, value)
+        released, dropped = [], None
+        if worker.fcm_token != previous_token:
+            dropped = topic_subscriptions.drop_token(worker, previous_token)
+            released = release_token_elsewhere(db, worker.id, worker.fcm_token)
         db.commit()
         db.refresh(worker)
+        topic_subscriptions.unsubscribe(dropped)
+        _drop_released_tokens(released)
+        worker_index.upsert(worker.id, worker.h3_cell, worker.fcm_token)
+        # Re-subscribes to the new cell's topic if the location moved to another cell
+        topic_subscriptions.mark(worker.id)
         return worker
     except IntegrityError as e:
         db.rollback()
@@ -78,9 +124,18 @@ def update_fcm_token(worker_id: int, fcm_token: str, db: Session = Depends(get_d
     worker = db.query(Worker).filter(Worker.id == worker_id).first()
     if not worker:
         raise HTTPException(status_code=404, detail="Worker not found")
+    released, dropped = [], None
+    if worker.fcm_token != fcm_token:
+        dropped = topic_subscriptions.drop_token(worker)
+        # A device token belongs to one worker: stale profiles from earlier installs lose it
+        released = release_token_elsewhere(db, worker.id, fcm_token)
     worker.fcm_token = fcm_token
     db.commit()
     db.refresh(worker)
+    topic_subscriptions.unsubscribe(dropped)
+    _drop_released_tokens(released)
+    worker_index.upsert(worker.id, worker.h3_cell, worker.fcm_token)
+    topic_subscriptions.mark(worker.id)
     return {"success": True, "worker_id": worker_id, "fcm_token": fcm_token}
 
 @router.get("/{worker_id}/fcm-token")
@@ -123,8 +178,11 @@ def delete_worker(worker_id: int, db: Session = Depends(get_db)):
         db.delete(application)
     
     # Delete worker
+    dropped = topic_subscriptions.drop_token(worker)
     db.delete(worker)
     db.commit()
+    topic_subscriptions.unsubscribe(dropped)
+    worker_index.remove(worker_id)
     
     return {
         "success": True,
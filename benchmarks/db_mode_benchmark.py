@@ -0,0 +1,185 @@
+"""
+Throughput of the async routes with WORKBEE_DB_MODE=async and WORKBEE_DB_MODE=sync.
+
+Starts uvicorn once per mode and keeps CLIENTS concurrent clients busy for DURATION seconds
+on the hot read endpoints (job by id, nearby jobs, notification inbox). It reports requests
+per second and latency percentiles.
+
+Usage:
+    python benchmarks/db_mode_benchmark.py [--clients 500] [--duration 20] [--database-url URL]
+
+Without --database-url it uses a throwaway SQLite file. SQLite has no network round-trip, so
+the gap between the modes is much smaller than against MySQL, where each query waits on the
+network and the sync mode ties up one of anyio's threads for every wait.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DB_PATH = os.path.join(tempfile.gettempdir(), "workbee_db_mode_benchmark.db")
+
+ORIGIN = (19.0760, 72.8777)  # Mumbai
+NUM_JOBS = 5000
+NUM_NOTIFICATIONS = 2000
+MODES = ("sync", "async")
+STUCK_GRACE_SECONDS = 10
+
+
+def seed(database_url):
+    os.environ["WORKBEE_DATABASE_URL"] = database_url
+    os.environ["WORKBEE_DB_MODE"] = "sync"
+    sys.path.append(ROOT)
+    from datetime import datetime
+    import h3
+    from sqlalchemy import insert, select
+    from core.database import Base, engine
+    from core.geo import latlng_to_cell, H3_PARENT_RESOLUTIONS
+    from models import user, business_owner, worker, job, job_application, notification, outbox, notification_archive
+    from models.business_owner import BusinessOwner
+    from models.job import Job
+    from models.notification import Notification
+    from models.worker import Worker
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        user_id = conn.execute(select(user.User.id).where(user.User.username == "bench")).scalar()
+        if user_id is None:
+            conn.execute(insert(user.User).values(username="bench", email="bench@example.com", password_hash="x", role="seeker"))
+            user_id = conn.execute(select(user.User.id).where(user.User.username == "bench")).scalar()
+            conn.execute(insert(Worker).values(user_id=user_id, name="Bench", latitude=ORIGIN[0], longitude=ORIGIN[1]))
+            conn.execute(insert(BusinessOwner).values(user_id=user_id, business_name="Bench"))
+        worker_id = conn.execute(select(Worker.id).where(Worker.user_id == user_id)).scalar()
+        owner_id = conn.execute(select(BusinessOwner.id).where(BusinessOwner.user_id == user_id)).scalar()
+        # Core inserts skip the mapper hook, so fill the cells the same way it would
+        jobs = []
+        for i in range(NUM_JOBS):
+            lat, lng = ORIGIN[0] + rng.uniform(-0.5, 0.5), ORIGIN[1] + rng.uniform(-0.5, 0.5)
+            cell = latlng_to_cell(lat, lng)
+            row = {"business_owner_id": owner_id, "title": f"Bench job {i}", "latitude": lat, "longitude": lng, "h3_cell": cell}
+            row.update({f"h3_cell_r{res}": h3.cell_to_parent(cell, res) for res in H3_PARENT_RESOLUTIONS})
+            jobs.append(row)
+        conn.execute(insert(Job), jobs)
+        job_ids = conn.execute(select(Job.id).order_by(Job.id.desc()).limit(NUM_JOBS)).scalars().all()
+        conn.execute(insert(Notification), [
+            {"worker_id": worker_id, "job_id": job_ids[i % len(job_ids)], "type_code": 1, "is_read": False,
+             "created_at": datetime.utcnow()}
+            for i in range(NUM_NOTIFICATIONS)
+        ])
+    return worker_id, job_ids
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(client, base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get(f"{base_url}/metrics")
+            return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not start")
+
+
+async def load(base_url, clients, duration, worker_id, job_ids):
+    import httpx
+
+    paths = [
+        lambda rng: f"/jobs/{rng.choice(job_ids)}",
+        lambda rng: f"/jobs/nearby?lat={ORIGIN[0]}&lng={ORIGIN[1]}&radius_km=2&limit=20",
+        lambda rng: f"/notifications/{worker_id}?limit=20",
+    ]
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        await wait_until_up(client, base_url)
+        stop_at = time.monotonic() + duration
+
+        async def run_client(seed):
+            nonlocal errors
+            rng = random.Random(seed)
+            while time.monotonic() < stop_at:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(base_url + rng.choice(paths)(rng))
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        tasks = [asyncio.create_task(run_client(i)) for i in range(clients)]
+        # Requests still stuck this long after the window closes count as errors
+        _, stuck = await asyncio.wait(tasks, timeout=duration + STUCK_GRACE_SECONDS)
+        for task in stuck:
+            task.cancel()
+        await asyncio.gather(*stuck, return_exceptions=True)
+    return latencies, errors + len(stuck)
+
+
+def run_mode(mode, database_url, clients, duration, worker_id, job_ids):
+    port = free_port()
+    env = dict(os.environ, WORKBEE_DATABASE_URL=database_url, WORKBEE_DB_MODE=mode, WORKBEE_FCM_TRANSPORT="fake")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        latencies, errors = asyncio.run(load(f"http://127.0.0.1:{port}", clients, duration, worker_id, job_ids))
+    finally:
+        server.terminate()
+        try:
+            server.wait(15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else float("nan")
+
+    return len(latencies) / duration, percentile(0.5), percentile(0.99), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--database-url", help="sync SQLAlchemy URL of a migrated scratch database; bench rows are added to it (default: temporary SQLite)")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        database_url = f"sqlite:///{DB_PATH}"
+    print(f"Seeding {NUM_JOBS} jobs and {NUM_NOTIFICATIONS} notifications ...")
+    worker_id, job_ids = seed(database_url)
+
+    print(f"{args.clients} concurrent clients, {args.duration:.0f}s per mode")
+    print(f"{'mode':>6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    try:
+        for mode in MODES:
+            throughput, p50, p99, errors = run_mode(mode, database_url, args.clients, args.duration, worker_id, job_ids)
+            print(f"{mode:>6} {throughput:>9.1f} {p50:>9.1f} {p99:>9.1f} {errors:>7}")
+    finally:
+        if args.database_url is None:
+            os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare the old per-worker blocking FCM send with the batched dispatch pipeline,
+using FakeTransport so no Firebase project or network is needed.
+
+Usage:
+    python benchmarks/fcm_dispatch_benchmark.py [num_messages] [round_trip_ms]
+
+"serial"   - one transport call per message on the request thread (old create_job behaviour)
+"pipeline" - enqueue only on the request thread; sender threads batch into send_each calls
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.fcm_dispatch import FCMDispatcher, FakeTransport, PushMessage
+
+
+def make_messages(count):
+    return [PushMessage(token=f"token-{i}", title="New Job Nearby!", body="New job: Benchmark", data={"job_id": "1"}) for i in range(count)]
+
+
+def serial(messages, round_trip):
+    transport = FakeTransport(latency_seconds=round_trip)
+    start = time.perf_counter()
+    for message in messages:
+        transport.send_each([message])
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, transport.calls
+
+
+def pipeline(messages, round_trip):
+    transport = FakeTransport(latency_seconds=round_trip)
+    dispatcher = FCMDispatcher(transport, queue_size=len(messages) + 1)
+    dispatcher.start()
+    start = time.perf_counter()
+    for message in messages:
+        dispatcher.enqueue(message)
+    request_path = time.perf_counter() - start
+    while dispatcher.sent + dispatcher.failed < len(messages):
+        time.sleep(0.001)
+    delivered = time.perf_counter() - start
+    dispatcher.stop()
+    return request_path, delivered, transport.calls
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    round_trip = (float(sys.argv[2]) if len(sys.argv) > 2 else 20.0) / 1000
+    messages = make_messages(count)
+    print(f"{count} messages, {round_trip * 1000:.0f} ms per transport call")
+    print(f"{'mode':>10} {'request path ms':>16} {'all delivered ms':>17} {'transport calls':>16}")
+    for name, mode in (("serial", serial), ("pipeline", pipeline)):
+        request_path, delivered, calls = mode(messages, round_trip)
+        print(f"{name:>10} {request_path * 1000:>16.1f} {delivered * 1000:>17.1f} {calls:>16}")
+
+
+if __name__ == "__main__":
+    main()
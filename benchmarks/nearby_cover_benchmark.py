@@ -0,0 +1,102 @@
+"""
+Compare the two /jobs/nearby cell strategies on a synthetic job table:
+
+  flat    - grid_disk at resolution 8, one IN-list on jobs.h3_cell
+  compact - region_cover(): compacted mixed-resolution cells, one indexed query per resolution
+
+Usage:
+    python benchmarks/nearby_cover_benchmark.py [num_jobs]
+
+Runs against a throwaway SQLite file so it needs no MySQL server.
+"""
+import os
+import sys
+import random
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "workbee_nearby_cover_benchmark.db")
+os.environ["WORKBEE_DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import h3
+from sqlalchemy import insert
+from core.database import Base, engine, SessionLocal
+from core.geo import H3_RESOLUTION, H3_PARENT_RESOLUTIONS, cells_within_radius, region_cover, h3_column, haversine_km
+from models import user, business_owner, worker, job as job_model
+from models.job import Job
+
+ORIGIN = (19.0760, 72.8777)  # Mumbai
+RADII_KM = (1, 10, 30, 100)
+REPEATS = 5
+# SQLite caps bound parameters per statement, so very large flat IN-lists are chunked
+IN_LIST_CHUNK = 10000
+
+
+def seed(num_jobs):
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    rows = []
+    for i in range(num_jobs):
+        lat = ORIGIN[0] + rng.uniform(-1.5, 1.5)
+        lng = ORIGIN[1] + rng.uniform(-1.5, 1.5)
+        cell = h3.latlng_to_cell(lat, lng, H3_RESOLUTION)
+        row = {"business_owner_id": 1, "title": f"Job {i}", "latitude": lat, "longitude": lng, "h3_cell": cell}
+        for res in H3_PARENT_RESOLUTIONS:
+            row[f"h3_cell_r{res}"] = h3.cell_to_parent(cell, res)
+        rows.append(row)
+    with engine.begin() as conn:
+        for start in range(0, len(rows), 5000):
+            conn.execute(insert(Job), rows[start:start + 5000])
+
+
+def flat_strategy(db, lat, lng, radius_km):
+    cells = list(cells_within_radius(lat, lng, radius_km))
+    rows = []
+    for start in range(0, len(cells), IN_LIST_CHUNK):
+        rows.extend(db.query(Job.id, Job.latitude, Job.longitude).filter(Job.h3_cell.in_(cells[start:start + IN_LIST_CHUNK])).all())
+    return len(cells), rows
+
+
+def compact_strategy(db, lat, lng, radius_km):
+    cover = region_cover(lat, lng, radius_km)
+    rows = []
+    for resolution, cells in cover.items():
+        rows.extend(db.query(Job.id, Job.latitude, Job.longitude).filter(h3_column(Job, resolution).in_(cells)).all())
+    return sum(len(cells) for cells in cover.values()), rows
+
+
+def run(strategy, db, radius_km):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        num_cells, rows = strategy(db, ORIGIN[0], ORIGIN[1], radius_km)
+        matches = sum(1 for row in rows if haversine_km(ORIGIN[0], ORIGIN[1], row.latitude, row.longitude) <= radius_km)
+        timings.append(time.perf_counter() - start)
+    return num_cells, len(rows), matches, sorted(timings)[len(timings) // 2]
+
+
+def main():
+    num_jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f"Seeding {num_jobs} jobs into {DB_PATH} ...")
+    seed(num_jobs)
+    db = SessionLocal()
+    try:
+        all_jobs = db.query(Job.latitude, Job.longitude).all()
+        print(f"{'radius':>8} {'strategy':>8} {'cells':>8} {'rows':>8} {'matches':>8} {'median ms':>10}")
+        for radius_km in RADII_KM:
+            # Full-scan ground truth; both strategies must find exactly these jobs
+            exact = sum(1 for row in all_jobs if haversine_km(ORIGIN[0], ORIGIN[1], row.latitude, row.longitude) <= radius_km)
+            print(f"{radius_km:>8} {'scan':>8} {'-':>8} {len(all_jobs):>8} {exact:>8} {'-':>10}")
+            for name, strategy in (("flat", flat_strategy), ("compact", compact_strategy)):
+                num_cells, num_rows, matches, median = run(strategy, db, radius_km)
+                print(f"{radius_km:>8} {name:>8} {num_cells:>8} {num_rows:>8} {matches:>8} {median * 1000:>10.1f}")
+    finally:
+        db.close()
+        os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Pub/sub backplane that carries WebSocket frames between API processes.
+
+Each process subscribes to the worker ids it holds sockets for, and a published frame
+goes only to the processes subscribed to that worker. Two implementations ship:
+
+- InProcessBackplane: single process (the default); publish hands the frame straight
+  to the local hub.
+- UnixSocketBackplane: any number of uvicorn workers or containers on one host, all
+  connected to a small broker listening on a Unix socket. Start the broker with
+
+      python -m core.backplane [socket path]
+
+The wire protocol is newline-delimited JSON:
+    client -> broker  {"op": "sub" | "unsub", "worker_id": 1}
+                      {"op": "pub", "id": 7, "worker_id": 1, "message": "...", "seq": 42}
+    broker -> client  {"op": "deliver", "worker_id": 1, "message": "...", "seq": 42}
+                      {"op": "ack", "id": 7, "routed": 2}
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+BACKPLANE = os.environ.get("WORKBEE_BACKPLANE", "inprocess")  # "inprocess" or "unix"
+BACKPLANE_PATH = os.environ.get("WORKBEE_BACKPLANE_PATH", "/tmp/workbee-backplane.sock")
+BACKPLANE_RECONNECT_SECONDS = 1.0
+# Largest frame a single protocol line may carry
+MAX_LINE_BYTES = 4 * 1024 * 1024
+
+
+class BackplaneUnavailable(ConnectionError):
+    pass
+
+
+def _encode(frame):
+    return (json.dumps(frame, separators=(",", ":")) + "\n").encode()
+
+
+class InProcessBackplane:
+    """Backplane for a single process: every published frame is delivered locally"""
+
+    name = "inprocess"
+
+    def __init__(self):
+        self.on_deliver = None
+        self.published = 0
+
+    async def start(self, on_deliver):
+        self.on_deliver = on_deliver
+
+    async def stop(self):
+        pass
+
+    def subscribe(self, worker_id):
+        pass
+
+    def unsubscribe(self, worker_id):
+        pass
+
+    async def publish(self, worker_id, message, seq=None):
+        """Deliver a frame to every process holding a socket for worker_id; returns how many processes"""
+        self.published += 1
+        return 1 if self.on_deliver(worker_id, message, seq) else 0
+
+    def stats(self):
+        return {"type": self.name, "published": self.published}
+
+
+class UnixSocketBackplane:
+    """
+    Client side of the Unix-socket broker.
+
+    Subscriptions are kept locally and replayed whenever the broker connection is
+    re-established. Publishing while disconnected raises BackplaneUnavailable so callers
+    such as the outbox relay can retry later.
+    """
+
+    name = "unix"
+
+    def __init__(self, path=BACKPLANE_PATH):
+        self.path = path
+        self.on_deliver = None
+        self._subscriptions = set()
+        self._writer = None
+        self._pending = {}  # publish id -> future resolved by the broker's ack
+        self._next_id = 0
+        self._task = None
+        self._connected = asyncio.Event()
+        self.published = 0
+        self.delivered = 0
+        self.reconnects = 0
+
+    async def start(self, on_deliver):
+        self.on_deliver = on_deliver
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), BACKPLANE_RECONNECT_SECONDS * 5)
+        except asyncio.TimeoutError:
+            logger.warning(f"[Backplane] Broker at {self.path} not reachable yet, will keep retrying")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _send(self, frame):
+        if self._writer is not None:
+            self._writer.write(_encode(frame))
+
+    def subscribe(self, worker_id):
+        self._subscriptions.add(worker_id)
+        self._send({"op": "sub", "worker_id": worker_id})
+
+    def unsubscribe(self, worker_id):
+        self._subscriptions.discard(worker_id)
+        self._send({"op": "unsub", "worker_id": worker_id})
+
+    async def publish(self, worker_id, message, seq=None):
+        """Route a frame through the broker; returns how many processes it was delivered to"""
+        if self._writer is None:
+            raise BackplaneUnavailable(f"Backplane broker at {self.path} is not connected")
+        self._next_id += 1
+        publish_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[publish_id] = future
+        self._send({"op": "pub", "id": publish_id, "worker_id": worker_id, "message": message, "seq": seq})
+        self.published += 1
+        try:
+            await self._writer.drain()
+            return await future
+        finally:
+            self._pending.pop(publish_id, None)
+
+    async def _run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=MAX_LINE_BYTES)
+            except OSError as e:
+                logger.debug(f"[Backplane] Connect to {self.path} failed: {e}")
+                await asyncio.sleep(BACKPLANE_RECONNECT_SECONDS)
+                continue
+            self._writer = writer
+            for worker_id in self._subscriptions:
+                self._send({"op": "sub", "worker_id": worker_id})
+            self._connected.set()
+            logger.info(f"[Backplane] Connected to broker at {self.path} with {len(self._subscriptions)} subscriptions")
+            try:
+                await self._read_loop(reader)
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                logger.warning(f"[Backplane] Lost broker connection: {e!r}")
+            finally:
+                self._writer = None
+                self._connected.clear()
+                writer.close()
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(BackplaneUnavailable("Backplane broker connection lost"))
+            self.reconnects += 1
+            await asyncio.sleep(BACKPLANE_RECONNECT_SECONDS)
+
+    async def _read_loop(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            frame = json.loads(line)
+            if frame["op"] == "deliver":
+                self.delivered += 1
+                self.on_deliver(frame["worker_id"], frame["message"], frame.get("seq"))
+            elif frame["op"] == "ack":
+                future = self._pending.get(frame["id"])
+                if future is not None and not future.done():
+                    future.set_result(frame["routed"])
+
+    def stats(self):
+        return {
+            "type": self.name,
+            "path": self.path,
+            "connected": self._writer is not None,
+            "subscriptions": len(self._subscriptions),
+            "published": self.published,
+            "delivered": self.delivered,
+            "pending_acks": len(self._pending),
+            "reconnects": self.reconnects,
+        }
+
+
+class BackplaneBroker:
+    """Routes published frames to the clients subscribed to the target worker id"""
+
+    def __init__(self, path=BACKPLANE_PATH):
+        self.path = path
+        self._subscribers = {}  # worker id -> set of client writers
+
+    async def serve_forever(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self._handle_client, self.path, limit=MAX_LINE_BYTES)
+        logger.info(f"[Backplane] Broker listening on {self.path}")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_client(self, reader, writer):
+        subscribed = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                frame = json.loads(line)
+                op = frame["op"]
+                if op == "sub":
+                    self._subscribers.setdefault(frame["worker_id"], set()).add(writer)
+                    subscribed.add(frame["worker_id"])
+                elif op == "unsub":
+                    self._drop(frame["worker_id"], writer)
+                    subscribed.discard(frame["worker_id"])
+                elif op == "pub":
+                    targets = self._subscribers.get(frame["worker_id"], ())
+                    deliver = _encode({"op": "deliver", "worker_id": frame["worker_id"], "message": frame["message"],
+                                       "seq": frame.get("seq")})
+                    for target in targets:
+                        target.write(deliver)
+                    writer.write(_encode({"op": "ack", "id": frame["id"], "routed": len(targets)}))
+                    await writer.drain()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"[Backplane] Dropping client: {e!r}")
+        finally:
+            for worker_id in subscribed:
+                self._drop(worker_id, writer)
+            writer.close()
+
+    def _drop(self, worker_id, writer):
+        writers = self._subscribers.get(worker_id)
+        if writers is not None:
+            writers.discard(writer)
+            if not writers:
+                del self._subscribers[worker_id]
+
+
+def build_backplane(kind=BACKPLANE):
+    if kind == "unix":
+        return UnixSocketBackplane()
+    return InProcessBackplane()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(BackplaneBroker(sys.argv[1] if len(sys.argv) > 1 else BACKPLANE_PATH).serve_forever())
@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from core.fcm_dispatch import PushMessage
+
+# FCM rows wait this long in the outbox so a burst of jobs for one worker goes out as one digest
+FCM_COALESCE_SECONDS = float(os.environ.get("WORKBEE_FCM_COALESCE_SECONDS", "30"))
+# At most one push per worker per interval, per relay process; later rows are deferred
+FCM_MIN_PUSH_INTERVAL_SECONDS = float(os.environ.get("WORKBEE_FCM_MIN_PUSH_INTERVAL_SECONDS", "60"))
+DIGEST_TITLES_SHOWN = 3
+
+
+class Deferred:
+    """Delivery outcome meaning "not now": the outbox row is rescheduled without using up an attempt"""
+
+    __slots__ = ("until",)
+
+    def __init__(self, until):
+        self.until = until
+
+
+def group_by_worker(batch):
+    """Group claimed outbox rows by worker id, keeping claim order within each group"""
+    groups = {}
+    for row in batch:
+        groups.setdefault(row[1], []).append(row)
+    return groups
+
+
+def build_push(payloads):
+    """One push for all pending payloads of a worker: the payload itself, or a digest for a burst"""
+    latest = payloads[-1]
+    if len(payloads) == 1:
+        return PushMessage(token=latest["token"], title=latest["title"], body=latest["body"], data=latest.get("data", {}))
+    titles = [payload.get("job_title") for payload in payloads if payload.get("job_title")]
+    body = ", ".join(titles[:DIGEST_TITLES_SHOWN])
+    if len(titles) > DIGEST_TITLES_SHOWN:
+        body += f" and {len(titles) - DIGEST_TITLES_SHOWN} more"
+    job_ids = [payload.get("data", {}).get("job_id") for payload in payloads]
+    return PushMessage(
+        token=latest["token"],
+        title=f"{len(payloads)} new jobs nearby",
+        body=body,
+        data={"type": "job_digest", "count": str(len(payloads)), "job_ids": ",".join(filter(None, job_ids))},
+    )
+
+
+class PushRateLimiter:
+    """Remembers when each worker was last pushed to and enforces FCM_MIN_PUSH_INTERVAL_SECONDS"""
+
+    def __init__(self, min_interval=FCM_MIN_PUSH_INTERVAL_SECONDS, max_entries=100000):
+        self.min_interval = min_interval
+        self.max_entries = max_entries
+        self._last_push = {}  # worker id -> time.monotonic() of the last push
+        self._lock = threading.Lock()
+
+    def acquire(self, worker_id):
+        """Reserve a push for worker_id; returns None if allowed now, else the datetime to retry at"""
+        if self.min_interval <= 0:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            last = self._last_push.get(worker_id)
+            if last is not None and now - last < self.min_interval:
+                return datetime.utcnow() + timedelta(seconds=self.min_interval - (now - last))
+            if len(self._last_push) >= self.max_entries:
+                self._last_push = {w: t for w, t in self._last_push.items() if now - t < self.min_interval}
+            self._last_push[worker_id] = now
+            return None
+
+    def release(self, worker_id):
+        """Forget a reservation whose push failed so the retry is not rate limited"""
+        with self._lock:
+            self._last_push.pop(worker_id, None)
@@ -0,0 +1,166 @@
+"""
+Connection pool settings and instrumentation for the database engines.
+
+Pool sizing, timeout, recycle and pre-ping come from the environment, so each deployment can
+size the pool to its uvicorn worker count and MySQL's max_connections. It needs roughly
+workers * (pool size + overflow) connections across all processes.
+
+Each engine's pool is wrapped to time how long checkouts wait for a free connection, and pool
+events count checkouts, new and overflow connections, and invalidations. A warning is logged
+(at most once per PoolMonitor.alert_interval) when a checkout waits longer than
+WORKBEE_DB_POOL_SLOW_CHECKOUT_MS or finds every connection of pool and overflow in use.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+DB_POOL_SIZE = int(os.environ.get("WORKBEE_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("WORKBEE_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("WORKBEE_DB_POOL_TIMEOUT", "30"))
+# Below MySQL's wait_timeout so the server never closes a connection the pool still holds
+DB_POOL_RECYCLE = int(os.environ.get("WORKBEE_DB_POOL_RECYCLE", "1800"))
+# "ping": test every connection on checkout; "none": rely on recycle and reconnect-on-error
+DB_POOL_PRE_PING = os.environ.get("WORKBEE_DB_POOL_PRE_PING", "ping")
+# Hand out the most recently used connection so surplus idle ones age out through recycle
+DB_POOL_USE_LIFO = os.environ.get("WORKBEE_DB_POOL_USE_LIFO", "true").lower() in ("1", "true", "yes")
+DB_POOL_SLOW_CHECKOUT_MS = float(os.environ.get("WORKBEE_DB_POOL_SLOW_CHECKOUT_MS", "100"))
+POOL_ALERT_INTERVAL_SECONDS = 60
+RECENT_WAITS = 1000
+
+PRE_PING_STRATEGIES = ("ping", "none")
+
+
+def pool_options(url):
+    """create_engine keyword arguments for the configured pool"""
+    if DB_POOL_PRE_PING not in PRE_PING_STRATEGIES:
+        raise ValueError(f"Unknown WORKBEE_DB_POOL_PRE_PING {DB_POOL_PRE_PING!r}, expected one of {PRE_PING_STRATEGIES}")
+    options = {"pool_pre_ping": DB_POOL_PRE_PING == "ping", "pool_recycle": DB_POOL_RECYCLE}
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite uses a single shared connection, there is nothing to size
+        return options
+    options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT,
+                   pool_use_lifo=DB_POOL_USE_LIFO)
+    return options
+
+
+class PoolMonitor:
+    def __init__(self, name, slow_checkout_ms=DB_POOL_SLOW_CHECKOUT_MS, alert_interval=POOL_ALERT_INTERVAL_SECONDS):
+        self.name = name
+        self.slow_checkout_seconds = slow_checkout_ms / 1000
+        self.alert_interval = alert_interval
+        self.pool = None
+        self._lock = threading.Lock()
+        self._recent_waits = deque(maxlen=RECENT_WAITS)
+        self._last_alert = 0.0
+        self.counters = {
+            "checkouts": 0, "checkins": 0, "connects": 0, "overflow_connects": 0, "invalidated": 0,
+            "timeouts": 0, "slow_checkouts": 0, "saturated_checkouts": 0,
+        }
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def attach(self, engine):
+        """Instrument engine's pool; call once, right after create_engine"""
+        self.pool = engine.pool
+        monitor = self
+        pool_class = type(engine.pool)
+
+        class InstrumentedPool(pool_class):
+            # A subclass rather than a patched instance, so a pool recreated by dispose() keeps it
+            def _do_get(self):
+                started = time.perf_counter()
+                try:
+                    connection = super()._do_get()
+                except exc.TimeoutError:
+                    monitor._count("timeouts")
+                    monitor._alert(f"checkout timed out after {time.perf_counter() - started:.1f}s")
+                    raise
+                monitor._record_wait(time.perf_counter() - started)
+                return connection
+
+        InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+        engine.pool.__class__ = InstrumentedPool
+        event.listen(engine, "engine_connect", self._track_pool)
+        event.listen(engine.pool, "checkout", self._on_checkout)
+        event.listen(engine.pool, "checkin", lambda *args: self._count("checkins"))
+        event.listen(engine.pool, "connect", self._on_connect)
+        event.listen(engine.pool, "invalidate", lambda *args: self._count("invalidated"))
+        return self
+
+    def _track_pool(self, connection):
+        # dispose() swaps in a new pool; keep reading sizes from the live one
+        self.pool = connection.engine.pool
+
+    def _on_checkout(self, dbapi_connection, record, proxy):
+        self._count("checkouts")
+        if self._capacity() is not None and self.pool.checkedout() >= self._capacity():
+            self._count("saturated_checkouts")
+            self._alert(f"all {self._capacity()} connections in use")
+
+    def _on_connect(self, dbapi_connection, record):
+        self._count("connects")
+        if getattr(self.pool, "overflow", None) and self.pool.overflow() > 0:
+            self._count("overflow_connects")
+
+    def _record_wait(self, seconds):
+        with self._lock:
+            self._recent_waits.append(seconds)
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+        if seconds >= self.slow_checkout_seconds:
+            self._count("slow_checkouts")
+            self._alert(f"checkout waited {seconds * 1000:.0f}ms for a free connection")
+
+    def _alert(self, message):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_alert < self.alert_interval:
+                return
+            self._last_alert = now
+        logger.warning(f"[DB pool:{self.name}] Saturated: {message} ({self._describe()}); "
+                       f"consider raising WORKBEE_DB_POOL_SIZE / WORKBEE_DB_MAX_OVERFLOW")
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _capacity(self):
+        if not hasattr(self.pool, "size") or not hasattr(self.pool, "_max_overflow"):
+            return None
+        if self.pool._max_overflow < 0:
+            return None  # unlimited overflow
+        return self.pool.size() + self.pool._max_overflow
+
+    def _describe(self):
+        return getattr(self.pool, "status", lambda: type(self.pool).__name__)()
+
+    def stats(self):
+        pool = self.pool
+        with self._lock:
+            waits = sorted(self._recent_waits)
+            checkouts = self.counters["checkouts"]
+            stats = dict(self.counters)
+            stats["wait_ms"] = {
+                "avg": round(self.wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "max": round(self.wait_max * 1000, 3),
+                "p95_recent": round(waits[int(len(waits) * 0.95)] * 1000, 3) if waits else 0.0,
+            }
+        if hasattr(pool, "checkedout"):
+            stats.update(
+                pool_size=pool.size(),
+                max_overflow=pool._max_overflow,
+                in_use=pool.checkedout(),
+                idle=pool.checkedin(),
+                overflow=max(0, pool.overflow()),
+                capacity=self._capacity(),
+            )
+        stats["pool"] = type(pool).__name__
+        return stats
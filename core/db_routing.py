@@ -0,0 +1,213 @@
+"""
+Read-replica routing for read-only dependencies.
+
+WORKBEE_DATABASE_REPLICA_URLS lists replicas of the primary (comma-separated sync URLs).
+get_read_db and get_async_read_db in core.database hand out a RoutingSession bound to one
+healthy replica, picked round-robin. The session still sends flushes and INSERT/UPDATE/DELETE
+statements to the primary. Requests go to the primary instead when:
+
+- no replica is configured or every replica is marked down;
+- the client wrote something in the last WORKBEE_DB_REPLICA_STICKY_SECONDS, so its next reads
+  see its own write even while the replicas lag behind. After a successful
+  POST/PUT/PATCH/DELETE, this process remembers who wrote: the bearer token's subject, the
+  ids in the path (worker_id, owner_id, ...) and the ids the route declared with
+  declare_sticky_keys (the owner of a job created from a request body, ...). A later read
+  that shares any of them goes to the primary. That covers mobile and plain HTTP clients that drop cookies. The response also
+  sets the READ_YOUR_WRITES_COOKIE, which covers a read that lands on another uvicorn worker
+  process. Only clients that send the cookie back get that extra coverage.
+
+A replica that fails to connect, or drops its connection, is marked down for
+WORKBEE_DB_REPLICA_RETRY_SECONDS. The read that hit the failed connect retries on the next
+replica, then on the primary.
+
+To try it locally, copy the SQLite database and point a replica at the copy:
+
+    cp workbee.db workbee_replica.db
+    WORKBEE_DATABASE_URL=sqlite:///workbee.db WORKBEE_DATABASE_REPLICA_URLS=sqlite:///workbee_replica.db uvicorn main:app
+"""
+import logging
+import os
+import threading
+import time
+
+from jose import JWTError, jwt
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+DB_REPLICA_URLS = [url.strip() for url in os.environ.get("WORKBEE_DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DB_REPLICA_RETRY_SECONDS = float(os.environ.get("WORKBEE_DB_REPLICA_RETRY_SECONDS", "30"))
+# Longer than the replication lag you expect under load
+DB_REPLICA_STICKY_SECONDS = float(os.environ.get("WORKBEE_DB_REPLICA_STICKY_SECONDS", "5"))
+READ_YOUR_WRITES_COOKIE = "workbee_primary_until"
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+# Path parameters that identify whose data a request touches; aliases share one key
+STICKY_PATH_PARAMS = {
+    "user_id": "user", "worker_id": "worker", "owner_id": "business_owner", "business_owner_id": "business_owner",
+    "job_id": "job", "application_id": "application",
+}
+STICKY_MAX_ENTRIES = 100000
+
+
+def declare_sticky_keys(request, **ids):
+    """
+    Pin ids a write touches outside its path, named like STICKY_PATH_PARAMS, e.g.
+    declare_sticky_keys(request, business_owner_id=job.business_owner_id, job_id=job.id)
+    """
+    keys = getattr(request.state, "sticky_keys", [])
+    keys += [(STICKY_PATH_PARAMS[name], str(value)) for name, value in ids.items() if value is not None]
+    request.state.sticky_keys = keys
+
+
+def sticky_keys(request):
+    """Who a request reads or writes as: the bearer token's subject, the ids in its path and any it declared"""
+    keys = [(STICKY_PATH_PARAMS[name], str(value)) for name, value in request.path_params.items()
+            if name in STICKY_PATH_PARAMS]
+    keys += getattr(request.state, "sticky_keys", [])
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            # Only routes reads, never grants access, so the signature is left to the routes
+            subject = jwt.get_unverified_claims(token).get("sub")
+        except JWTError:
+            subject = None
+        if subject:
+            keys.append(("sub", str(subject)))
+    return keys
+
+
+class Replica:
+    def __init__(self, name, url, engine, async_engine=None):
+        self.name = name
+        self.url = url
+        self.engine = engine
+        self.async_engine = async_engine
+        self.down_until = 0.0
+        self.reads = 0
+        self.failures = 0
+        # Dropped connections on either engine take the replica out of rotation
+        for sync_engine in filter(None, (engine, async_engine and async_engine.sync_engine)):
+            event.listen(sync_engine, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect:
+            replica_set.mark_down(self, context.original_exception)
+
+
+class ReplicaSet:
+    def __init__(self, retry_seconds=DB_REPLICA_RETRY_SECONDS, sticky_seconds=DB_REPLICA_STICKY_SECONDS):
+        self.retry_seconds = retry_seconds
+        self.sticky_seconds = sticky_seconds
+        self.replicas = []
+        self._lock = threading.Lock()
+        self._next = 0
+        self._pinned = {}  # sticky key -> time.monotonic() until which its reads use the primary
+        self.counters = {"primary_reads": 0, "sticky_reads": 0, "fallbacks": 0}
+
+    @property
+    def enabled(self):
+        return bool(self.replicas)
+
+    def add(self, replica):
+        self.replicas.append(replica)
+
+    def candidates(self, request=None):
+        """Healthy replicas to try in order, starting at the round-robin position; empty means read the primary"""
+        if request is not None and self.is_sticky(request):
+            self._count("sticky_reads")
+            return []
+        now = time.monotonic()
+        with self._lock:
+            start, self._next = self._next, self._next + 1
+            healthy = [replica for replica in self.replicas if replica.down_until <= now]
+        if not healthy:
+            self._count("primary_reads")
+            return []
+        start %= len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    def is_sticky(self, request):
+        try:
+            if float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time():
+                return True
+        except ValueError:
+            pass
+        keys = sticky_keys(request)
+        if not keys:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            return any(self._pinned.get(key, 0) > now for key in keys)
+
+    def pin(self, request):
+        """Send reads sharing any of the request's sticky keys to the primary for sticky_seconds"""
+        keys = sticky_keys(request)
+        if not keys:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._pinned) >= STICKY_MAX_ENTRIES:
+                self._pinned = {key: until for key, until in self._pinned.items() if until > now}
+            for key in keys:
+                self._pinned[key] = now + self.sticky_seconds
+
+    def mark_used(self, replica):
+        with self._lock:
+            replica.reads += 1
+
+    def mark_down(self, replica, error):
+        now = time.monotonic()
+        with self._lock:
+            if replica.down_until > now:
+                return  # already reported by the other hook
+            replica.failures += 1
+            replica.down_until = now + self.retry_seconds
+        logger.warning(f"[DB] Replica {replica.name} unavailable, reading from other replicas or the primary "
+                       f"for {self.retry_seconds:.0f}s: {error}")
+
+    def fell_back(self):
+        self._count("fallbacks")
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return dict(self.counters, pinned_keys=len(self._pinned), replicas={
+                replica.name: {
+                    "url": make_url(replica.url).render_as_string(hide_password=True),
+                    "healthy": replica.down_until <= now,
+                    "reads": replica.reads,
+                    "failures": replica.failures,
+                }
+                for replica in self.replicas
+            })
+
+
+replica_set = ReplicaSet()
+
+
+class RoutingSession(Session):
+    """Session that reads through `replica` when one is set; flushes and DML always use the primary"""
+
+    replica = None  # sync Engine for reads, None reads the primary
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replica is not None and not self._flushing and not getattr(clause, "is_dml", False):
+            return self.replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+async def read_your_writes_middleware(request, call_next):
+    """Pin a client's reads to the primary for a few seconds after each of its successful writes"""
+    response = await call_next(request)
+    if replica_set.enabled and request.method in WRITE_METHODS and response.status_code < 400:
+        # Routing has filled in the path parameters, and the route its declared keys, by now
+        replica_set.pin(request)
+        response.set_cookie(READ_YOUR_WRITES_COOKIE, f"{time.time() + replica_set.sticky_seconds:.3f}",
+                            max_age=max(1, round(replica_set.sticky_seconds)), httponly=True, samesite="lax")
+    return response
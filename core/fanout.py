@@ -0,0 +1,170 @@
+import logging
+import os
+from datetime import datetime
+
+import h3
+from sqlalchemy import insert, select, literal, false
+from sqlalchemy.exc import IntegrityError
+
+from core.coalescer import FCM_COALESCE_SECONDS
+from core.fcm_topics import FCM_FANOUT, topic_conditions
+from core.notification_templates import NOTIFICATION_NEW_JOB_NEARBY, render
+from core.outbox import enqueue_outbox, TOPIC_OUTBOX_WORKER_ID
+from core.spatial_index import worker_index
+from models.notification import Notification
+from models.worker import Worker
+
+logger = logging.getLogger(__name__)
+
+# Rows per multi-row INSERT statement
+NOTIFICATION_INSERT_CHUNK = int(os.environ.get("WORKBEE_NOTIFICATION_INSERT_CHUNK", "1000"))
+# Select the recipients in an INSERT ... SELECT over the indexed worker cells instead of from the
+# worker index. This only moves the notification INSERT into the database: the outbox rows carry
+# a per-row JSON payload (frame with seq, token), which has no portable SQL form across MySQL and
+# SQLite, so fan_out_new_job still reads the new rows back, with the tokens from workers.
+FANOUT_INSERT_SELECT = os.environ.get("WORKBEE_FANOUT_INSERT_SELECT", "false").lower() in ("1", "true", "yes")
+
+
+def nearby_recipients(db, cells):
+    """(worker_id, fcm_token) for workers located in any of the cells"""
+    if worker_index.ready:
+        # In-memory cell -> worker lookup, no workers table access on the hot path
+        return worker_index.workers_in_cells(cells)
+    # Index not loaded yet: single indexed lookup on the precomputed worker cells
+    return db.query(Worker.id, Worker.fcm_token).filter(Worker.h3_cell.in_(cells)).all()
+
+
+def unique_tokens(recipients):
+    """(worker_id, fcm_token) pairs with a token, one per token: a device shared by stale worker rows gets one push"""
+    seen = set()
+    for worker_id, fcm_token in recipients:
+        if fcm_token and fcm_token not in seen:
+            seen.add(fcm_token)
+            yield worker_id, fcm_token
+
+
+def insert_notifications(db, job_id, worker_ids, type_code, created_at):
+    """
+    Write one notification per worker with multi-row INSERTs of NOTIFICATION_INSERT_CHUNK rows;
+    returns the worker ids written.
+
+    The ids come straight from the worker index, so the hot path never reads workers. A worker
+    another process deleted since the last reconcile fails the notifications.worker_id foreign
+    key: only then is the chunk checked against workers, written without the missing ids, and
+    those ids evicted from the index, so a stale index never fails the job post.
+    """
+    worker_ids = list(worker_ids)
+    written = []
+    for start in range(0, len(worker_ids), NOTIFICATION_INSERT_CHUNK):
+        chunk = worker_ids[start:start + NOTIFICATION_INSERT_CHUNK]
+        try:
+            with db.begin_nested():
+                db.execute(insert(Notification).values(_notification_rows(chunk, job_id, type_code, created_at)))
+        except IntegrityError:
+            existing = set(db.scalars(select(Worker.id).where(Worker.id.in_(chunk))))
+            for worker_id in set(chunk) - existing:
+                worker_index.remove(worker_id)
+            logger.info(f"[H3] Skipped {len(chunk) - len(existing)} deleted workers still in the index for job {job_id}")
+            chunk = [worker_id for worker_id in chunk if worker_id in existing]
+            if chunk:
+                db.execute(insert(Notification).values(_notification_rows(chunk, job_id, type_code, created_at)))
+        written += chunk
+    return written
+
+
+def _notification_rows(worker_ids, job_id, type_code, created_at):
+    return [
+        {"worker_id": worker_id, "job_id": job_id, "type_code": type_code, "is_read": False, "created_at": created_at}
+        for worker_id in worker_ids
+    ]
+
+
+def insert_notifications_for_cells(db, job_id, cells, type_code, created_at):
+    """Write one notification per worker in the cells with a single INSERT ... SELECT"""
+    workers_in_cells = select(
+        Worker.id, literal(job_id), literal(type_code), false(), literal(created_at)
+    ).where(Worker.h3_cell.in_(cells))
+    db.execute(
+        insert(Notification).from_select(
+            ["worker_id", "job_id", "type_code", "is_read", "created_at"], workers_in_cells
+        )
+    )
+
+
+def notification_frame(notification_id, job_id, type_code, message, is_read, created_at):
+    """WebSocket payload for one notification; seq is the notification id, which clients echo back as last_seen_id"""
+    return {
+        "id": notification_id,
+        "seq": notification_id,
+        "job_id": job_id,
+        "type_code": type_code,
+        "message": message,
+        "is_read": is_read,
+        "created_at": created_at.isoformat() if created_at else None
+    }
+
+
+def fan_out_new_job(db, job):
+    """
+    Notify workers around a newly posted job.
+
+    Writes the notification rows and their WebSocket/FCM outbox rows in the caller's
+    transaction; delivery happens in the outbox relay once the caller commits.
+    """
+    if job.h3_cell is None:
+        return []
+    cells = list(h3.grid_disk(job.h3_cell, 1))
+    created_at = datetime.utcnow()
+
+    # Rows carry only the type code; the text is rendered on read and once here for delivery
+    if FANOUT_INSERT_SELECT:
+        insert_notifications_for_cells(db, job.id, cells, NOTIFICATION_NEW_JOB_NEARBY, created_at)
+        # The database picked the recipients: read the new rows back (the job is new, so its rows
+        # are exactly these) with the tokens to push to
+        notified = (
+            db.query(Notification.worker_id, Notification.id, Worker.fcm_token)
+            .join(Worker, Worker.id == Notification.worker_id)
+            .filter(Notification.job_id == job.id)
+            .all()
+        )
+    else:
+        recipients = nearby_recipients(db, cells)
+        if not insert_notifications(db, job.id, [worker_id for worker_id, _ in recipients],
+                                    NOTIFICATION_NEW_JOB_NEARBY, created_at):
+            return []
+        # Only the new ids are read back, to stamp frames with seq; the tokens are the index's
+        tokens = dict(recipients)
+        notified = [
+            (worker_id, notification_id, tokens[worker_id])
+            for worker_id, notification_id in db.query(Notification.worker_id, Notification.id)
+            .filter(Notification.job_id == job.id)
+        ]
+    worker_ids = [worker_id for worker_id, _, _ in notified]
+    message = render(NOTIFICATION_NEW_JOB_NEARBY, job_title=job.title)
+    fcm_payload = {
+        "title": "New Job Nearby!",
+        "body": f"New job: {job.title}",
+        "data": {"job_id": str(job.id)},
+        "job_title": job.title
+    }
+    enqueue_outbox(db, "ws", (
+        (worker_id, notification_frame(notification_id, job.id, NOTIFICATION_NEW_JOB_NEARBY, message, False, created_at))
+        for worker_id, notification_id, _ in notified
+    ))
+    if FCM_FANOUT == "topic":
+        # A few condition pushes to the cells' topics, however many workers live there
+        enqueue_outbox(db, "fcm_topic", (
+            (TOPIC_OUTBOX_WORKER_ID, dict(fcm_payload, condition=condition)) for condition in topic_conditions(cells)
+        ))
+        logger.info(f"[H3] Notifying {len(worker_ids)} workers for job {job.id} via {len(cells)} cell topics")
+        return worker_ids
+    # Held back for the coalescing window so a posting burst reaches each worker as one digest push;
+    # notification_id lets the relay skip workers whose socket acked the frame in the meantime
+    notification_by_worker = {worker_id: notification_id for worker_id, notification_id, _ in notified}
+    enqueue_outbox(db, "fcm", (
+        (worker_id, dict(fcm_payload, token=fcm_token, notification_id=notification_by_worker[worker_id],
+                         created_at=created_at.isoformat()))
+        for worker_id, fcm_token in unique_tokens((worker_id, fcm_token) for worker_id, _, fcm_token in notified)
+    ), delay_seconds=FCM_COALESCE_SECONDS)
+    logger.info(f"[H3] Notifying {len(worker_ids)} workers for job {job.id}")
+    return worker_ids
@@ -2,6 +2,7 @@ import firebase_admin
 from firebase_admin import credentials, messaging
 import os
 import logging
+from core.fcm_dispatch import fcm_dispatcher, classify_error, ERROR_DEAD_TOKEN
 
 # Path to your service account key file
 SERVICE_ACCOUNT_PATH = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS", "firebase-service-account.json")
@@ -27,4 +28,7 @@ def send_fcm_notification(token, title, body, data=None):
         return response
     except Exception as e:
         logging.error(f"[FCM] Error sending notification: {e}")
+        if classify_error(e) == ERROR_DEAD_TOKEN:
+            # Queued for clearing from the workers table; later pushes to it are skipped
+            fcm_dispatcher.report_dead_token(token, type(e).__name__)
         return str(e) 
\ No newline at end of file
@@ -0,0 +1,363 @@
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+FCM_TRANSPORT = os.environ.get("WORKBEE_FCM_TRANSPORT", "firebase")  # "firebase" or "fake"
+FCM_QUEUE_SIZE = int(os.environ.get("WORKBEE_FCM_QUEUE_SIZE", "50000"))
+FCM_SENDERS = int(os.environ.get("WORKBEE_FCM_SENDERS", "4"))
+FCM_BATCH_SIZE = 500  # messaging.send_each accepts at most 500 messages per call
+FCM_BATCH_LINGER_SECONDS = float(os.environ.get("WORKBEE_FCM_BATCH_LINGER_SECONDS", "0.05"))
+FCM_TOPIC_BATCH_SIZE = 1000  # messaging.subscribe_to_topic accepts at most 1000 tokens per call
+# Tokens FCM reported as dead are remembered so already-queued pushes to them are skipped
+FCM_DEAD_TOKEN_MEMORY = int(os.environ.get("WORKBEE_FCM_DEAD_TOKEN_MEMORY", "100000"))
+
+# Failure kinds, see classify_error
+ERROR_DEAD_TOKEN = "dead_token"
+ERROR_TRANSIENT = "transient"
+ERROR_OTHER = "other"
+# firebase_admin.messaging exception classes, matched by name so the fake transport needs no Firebase
+DEAD_TOKEN_ERRORS = {"UnregisteredError", "SenderIdMismatchError"}
+TRANSIENT_ERRORS = {"QuotaExceededError", "UnavailableError", "InternalError", "DeadlineExceededError"}
+
+
+@dataclass
+class PushMessage:
+    token: Optional[str]
+    title: str
+    body: str
+    data: dict = field(default_factory=dict)
+    # Topic condition such as "'cell_a' in topics || 'cell_b' in topics"; set instead of token
+    condition: Optional[str] = None
+
+
+@dataclass
+class SendResult:
+    success: bool
+    message_id: Optional[str] = None
+    exception: Optional[Exception] = None
+    error_kind: Optional[str] = None
+
+
+class UnregisteredError(Exception):
+    """Raised for the fake transport's dead_tokens; named like the firebase_admin error it stands in for"""
+
+
+class DeadTokenSkipped(Exception):
+    """Result for a push that was not sent because FCM already rejected its token"""
+
+
+def classify_error(exception):
+    """
+    ERROR_DEAD_TOKEN when FCM will never deliver to the token again (unregistered app
+    instance, token from another sender, malformed token), ERROR_TRANSIENT when a retry may
+    succeed, ERROR_OTHER for everything else.
+    """
+    name = type(exception).__name__
+    if name in DEAD_TOKEN_ERRORS or isinstance(exception, DeadTokenSkipped):
+        return ERROR_DEAD_TOKEN
+    if name == "InvalidArgumentError" and "registration token" in str(exception).lower():
+        return ERROR_DEAD_TOKEN
+    if name in TRANSIENT_ERRORS or isinstance(exception, (TimeoutError, ConnectionError)):
+        return ERROR_TRANSIENT
+    return ERROR_OTHER
+
+
+class FirebaseTransport:
+    """Sends through firebase_admin.messaging.send_each"""
+
+    def send_each(self, messages):
+        from firebase_admin import messaging
+        import core.fcm  # noqa: F401 - initializes the Firebase app on first use
+
+        response = messaging.send_each([
+            messaging.Message(
+                notification=messaging.Notification(title=m.title, body=m.body),
+                token=m.token,
+                condition=m.condition,
+                data={key: str(value) for key, value in m.data.items()},
+            )
+            for m in messages
+        ])
+        return [SendResult(r.success, r.message_id, r.exception) for r in response.responses]
+
+    def subscribe_to_topic(self, tokens, topic):
+        """Returns the indexes of tokens that could not be subscribed"""
+        from firebase_admin import messaging
+        import core.fcm  # noqa: F401
+
+        return [error.index for error in messaging.subscribe_to_topic(tokens, topic).errors]
+
+    def unsubscribe_from_topic(self, tokens, topic):
+        from firebase_admin import messaging
+        import core.fcm  # noqa: F401
+
+        return [error.index for error in messaging.unsubscribe_from_topic(tokens, topic).errors]
+
+
+class FakeTransport:
+    """
+    Local stand-in for Firebase: records messages and simulates per-call latency.
+
+    Topic subscriptions are kept in memory, and a condition message counts the tokens it
+    would reach in topic_deliveries.
+    """
+
+    def __init__(self, latency_seconds=0.0, fail_tokens=(), dead_tokens=()):
+        self.latency_seconds = latency_seconds
+        self.fail_tokens = set(fail_tokens)
+        self.dead_tokens = set(dead_tokens)
+        self.sent = []
+        self.calls = 0
+        self.topics = {}  # topic -> set of subscribed tokens
+        self.topic_calls = 0
+        self.topic_deliveries = 0
+        self._lock = threading.Lock()
+
+    def send_each(self, messages):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        results = []
+        with self._lock:
+            self.calls += 1
+            for m in messages:
+                if m.token in self.fail_tokens:
+                    results.append(SendResult(False, exception=ValueError(f"Fake send failure for token {m.token}")))
+                elif m.token in self.dead_tokens:
+                    results.append(SendResult(False, exception=UnregisteredError("Requested entity was not found.")))
+                else:
+                    self.sent.append(m)
+                    if m.condition:
+                        self.topic_deliveries += len(self.condition_tokens(m.condition))
+                    results.append(SendResult(True, message_id=f"fake-{self.calls}-{len(self.sent)}"))
+        return results
+
+    def condition_tokens(self, condition):
+        """Tokens reached by an OR-only topic condition"""
+        tokens = set()
+        for topic in re.findall(r"'([^']+)' in topics", condition):
+            tokens |= self.topics.get(topic, set())
+        return tokens
+
+    def subscribe_to_topic(self, tokens, topic):
+        with self._lock:
+            self.topic_calls += 1
+            failed = [index for index, token in enumerate(tokens) if token in self.fail_tokens]
+            self.topics.setdefault(topic, set()).update(t for t in tokens if t not in self.fail_tokens)
+        return failed
+
+    def unsubscribe_from_topic(self, tokens, topic):
+        with self._lock:
+            self.topic_calls += 1
+            members = self.topics.get(topic, set())
+            members.difference_update(tokens)
+            if not members:
+                self.topics.pop(topic, None)
+        return []
+
+
+def build_transport(name=FCM_TRANSPORT):
+    if name == "fake":
+        return FakeTransport()
+    if name == "firebase":
+        return FirebaseTransport()
+    raise ValueError(f"Unknown FCM transport: {name}")
+
+
+class FCMDispatcher:
+    """
+    Batched FCM sends with per-batch deduplication and dead-token tracking.
+
+    The outbox relay calls send_batch() from its own threads, so the app does not start
+    the sender pool. start() and enqueue() add a bounded in-memory queue drained by
+    sender threads, each grouping what is queued (up to FCM_BATCH_SIZE) into a single
+    transport.send_each call; enqueue() never blocks and drops, counting, when the queue
+    is full. The fcm_dispatch benchmark drives that path.
+
+    Within a batch, identical messages to the same token are sent once. Tokens FCM rejects
+    as dead are remembered and skipped from then on, and each is passed once to
+    on_dead_token (core.fcm_tokens clears them from the workers table).
+    """
+
+    def __init__(self, transport, queue_size=FCM_QUEUE_SIZE, senders=FCM_SENDERS,
+                 batch_size=FCM_BATCH_SIZE, linger_seconds=FCM_BATCH_LINGER_SECONDS):
+        self.transport = transport
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self.num_senders = senders
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._recent_sends = deque()  # (timestamp, count) for the throughput window
+        self._dead_tokens = OrderedDict()  # token -> None, oldest first
+        self.on_dead_token = None
+        self.started_at = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+        self.batches = 0
+        self.deduplicated = 0
+        self.skipped_dead = 0
+        self.failures_by_kind = {ERROR_DEAD_TOKEN: 0, ERROR_TRANSIENT: 0, ERROR_OTHER: 0}
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+        self.started_at = time.time()
+        for i in range(self.num_senders):
+            thread = threading.Thread(target=self._run, name=f"fcm-sender-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=10.0):
+        """Stop the senders after they drain what is already queued (bounded by timeout)"""
+        deadline = time.monotonic() + timeout
+        while not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def enqueue(self, message):
+        """Queue a message for delivery; returns False if it was dropped because the queue is full"""
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            logger.warning(f"[FCM] Dispatch queue full, dropping message for token {message.token}")
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.linger_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def send_batch(self, batch):
+        """Deliver one batch synchronously and update the counters; returns per-message results"""
+        results = [None] * len(batch)
+        first_index = {}  # message key -> index of the copy that is actually sent
+        duplicates = []
+        with self._lock:
+            for index, message in enumerate(batch):
+                if message.token is not None and message.token in self._dead_tokens:
+                    results[index] = SendResult(False, exception=DeadTokenSkipped("FCM token was already rejected"),
+                                                error_kind=ERROR_DEAD_TOKEN)
+                    self.skipped_dead += 1
+                    continue
+                key = (message.token, message.condition, message.title, message.body,
+                       json.dumps(message.data, sort_keys=True, default=str))
+                if key in first_index:
+                    duplicates.append((index, first_index[key]))
+                else:
+                    first_index[key] = index
+        to_send = list(first_index.values())
+        if to_send:
+            try:
+                sent = self.transport.send_each([batch[index] for index in to_send])
+            except Exception as e:
+                logger.error(f"[FCM] Batch of {len(to_send)} failed: {e}")
+                sent = [SendResult(False, exception=e) for _ in to_send]
+            for index, result in zip(to_send, sent):
+                if not result.success and result.error_kind is None:
+                    result.error_kind = classify_error(result.exception)
+                results[index] = result
+        for index, original in duplicates:
+            results[index] = results[original]
+
+        succeeded = sum(1 for index in to_send if results[index].success)
+        dead = []
+        with self._lock:
+            self.batches += 1
+            self.sent += succeeded
+            self.failed += len(to_send) - succeeded
+            self.deduplicated += len(duplicates)
+            self._recent_sends.append((time.time(), succeeded))
+            for index in to_send:
+                result = results[index]
+                if result.success:
+                    continue
+                self.failures_by_kind[result.error_kind] += 1
+                if result.error_kind == ERROR_DEAD_TOKEN and batch[index].token is not None:
+                    dead.append((batch[index].token, type(result.exception).__name__))
+        for token, reason in dead:
+            self.report_dead_token(token, reason)
+        return results
+
+    def report_dead_token(self, token, reason):
+        """Remember a token FCM rejected and hand it to on_dead_token once; also used by direct sends"""
+        with self._lock:
+            if token in self._dead_tokens:
+                return
+            self._dead_tokens[token] = None
+            if len(self._dead_tokens) > FCM_DEAD_TOKEN_MEMORY:
+                self._dead_tokens.popitem(last=False)
+        if self.on_dead_token is not None:
+            try:
+                self.on_dead_token(token, reason)
+            except Exception as e:
+                logger.error(f"[FCM] Dead token handler failed: {e}")
+
+    def forget_dead_token(self, token):
+        """Stop skipping a token, e.g. when a worker registers it again"""
+        with self._lock:
+            self._dead_tokens.pop(token, None)
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self.send_batch(batch)
+
+    def stats(self, window_seconds=60):
+        now = time.time()
+        with self._lock:
+            while self._recent_sends and self._recent_sends[0][0] < now - window_seconds:
+                self._recent_sends.popleft()
+            recent = sum(count for _, count in self._recent_sends)
+            stats = {
+                "transport": type(self.transport).__name__,
+                "sent": self.sent,
+                "failed": self.failed,
+                "batches": self.batches,
+                "deduplicated": self.deduplicated,
+                "skipped_dead_tokens": self.skipped_dead,
+                "failures_by_kind": dict(self.failures_by_kind),
+                "known_dead_tokens": len(self._dead_tokens),
+                "sent_per_second": round(recent / window_seconds, 2),
+            }
+            if self._threads or self.enqueued:
+                # Only meaningful when the sender pool is in use
+                stats.update(senders=len(self._threads), queue_depth=self._queue.qsize(),
+                             queue_capacity=self._queue.maxsize, enqueued=self.enqueued, dropped=self.dropped)
+            return stats
+
+
+fcm_dispatcher = FCMDispatcher(build_transport())
+register_metrics("fcm_dispatch", fcm_dispatcher.stats)
@@ -0,0 +1,126 @@
+"""
+Clears FCM tokens that FCM reported as dead from the workers table.
+
+The dispatcher hands every dead token to token_pruner.report, which only queues it, so
+nothing on the send or request path waits for the database. prune_tokens_periodically then
+clears the queued tokens (fcm_token and fcm_topic_cell set to NULL) in batched UPDATEs and
+drops them from the in-memory worker index, so later job posts no longer enqueue pushes
+for them.
+"""
+import asyncio
+import logging
+import os
+import threading
+
+from sqlalchemy import update
+
+from core.database import SessionLocal
+from core.fcm_dispatch import fcm_dispatcher
+from core.fcm_topics import topic_subscriptions
+from core.metrics import register_metrics
+from core.spatial_index import worker_index
+from models.worker import Worker
+
+logger = logging.getLogger(__name__)
+
+FCM_TOKEN_PRUNE_SECONDS = float(os.environ.get("WORKBEE_FCM_TOKEN_PRUNE_SECONDS", "5.0"))
+PRUNE_BATCH_SIZE = 500
+
+
+class TokenPruner:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = set()
+        self.reported = 0
+        self.reasons = {}  # error class name -> tokens reported
+        self.cleared_workers = 0
+        self.flushes = 0
+
+    def report(self, token, reason):
+        with self._lock:
+            self._pending.add(token)
+            self.reported += 1
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def flush(self):
+        """Clear the queued tokens from every worker holding them; returns how many workers changed"""
+        with self._lock:
+            pending, self._pending = sorted(self._pending), set()
+        if not pending:
+            return 0
+        cleared = 0
+        for start in range(0, len(pending), PRUNE_BATCH_SIZE):
+            tokens = pending[start:start + PRUNE_BATCH_SIZE]
+            db = SessionLocal()
+            try:
+                workers = db.query(Worker.id, Worker.h3_cell).filter(Worker.fcm_token.in_(tokens)).all()
+                if workers:
+                    # FCM drops topic subscriptions of a dead token itself, so nothing to unsubscribe
+                    db.execute(
+                        update(Worker)
+                        .where(Worker.fcm_token.in_(tokens))
+                        .values(fcm_token=None, fcm_topic_cell=None)
+                    )
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    self._pending.update(pending[start:])
+                raise
+            finally:
+                db.close()
+            for worker_id, cell in workers:
+                worker_index.upsert(worker_id, cell, None)
+            cleared += len(workers)
+        with self._lock:
+            self.cleared_workers += cleared
+            self.flushes += 1
+        if cleared:
+            logger.info(f"[FCM] Cleared dead tokens from {cleared} workers")
+        return cleared
+
+    def stats(self):
+        with self._lock:
+            return {
+                "reported": self.reported,
+                "pending": len(self._pending),
+                "cleared_workers": self.cleared_workers,
+                "reasons": dict(self.reasons),
+                "flushes": self.flushes,
+            }
+
+
+token_pruner = TokenPruner()
+fcm_dispatcher.on_dead_token = token_pruner.report
+register_metrics("fcm_tokens", token_pruner.stats)
+
+
+def release_token_elsewhere(db, worker_id, token):
+    """
+    Clear token from every other worker before worker_id takes it (reinstalls and re-logins
+    leave stale rows holding the same device token). worker_id is None for a worker not
+    added yet. Runs in the caller's transaction; returns (worker id, h3_cell, topic subscription)
+    for each released worker, to drop from the worker index and the topic after commit.
+    """
+    if not token:
+        return []
+    fcm_dispatcher.forget_dead_token(token)
+    query = db.query(Worker).filter(Worker.fcm_token == token)
+    if worker_id is not None:
+        query = query.filter(Worker.id != worker_id)
+    others = query.all()
+    released = []
+    for other in others:
+        released.append((other.id, other.h3_cell, topic_subscriptions.drop_token(other)))
+        other.fcm_token = None
+    return released
+
+
+async def prune_tokens_periodically(interval=FCM_TOKEN_PRUNE_SECONDS):
+    """Background loop: clear dead tokens reported since the last pass"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(token_pruner.flush)
+        except Exception as e:
+            logger.error(f"[FCM] Dead token pruning failed: {e}")
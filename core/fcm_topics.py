@@ -0,0 +1,223 @@
+"""
+FCM topic per H3 cell, so a job post costs a few topic pushes instead of one per worker.
+
+With WORKBEE_FCM_FANOUT=topic every worker's FCM token is subscribed to the topic of its
+h3_cell, and workers.fcm_topic_cell records the cell it is currently subscribed to. A worker
+whose fcm_topic_cell differs from its h3_cell still needs (re)subscribing. The worker routes
+queue those ids whenever a location or token changes, and a background loop syncs them in
+subscribe_to_topic calls of up to 1000 tokens. A periodic full pass picks up anything else,
+such as failed calls or changes made outside the API. Run a full pass from the shell with
+
+    python -m core.fcm_topics
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import bindparam, or_, update
+
+from core.database import SessionLocal
+from core.fcm_dispatch import fcm_dispatcher, FCM_TOPIC_BATCH_SIZE
+from core.metrics import register_metrics
+from models.worker import Worker
+
+logger = logging.getLogger(__name__)
+
+FCM_FANOUT = os.environ.get("WORKBEE_FCM_FANOUT", "token")  # "token" (one push per worker) or "topic"
+FCM_TOPIC_PREFIX = "cell_"
+FCM_TOPIC_FLUSH_SECONDS = float(os.environ.get("WORKBEE_FCM_TOPIC_FLUSH_SECONDS", "2.0"))
+FCM_TOPIC_RECONCILE_SECONDS = float(os.environ.get("WORKBEE_FCM_TOPIC_RECONCILE_SECONDS", "3600"))
+# FCM allows at most five topics in one condition
+FCM_CONDITION_MAX_TOPICS = 5
+SYNC_BATCH_SIZE = 5000
+
+
+def cell_topic(cell):
+    return f"{FCM_TOPIC_PREFIX}{cell}"
+
+
+def topic_conditions(cells):
+    """OR-conditions covering all cells, FCM_CONDITION_MAX_TOPICS topics each"""
+    topics = [cell_topic(cell) for cell in sorted(cells)]
+    return [
+        " || ".join(f"'{topic}' in topics" for topic in topics[start:start + FCM_CONDITION_MAX_TOPICS])
+        for start in range(0, len(topics), FCM_CONDITION_MAX_TOPICS)
+    ]
+
+
+class TopicSubscriptions:
+    def __init__(self, enabled=FCM_FANOUT == "topic"):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._dirty = set()  # worker ids whose subscription may be stale
+        self._unsubscribe = {}  # topic -> tokens to drop (replaced tokens, deleted workers)
+        self.counters = {"subscribed": 0, "unsubscribed": 0, "failed": 0, "calls": 0, "syncs": 0}
+
+    def mark(self, worker_id):
+        """Queue a worker for syncing after its location or token changed (call after commit)"""
+        if self.enabled:
+            with self._lock:
+                self._dirty.add(worker_id)
+
+    def drop_token(self, worker, token=None):
+        """
+        Reset fcm_topic_cell in the transaction of a token change or delete; token defaults to
+        worker.fcm_token. Returns the (topic, token) subscription to pass to unsubscribe() once
+        that transaction has committed, or None if there is nothing to drop.
+        """
+        token = token or worker.fcm_token
+        if not self.enabled or not token or not worker.fcm_topic_cell:
+            return None
+        subscription = (cell_topic(worker.fcm_topic_cell), token)
+        worker.fcm_topic_cell = None
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Queue a subscription returned by drop_token for removal (call after commit). Queued
+        earlier, a failed commit would leave the token unsubscribed while the rolled-back
+        fcm_topic_cell still reads as in sync, which no reconcile pass would notice.
+        """
+        if subscription is None:
+            return
+        topic, token = subscription
+        with self._lock:
+            self._unsubscribe.setdefault(topic, set()).add(token)
+
+    def flush(self):
+        """Sync the queued workers and send the queued unsubscribes"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            unsubscribe, self._unsubscribe = self._unsubscribe, {}
+        for topic, tokens in unsubscribe.items():
+            self._call(fcm_dispatcher.transport.unsubscribe_from_topic, list(tokens), topic, "unsubscribed")
+        dirty = sorted(dirty)
+        for start in range(0, len(dirty), SYNC_BATCH_SIZE):
+            db = SessionLocal()
+            try:
+                rows = (
+                    db.query(Worker.id, Worker.fcm_token, Worker.h3_cell, Worker.fcm_topic_cell)
+                    .filter(Worker.id.in_(dirty[start:start + SYNC_BATCH_SIZE]))
+                    .all()
+                )
+                self._sync_rows(db, rows)
+            finally:
+                db.close()
+
+    def sync_all(self):
+        """Walk every worker in primary-key order and fix stale subscriptions; returns how many were synced"""
+        synced = 0
+        last_id = 0
+        while True:
+            db = SessionLocal()
+            try:
+                rows = (
+                    db.query(Worker.id, Worker.fcm_token, Worker.h3_cell, Worker.fcm_topic_cell)
+                    .filter(Worker.id > last_id)
+                    .order_by(Worker.id)
+                    .limit(SYNC_BATCH_SIZE)
+                    .all()
+                )
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                stale = [row for row in rows if self._is_stale(row)]
+                if stale:
+                    self._sync_rows(db, stale)
+                    synced += len(stale)
+            finally:
+                db.close()
+        with self._lock:
+            self.counters["syncs"] += 1
+        return synced
+
+    @staticmethod
+    def _is_stale(row):
+        if row.fcm_token:
+            return row.fcm_topic_cell != row.h3_cell
+        return row.fcm_topic_cell is not None
+
+    def _sync_rows(self, db, rows):
+        """Move each stale worker's token to the topic of its current cell, then record it"""
+        leave, join, settled = {}, {}, []
+        for row in rows:
+            if not self._is_stale(row):
+                continue
+            if not row.fcm_token:
+                # The token is gone, so there is nothing left to unsubscribe
+                settled.append((row, None))
+                continue
+            if row.fcm_topic_cell:
+                leave.setdefault(cell_topic(row.fcm_topic_cell), []).append(row.fcm_token)
+            if row.h3_cell:
+                join.setdefault(cell_topic(row.h3_cell), []).append(row)
+            else:
+                settled.append((row, None))
+        for topic, tokens in leave.items():
+            self._call(fcm_dispatcher.transport.unsubscribe_from_topic, tokens, topic, "unsubscribed")
+        for topic, members in join.items():
+            failed = set(self._call(fcm_dispatcher.transport.subscribe_to_topic,
+                                    [row.fcm_token for row in members], topic, "subscribed"))
+            settled.extend((row, row.h3_cell) for index, row in enumerate(members) if index not in failed)
+        if not settled:
+            return
+        # Only record the cell if token and location did not change while we were syncing
+        workers = Worker.__table__
+        db.connection().execute(
+            update(workers)
+            .where(workers.c.id == bindparam("worker_id"),
+                   or_(workers.c.fcm_token == bindparam("token"), workers.c.fcm_token.is_(None)),
+                   or_(workers.c.h3_cell == bindparam("cell"), workers.c.h3_cell.is_(None)))
+            .values(fcm_topic_cell=bindparam("topic_cell")),
+            [{"worker_id": row.id, "token": row.fcm_token, "cell": row.h3_cell, "topic_cell": topic_cell}
+             for row, topic_cell in settled],
+        )
+        db.commit()
+
+    def _call(self, method, tokens, topic, counter):
+        """Run a (un)subscribe in FCM_TOPIC_BATCH_SIZE chunks; returns the indexes that failed"""
+        failed = []
+        for start in range(0, len(tokens), FCM_TOPIC_BATCH_SIZE):
+            chunk = tokens[start:start + FCM_TOPIC_BATCH_SIZE]
+            try:
+                failed.extend(start + index for index in method(chunk, topic))
+            except Exception as e:
+                logger.error(f"[FCM] Topic update for {topic} ({len(chunk)} tokens) failed: {e}")
+                failed.extend(range(start, start + len(chunk)))
+        with self._lock:
+            self.counters["calls"] += -(-len(tokens) // FCM_TOPIC_BATCH_SIZE)
+            self.counters[counter] += len(tokens) - len(failed)
+            self.counters["failed"] += len(failed)
+        return failed
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, enabled=self.enabled, pending_workers=len(self._dirty),
+                        pending_unsubscribes=sum(len(tokens) for tokens in self._unsubscribe.values()))
+
+
+topic_subscriptions = TopicSubscriptions()
+register_metrics("fcm_topics", topic_subscriptions.stats)
+
+
+async def sync_topic_subscriptions_periodically(interval=FCM_TOPIC_FLUSH_SECONDS,
+                                                reconcile_interval=FCM_TOPIC_RECONCILE_SECONDS):
+    """Background loop: flush queued workers often, and run a full pass at start and every reconcile_interval"""
+    next_reconcile = time.monotonic()
+    while True:
+        try:
+            if time.monotonic() >= next_reconcile:
+                next_reconcile = time.monotonic() + reconcile_interval
+                synced = await asyncio.to_thread(topic_subscriptions.sync_all)
+                logger.info(f"[FCM] Topic reconcile synced {synced} workers")
+            await asyncio.to_thread(topic_subscriptions.flush)
+        except Exception as e:
+            logger.error(f"[FCM] Topic subscription sync failed: {e}")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Synced {TopicSubscriptions(enabled=True).sync_all()} workers")
@@ -0,0 +1,80 @@
+import math
+import h3
+
+# Resolution used for job/worker cells (~0.74 km² per cell, good for city/neighborhood)
+H3_RESOLUTION = 8
+# Coarser parent resolutions stored alongside h3_cell as h3_cell_r<N> so compacted covers can be queried
+H3_PARENT_RESOLUTIONS = (4, 5, 6, 7)
+# Upper bound on grid_disk rings when building a region cover (~1.8k cells before compaction)
+MAX_COVER_RINGS = 24
+EARTH_RADIUS_KM = 6371.0088
+
+
+def latlng_to_cell(latitude, longitude, resolution=H3_RESOLUTION):
+    """Return the H3 cell for a coordinate pair, or None if either value is missing"""
+    if latitude is None or longitude is None:
+        return None
+    return h3.latlng_to_cell(latitude, longitude, resolution)
+
+
+def sync_h3_cell(mapper, connection, target):
+    """Mapper hook: keep target.h3_cell and its parent cells in step with latitude/longitude"""
+    cell = latlng_to_cell(target.latitude, target.longitude)
+    target.h3_cell = cell
+    for resolution in H3_PARENT_RESOLUTIONS:
+        parent = h3.cell_to_parent(cell, resolution) if cell is not None else None
+        setattr(target, f"h3_cell_r{resolution}", parent)
+
+
+def h3_column(model, resolution):
+    """The model column holding cells at the given resolution"""
+    if resolution == H3_RESOLUTION:
+        return model.h3_cell
+    return getattr(model, f"h3_cell_r{resolution}")
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometers"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def rings_for_radius(radius_km, origin_cell):
+    """Smallest grid_disk k around origin_cell whose cells fully cover a circle of radius_km"""
+    # Use the shortest local edge: cells vary in size across the globe, so the average would under-cover
+    edge_km = min(h3.edge_length(edge, unit="km") for edge in h3.origin_to_directed_edges(origin_cell))
+    # Each ring adds at least 1.5 edge lengths of coverage; one extra ring absorbs distortion across the disk
+    return max(1, math.ceil(radius_km / (1.5 * edge_km)) + 1)
+
+
+def cells_within_radius(latitude, longitude, radius_km, resolution=H3_RESOLUTION):
+    """H3 cells covering every point within radius_km of the given coordinate"""
+    origin_cell = h3.latlng_to_cell(latitude, longitude, resolution)
+    return h3.grid_disk(origin_cell, rings_for_radius(radius_km, origin_cell))
+
+
+def region_cover(latitude, longitude, radius_km):
+    """Compact mixed-resolution cover of a circle, as {resolution: [cells]}
+
+    The disk is built at the finest stored resolution that needs at most MAX_COVER_RINGS
+    rings, then compacted into parent cells. Parents coarser than the coarsest stored
+    resolution are expanded back down to it, so every cell maps onto an indexed column.
+    """
+    for resolution in range(H3_RESOLUTION, H3_PARENT_RESOLUTIONS[0] - 1, -1):
+        origin_cell = h3.latlng_to_cell(latitude, longitude, resolution)
+        rings = rings_for_radius(radius_km, origin_cell)
+        if rings <= MAX_COVER_RINGS:
+            break
+    disk = h3.grid_disk(origin_cell, rings)
+    min_resolution = H3_PARENT_RESOLUTIONS[0]
+    cover = {}
+    for cell in h3.compact_cells(disk):
+        resolution = h3.get_resolution(cell)
+        if resolution < min_resolution:
+            cover.setdefault(min_resolution, []).extend(h3.cell_to_children(cell, min_resolution))
+        else:
+            cover.setdefault(resolution, []).append(cell)
+    return cover
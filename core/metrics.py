@@ -0,0 +1,23 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# name -> zero-argument callable returning a JSON-serializable dict
+_metric_sources = {}
+
+
+def register_metrics(name, source):
+    """Expose the dict returned by source() under name on the /metrics endpoint"""
+    _metric_sources[name] = source
+
+
+def collect_metrics():
+    """Snapshot every registered metrics source; a failing source reports its error instead"""
+    snapshot = {}
+    for name, source in _metric_sources.items():
+        try:
+            snapshot[name] = source()
+        except Exception as e:
+            logger.error(f"Failed to collect metrics for {name}: {e}")
+            snapshot[name] = {"error": str(e)}
+    return snapshot
@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from core.metrics import register_metrics
+from models.job import Job
+
+# Notification.type_code values; stored instead of the rendered text
+NOTIFICATION_CUSTOM = 0  # free text kept in Notification.message
+NOTIFICATION_NEW_JOB_NEARBY = 1
+
+TEMPLATES = {
+    NOTIFICATION_NEW_JOB_NEARBY: "New job nearby: {job_title}",
+}
+
+JOB_TITLE_CACHE_SIZE = int(os.environ.get("WORKBEE_JOB_TITLE_CACHE_SIZE", "10000"))
+JOB_TITLE_CACHE_TTL_SECONDS = float(os.environ.get("WORKBEE_JOB_TITLE_CACHE_TTL_SECONDS", "300"))
+
+
+class JobTitleCache:
+    """LRU cache of job id -> title with a TTL, filled by one IN query per render batch"""
+
+    def __init__(self, max_size=JOB_TITLE_CACHE_SIZE, ttl_seconds=JOB_TITLE_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # job id -> (title, expires at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, db, job_ids):
+        now = time.monotonic()
+        titles = {}
+        missing = set()
+        with self._lock:
+            for job_id in set(job_ids):
+                entry = self._entries.get(job_id)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(job_id)
+                    titles[job_id] = entry[0]
+                else:
+                    missing.add(job_id)
+            self.hits += len(titles)
+            self.misses += len(missing)
+        if missing:
+            rows = db.query(Job.id, Job.title).filter(Job.id.in_(missing)).all()
+            for job_id, title in rows:
+                titles[job_id] = title
+                self.put(job_id, title)
+        return titles
+
+    def put(self, job_id, title):
+        with self._lock:
+            self._entries[job_id] = (title, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(job_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, job_id):
+        with self._lock:
+            self._entries.pop(job_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+job_titles = JobTitleCache()
+register_metrics("job_title_cache", job_titles.stats)
+
+
+def render(type_code, message=None, params=None, job_title=None):
+    """Text for one notification; custom notifications carry their own message"""
+    template = TEMPLATES.get(type_code)
+    if template is None:
+        return message or ""
+    # The job's current title wins over a job_title stored in params
+    values = {"job_title": "a job", **(json.loads(params) if params else {})}
+    if job_title is not None:
+        values["job_title"] = job_title
+    return template.format(**values)
+
+
+def render_messages(db, notifications):
+    """Rendered text for each notification, looking up all needed job titles at once"""
+    titles = job_titles.get_many(db, [n.job_id for n in notifications if n.type_code in TEMPLATES])
+    return [render(n.type_code, n.message, n.params, titles.get(n.job_id)) for n in notifications]
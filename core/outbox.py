@@ -0,0 +1,326 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, delete, update
+
+from core.coalescer import Deferred, PushRateLimiter, build_push, group_by_worker
+from core.database import SessionLocal
+from core.fcm_dispatch import fcm_dispatcher, PushMessage, ERROR_DEAD_TOKEN
+from core.metrics import register_metrics
+from core.presence import push_decisions
+from core.ws_hub import hub
+from models.outbox import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_CHANNELS = ("ws", "fcm", "fcm_topic")
+# worker_id of fcm_topic rows, which address a set of cell topics rather than one worker
+TOPIC_OUTBOX_WORKER_ID = 0
+OUTBOX_WORKERS = int(os.environ.get("WORKBEE_OUTBOX_WORKERS", "2"))
+OUTBOX_BATCH_SIZE = int(os.environ.get("WORKBEE_OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_POLL_SECONDS = float(os.environ.get("WORKBEE_OUTBOX_POLL_SECONDS", "1.0"))
+# A claimed row becomes claimable again after this long, so a crashed process cannot strand it
+OUTBOX_LEASE_SECONDS = int(os.environ.get("WORKBEE_OUTBOX_LEASE_SECONDS", "60"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("WORKBEE_OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE_SECONDS = 2
+OUTBOX_BACKOFF_MAX_SECONDS = 900
+# Messages per second each process may deliver on a channel
+OUTBOX_RATE_LIMITS = {
+    "ws": float(os.environ.get("WORKBEE_OUTBOX_WS_RATE", "5000")),
+    "fcm": float(os.environ.get("WORKBEE_OUTBOX_FCM_RATE", "1000")),
+    "fcm_topic": float(os.environ.get("WORKBEE_OUTBOX_FCM_TOPIC_RATE", "100")),
+}
+OUTBOX_INSERT_CHUNK = 1000
+
+
+def enqueue_outbox(db, channel, messages, delay_seconds=0):
+    """Add (worker_id, payload dict) pairs to the outbox inside the caller's transaction"""
+    messages = list(messages)
+    now = datetime.utcnow()
+    available_at = now + timedelta(seconds=delay_seconds)
+    for start in range(0, len(messages), OUTBOX_INSERT_CHUNK):
+        rows = [
+            {"channel": channel, "worker_id": worker_id, "payload": json.dumps(payload),
+             "status": "pending", "attempts": 0, "available_at": available_at, "created_at": now}
+            for worker_id, payload in messages[start:start + OUTBOX_INSERT_CHUNK]
+        ]
+        db.execute(insert(OutboxMessage).values(rows))
+
+
+def backoff_seconds(attempts):
+    """Exponential backoff with jitter for the given (1-based) attempt count"""
+    delay = min(OUTBOX_BACKOFF_MAX_SECONDS, OUTBOX_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, wanted):
+        """Take up to wanted tokens; returns how many were granted"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            granted = int(min(wanted, self.tokens))
+            self.tokens -= granted
+            return granted
+
+    def refund(self, count):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + count)
+
+
+class OutboxRelay:
+    """
+    Background threads that drain notification_outbox.
+
+    Each pass claims a batch per channel with SELECT ... FOR UPDATE SKIP LOCKED and pushes
+    the rows' available_at forward by a lease before delivering, so several processes can
+    drain the same table without sending a row twice. The lease UPDATE only matches rows
+    that are still claimable; if another relay got there first the pass gives its batch up. Delivered rows are deleted; failed
+    rows are retried with exponential backoff and marked dead after OUTBOX_MAX_ATTEMPTS.
+
+    FCM rows are coalesced: claiming a worker's due row also claims that worker's other
+    untried FCM rows (at most batch_size more per pass), and the group goes out as a single
+    digest push. Rows whose notification a live socket already acked are dropped without a
+    push. fcm_topic rows are sent as they are, one condition push each.
+    """
+
+    def __init__(self, workers=OUTBOX_WORKERS, batch_size=OUTBOX_BATCH_SIZE, poll_seconds=OUTBOX_POLL_SECONDS):
+        self.num_workers = workers
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.buckets = {channel: TokenBucket(rate) for channel, rate in OUTBOX_RATE_LIMITS.items()}
+        self.handlers = {"ws": self._deliver_ws, "fcm": self._deliver_fcm, "fcm_topic": self._deliver_fcm_topic}
+        self.loop = None
+        self._threads = []
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self.push_limiter = PushRateLimiter()
+        self.counters = {channel: {"claimed": 0, "delivered": 0, "retried": 0, "dead": 0, "deferred": 0, "coalesced": 0,
+                                    "suppressed": 0, "dead_token": 0, "contended": 0}
+                         for channel in OUTBOX_CHANNELS}
+
+    def start(self, loop):
+        """Start relay threads; loop is the event loop that owns the WebSocket connections"""
+        if self._threads:
+            return
+        self.loop = loop
+        self._stopping.clear()
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._run, name=f"outbox-relay-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=10.0):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        """Ask the relay to poll now instead of waiting for the next interval"""
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                busy = self.run_once()
+            except Exception as e:
+                logger.error(f"[Outbox] Relay pass failed: {e}")
+                busy = False
+            if not busy:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+
+    def run_once(self):
+        """Claim and deliver at most one batch per channel; returns True if anything was claimed"""
+        busy = False
+        for channel in OUTBOX_CHANNELS:
+            allowance = self.buckets[channel].take(self.batch_size)
+            if not allowance:
+                continue
+            batch = self._claim(channel, allowance)
+            self.buckets[channel].refund(allowance - len(batch))
+            if batch:
+                busy = True
+                self._count(channel, "claimed", len(batch))
+                self._settle(channel, batch, self.handlers[channel](batch))
+        return busy
+
+    def _claim(self, channel, limit):
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            rows = (
+                db.query(OutboxMessage.id, OutboxMessage.worker_id, OutboxMessage.payload, OutboxMessage.attempts)
+                .filter(OutboxMessage.status == "pending", OutboxMessage.channel == channel, OutboxMessage.available_at <= now)
+                .order_by(OutboxMessage.available_at, OutboxMessage.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not rows:
+                db.rollback()
+                return []
+            if channel == "fcm":
+                rows += self._claim_burst_rows(db, rows, self.batch_size)
+            # Lease the claimed rows: no other relay sees them until the lease runs out. The lease
+            # is the claim: it only takes rows that are still claimable (due, or untried for a
+            # digest), so where SKIP LOCKED is not enforced (SQLite) a relay that read the same
+            # rows as another finds them leased and backs off instead of sending them twice
+            leased = db.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_([row.id for row in rows]), OutboxMessage.status == "pending",
+                       (OutboxMessage.available_at <= now) | (OutboxMessage.attempts == 0))
+                .values(attempts=OutboxMessage.attempts + 1,
+                        available_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS))
+            ).rowcount
+            if leased != len(rows):
+                db.rollback()
+                self._count(channel, "contended")
+                return []
+            claimed = [(row.id, row.worker_id, json.loads(row.payload), row.attempts + 1) for row in rows]
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _claim_burst_rows(self, db, rows, limit):
+        """
+        Also lock up to limit not-yet-due FCM rows of the claimed workers so they join the same
+        digest; the oldest go first, and any left over join a later push
+        """
+        return (
+            db.query(OutboxMessage.id, OutboxMessage.worker_id, OutboxMessage.payload, OutboxMessage.attempts)
+            .filter(OutboxMessage.status == "pending", OutboxMessage.channel == "fcm",
+                    OutboxMessage.attempts == 0,
+                    OutboxMessage.worker_id.in_({row.worker_id for row in rows}),
+                    OutboxMessage.id.not_in([row.id for row in rows]))
+            .order_by(OutboxMessage.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def _settle(self, channel, batch, errors):
+        """Delete delivered rows, reschedule or bury failed ones; errors maps row id -> message"""
+        delivered = [row_id for row_id, _, _, _ in batch if row_id not in errors]
+        db = SessionLocal()
+        try:
+            if delivered:
+                db.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(delivered)))
+            now = datetime.utcnow()
+            for row_id, _, _, attempts in batch:
+                if row_id not in errors:
+                    continue
+                if isinstance(errors[row_id], Deferred):
+                    # Not a failure: give the attempt back and try again when allowed
+                    values = {"available_at": errors[row_id].until, "attempts": attempts - 1}
+                    self._count(channel, "deferred")
+                    db.execute(update(OutboxMessage).where(OutboxMessage.id == row_id).values(**values))
+                    continue
+                error = str(errors[row_id])[:500]
+                if attempts >= OUTBOX_MAX_ATTEMPTS:
+                    values = {"status": "dead", "last_error": error}
+                    self._count(channel, "dead")
+                else:
+                    values = {"available_at": now + timedelta(seconds=backoff_seconds(attempts)), "last_error": error}
+                    self._count(channel, "retried")
+                db.execute(update(OutboxMessage).where(OutboxMessage.id == row_id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+        self._count(channel, "delivered", len(delivered))
+
+    def _deliver_fcm(self, batch):
+        """One push per worker: a burst of rows becomes a digest, rate-capped per worker"""
+        # Skip what a live socket acked; give a present worker's socket until the deadline to ack
+        suppressed, deferred = push_decisions(batch)
+        self._count("fcm", "suppressed", len(suppressed))
+        errors = {row_id: Deferred(until) for row_id, until in deferred.items()}
+        skip = set(suppressed) | set(deferred)
+        groups = []
+        for worker_id, rows in group_by_worker([row for row in batch if row[0] not in skip]).items():
+            retry_at = self.push_limiter.acquire(worker_id)
+            if retry_at is not None:
+                errors.update((row[0], Deferred(retry_at)) for row in rows)
+                continue
+            groups.append((worker_id, rows))
+        self._count("fcm", "coalesced", sum(len(rows) - 1 for _, rows in groups))
+
+        messages = [build_push([payload for _, _, payload, _ in rows]) for _, rows in groups]
+        for start in range(0, len(groups), fcm_dispatcher.batch_size):
+            chunk = groups[start:start + fcm_dispatcher.batch_size]
+            results = fcm_dispatcher.send_batch(messages[start:start + fcm_dispatcher.batch_size])
+            for (worker_id, rows), result in zip(chunk, results):
+                if result.success:
+                    continue
+                self.push_limiter.release(worker_id)
+                if result.error_kind == ERROR_DEAD_TOKEN:
+                    # Retrying cannot help; the rows are settled and the token is being pruned
+                    self._count("fcm", "dead_token", len(rows))
+                    continue
+                errors.update((row[0], result.exception or "FCM send failed") for row in rows)
+        return errors
+
+    def _deliver_fcm_topic(self, batch):
+        messages = [
+            PushMessage(token=None, condition=payload["condition"], title=payload["title"], body=payload["body"],
+                        data=payload.get("data", {}))
+            for _, _, payload, _ in batch
+        ]
+        errors = {}
+        for start in range(0, len(batch), fcm_dispatcher.batch_size):
+            results = fcm_dispatcher.send_batch(messages[start:start + fcm_dispatcher.batch_size])
+            for (row_id, _, _, _), result in zip(batch[start:start + fcm_dispatcher.batch_size], results):
+                if not result.success:
+                    errors[row_id] = result.exception or "FCM send failed"
+        return errors
+
+    def _deliver_ws(self, batch):
+        async def publish_all():
+            # The backplane routes each frame to whichever process holds the worker's sockets
+            return await asyncio.gather(
+                *(hub.publish(worker_id, json.dumps(payload), payload.get("seq")) for _, worker_id, payload, _ in batch),
+                return_exceptions=True,
+            )
+
+        if self.loop is None or self.loop.is_closed():
+            return {row_id: "No event loop for WebSocket delivery" for row_id, _, _, _ in batch}
+        try:
+            results = asyncio.run_coroutine_threadsafe(publish_all(), self.loop).result(timeout=OUTBOX_LEASE_SECONDS / 2)
+        except Exception as e:
+            return {row_id: e for row_id, _, _, _ in batch}
+        # Workers without an open socket are not an error: the notification row is their inbox
+        return {row_id: result for (row_id, _, _, _), result in zip(batch, results) if isinstance(result, Exception)}
+
+    def _count(self, channel, name, amount=1):
+        with self._lock:
+            self.counters[channel][name] += amount
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "channels": {channel: dict(counts, rate_limit_per_second=OUTBOX_RATE_LIMITS[channel])
+                             for channel, counts in self.counters.items()},
+            }
+
+
+outbox_relay = OutboxRelay()
+register_metrics("notification_outbox", outbox_relay.stats)
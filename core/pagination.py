@@ -0,0 +1,107 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import DateTime, and_, or_
+
+
+def encode_cursor(values: dict) -> str:
+    """Encode keyset position values into an opaque, URL-safe cursor"""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a cursor produced by encode_cursor, rejecting anything malformed with a 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+LIST_LIMIT_DEFAULT = 50
+LIST_LIMIT_MAX = 200
+
+
+class Keyset:
+    """
+    Keyset pagination over (sort column, id) for the list endpoints. sorts maps the sort names
+    a route accepts to ORM attributes. sort is one of those names, prefixed with "-" for
+    descending order, and cursor is the next_cursor of the previous page. The cursor records
+    the sort, so a cursor cannot be reused with a different sort.
+
+    Nullable sort columns follow the MySQL/SQLite order: NULLs first ascending, last descending.
+    """
+
+    def __init__(self, sorts: dict, sort: str, cursor: Optional[str], id_column):
+        name = sort[1:] if sort.startswith("-") else sort
+        if name not in sorts:
+            allowed = ", ".join(sorted(sorts))
+            raise HTTPException(status_code=400, detail=f"Invalid sort {sort!r}, expected one of {allowed} (prefix - for descending)")
+        self.sort = sort
+        self.descending = sort.startswith("-")
+        self.column = sorts[name]
+        self.id_column = id_column
+        self.after = self._decode(cursor) if cursor else None
+
+    def _decode(self, cursor):
+        position = decode_cursor(cursor)
+        if position.get("s") != self.sort:
+            raise HTTPException(status_code=400, detail="Cursor was issued for a different sort")
+        try:
+            last_id = int(position["id"])
+            value = position.get("v")
+            if value is not None and isinstance(self.column.type, DateTime):
+                value = datetime.fromisoformat(value)
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return value, last_id
+
+    def _is_id(self):
+        return self.column.expression is self.id_column.expression
+
+    def _after_clause(self):
+        value, last_id = self.after
+        past_id = self.id_column < last_id if self.descending else self.id_column > last_id
+        if self._is_id():
+            return past_id
+        column = self.column
+        if value is None:
+            # NULLs sort first ascending, last descending
+            if self.descending:
+                return and_(column.is_(None), past_id)
+            return or_(column.is_not(None), and_(column.is_(None), past_id))
+        past_value = column < value if self.descending else column > value
+        # The redundant bound lets the planner range-scan the sort index instead of OR-merging
+        bound = column <= value if self.descending else column >= value
+        clause = and_(bound, or_(past_value, and_(column == value, past_id)))
+        if self.descending and self.column.expression.nullable:
+            clause = or_(clause, column.is_(None))
+        return clause
+
+    def apply(self, query, limit: int):
+        """Restrict a select() or Query to the page after the cursor; fetches one extra row to detect a next page"""
+        if self.after is not None:
+            query = query.where(self._after_clause())
+        columns = [self.id_column] if self._is_id() else [self.column, self.id_column]
+        query = query.order_by(*(column.desc() if self.descending else column.asc() for column in columns))
+        return query.limit(limit + 1)
+
+    def page(self, rows, limit: int) -> dict:
+        """Page response for the rows of apply(query, limit)"""
+        rows = list(rows)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            value = getattr(last, self.column.key)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            next_cursor = encode_cursor({"s": self.sort, "v": value, "id": getattr(last, self.id_column.key)})
+        return {"items": rows, "next_cursor": next_cursor}
@@ -0,0 +1,168 @@
+"""
+Worker presence and delivery acknowledgements, used to skip FCM pushes that a live
+WebSocket already delivered.
+
+Each process tracks its own sockets in memory: a connect or any inbound frame (heartbeat
+pongs included) refreshes a worker's presence, and clients acknowledge notification frames
+with {"type": "ack", "seq": N}. A flush loop writes both to the workers table in batched
+statements (presence_expires_at, last_acked_notification_id) so the outbox relay in any
+process can decide whether a push is still needed.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, update
+
+from core.database import SessionLocal
+from core.metrics import register_metrics
+from models.worker import Worker
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_TTL_SECONDS = float(os.environ.get("WORKBEE_PRESENCE_TTL_SECONDS", "120"))
+# How long a present worker's socket has to ack a notification before it is pushed anyway
+PRESENCE_ACK_DEADLINE_SECONDS = float(os.environ.get("WORKBEE_PRESENCE_ACK_DEADLINE_SECONDS", "10"))
+PRESENCE_FLUSH_SECONDS = float(os.environ.get("WORKBEE_PRESENCE_FLUSH_SECONDS", "1.0"))
+
+
+class PresenceRegistry:
+    def __init__(self, ttl_seconds=PRESENCE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._written_until = {}  # worker id -> monotonic time the stored presence runs out
+        self._refresh = set()  # workers whose stored presence needs extending
+        self._gone = set()  # workers with no socket left in this process
+        self._acks = {}  # worker id -> highest acked seq not yet written
+        self.flushes = 0
+        self.acks_received = 0
+
+    def connected(self, worker_id):
+        with self._lock:
+            self._gone.discard(worker_id)
+            self._refresh.add(worker_id)
+
+    def heartbeat(self, worker_id):
+        """Refresh presence; only schedules a write once half the TTL has been used up"""
+        with self._lock:
+            written_until = self._written_until.get(worker_id, 0)
+            if written_until - time.monotonic() < self.ttl_seconds / 2:
+                self._gone.discard(worker_id)
+                self._refresh.add(worker_id)
+
+    def disconnected(self, worker_id):
+        with self._lock:
+            self._refresh.discard(worker_id)
+            self._written_until.pop(worker_id, None)
+            self._gone.add(worker_id)
+
+    def ack(self, worker_id, seq):
+        with self._lock:
+            self.acks_received += 1
+            if seq > self._acks.get(worker_id, 0):
+                self._acks[worker_id] = seq
+
+    def flush(self):
+        """Write pending presence and ack changes with one statement per kind"""
+        with self._lock:
+            refresh, self._refresh = self._refresh, set()
+            gone, self._gone = self._gone, set()
+            acks, self._acks = self._acks, {}
+        if not (refresh or gone or acks):
+            return
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+        db = SessionLocal()
+        try:
+            if refresh:
+                db.execute(update(Worker).where(Worker.id.in_(refresh)).values(presence_expires_at=expires_at))
+            if gone:
+                db.execute(update(Worker).where(Worker.id.in_(gone)).values(presence_expires_at=None))
+            if acks:
+                # One prepared UPDATE with many parameter sets; the watermark only moves forward
+                db.connection().execute(
+                    update(Worker.__table__)
+                    .where(Worker.__table__.c.id == bindparam("worker_id"),
+                           Worker.__table__.c.last_acked_notification_id < bindparam("seq"))
+                    .values(last_acked_notification_id=bindparam("seq")),
+                    [{"worker_id": worker_id, "seq": seq} for worker_id, seq in acks.items()],
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                # Put the changes back so the next flush retries them
+                self._refresh |= refresh - self._gone
+                self._gone |= gone
+                for worker_id, seq in acks.items():
+                    self._acks[worker_id] = max(seq, self._acks.get(worker_id, 0))
+            raise
+        finally:
+            db.close()
+        written_until = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for worker_id in refresh:
+                self._written_until[worker_id] = written_until
+            self.flushes += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ttl_seconds": self.ttl_seconds,
+                "present_workers": len(self._written_until),
+                "pending_refresh": len(self._refresh),
+                "pending_acks": len(self._acks),
+                "acks_received": self.acks_received,
+                "flushes": self.flushes,
+            }
+
+
+presence = PresenceRegistry()
+register_metrics("presence", presence.stats)
+
+
+def push_decisions(batch, now=None):
+    """
+    Split claimed FCM outbox rows by the recipients' stored presence and acks.
+
+    Returns (suppressed row ids, {row id: retry datetime}). Suppressed rows were acked by
+    a live socket and need no push. Deferred rows belong to a present worker whose socket
+    may still ack before the deadline. Every other row should be pushed.
+    """
+    now = now or datetime.utcnow()
+    worker_ids = {worker_id for _, worker_id, _, _ in batch}
+    db = SessionLocal()
+    try:
+        states = {
+            worker_id: (acked or 0, expires_at)
+            for worker_id, acked, expires_at in db.query(
+                Worker.id, Worker.last_acked_notification_id, Worker.presence_expires_at
+            ).filter(Worker.id.in_(worker_ids))
+        }
+    finally:
+        db.close()
+
+    suppressed, deferred = [], {}
+    for row_id, worker_id, payload, _ in batch:
+        acked, expires_at = states.get(worker_id, (0, None))
+        notification_id = payload.get("notification_id")
+        if notification_id is not None and notification_id <= acked:
+            suppressed.append(row_id)
+            continue
+        if expires_at is not None and expires_at > now and payload.get("created_at"):
+            deadline = datetime.fromisoformat(payload["created_at"]) + timedelta(seconds=PRESENCE_ACK_DEADLINE_SECONDS)
+            if deadline > now:
+                deferred[row_id] = deadline
+    return suppressed, deferred
+
+
+async def flush_presence_periodically(interval=PRESENCE_FLUSH_SECONDS):
+    """Background loop: write batched presence and ack updates"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(presence.flush)
+        except Exception as e:
+            logger.error(f"Presence flush failed: {e}")
@@ -0,0 +1,188 @@
+"""
+Retention for the notifications table.
+
+Notifications older than NOTIFICATION_RETENTION_DAYS, and read notifications older than
+NOTIFICATION_RETENTION_READ_DAYS, are moved out of the hot table in small batches walked
+in primary-key order. Each batch is its own short transaction. Depending on the mode, the
+rows are copied to notifications_archive, appended to a gzip JSON-lines export file, or
+simply deleted.
+
+Runs on a schedule inside the app (run_retention_periodically), or once from the shell:
+
+    python -m core.retention
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+
+from core.database import SessionLocal
+from core.metrics import register_metrics
+from models.notification import Notification
+from models.notification_archive import NotificationArchive
+from models.worker import Worker
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_RETENTION_DAYS = float(os.environ.get("WORKBEE_NOTIFICATION_RETENTION_DAYS", "90"))
+NOTIFICATION_RETENTION_READ_DAYS = float(os.environ.get("WORKBEE_NOTIFICATION_RETENTION_READ_DAYS", "30"))
+NOTIFICATION_RETENTION_MODE = os.environ.get("WORKBEE_NOTIFICATION_RETENTION_MODE", "archive")  # archive, export or delete
+NOTIFICATION_RETENTION_BATCH_SIZE = int(os.environ.get("WORKBEE_NOTIFICATION_RETENTION_BATCH_SIZE", "500"))
+# Pause between batches so the purge never monopolises the table or the replication stream
+NOTIFICATION_RETENTION_PAUSE_SECONDS = float(os.environ.get("WORKBEE_NOTIFICATION_RETENTION_PAUSE_SECONDS", "0.05"))
+NOTIFICATION_RETENTION_INTERVAL_SECONDS = float(os.environ.get("WORKBEE_NOTIFICATION_RETENTION_INTERVAL_SECONDS", "3600"))
+NOTIFICATION_EXPORT_DIR = os.environ.get("WORKBEE_NOTIFICATION_EXPORT_DIR", "notification_exports")
+
+RETENTION_MODES = ("archive", "export", "delete")
+ROW_COLUMNS = ("id", "worker_id", "job_id", "type_code", "params", "message", "is_read", "created_at")
+
+
+class NotificationRetention:
+    def __init__(self, mode=NOTIFICATION_RETENTION_MODE, retention_days=NOTIFICATION_RETENTION_DAYS,
+                 read_retention_days=NOTIFICATION_RETENTION_READ_DAYS, batch_size=NOTIFICATION_RETENTION_BATCH_SIZE,
+                 pause_seconds=NOTIFICATION_RETENTION_PAUSE_SECONDS, export_dir=NOTIFICATION_EXPORT_DIR):
+        if mode not in RETENTION_MODES:
+            raise ValueError(f"Unknown notification retention mode {mode!r}, expected one of {RETENTION_MODES}")
+        self.mode = mode
+        self.retention_days = retention_days
+        self.read_retention_days = read_retention_days
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.export_dir = export_dir
+        self._run_lock = threading.Lock()
+        self.running = False
+        self.runs = 0
+        self.last_run = {}
+        self.progress = {}
+        self.totals = {"scanned": 0, "removed": 0, "batches": 0}
+
+    def run_once(self, now=None):
+        """Purge every expired notification; returns the run's counters"""
+        if not self._run_lock.acquire(blocking=False):
+            logger.info("[Retention] Previous run still in progress, skipping")
+            return None
+        try:
+            self.running = True
+            now = now or datetime.utcnow()
+            expire_all_before = now - timedelta(days=self.retention_days)
+            expire_read_before = now - timedelta(days=min(self.read_retention_days, self.retention_days))
+            self.progress = {"started_at": now.isoformat(), "last_id": 0, "scanned": 0, "removed": 0, "batches": 0}
+            started = time.monotonic()
+            last_id = 0
+            while True:
+                last_id, done = self._run_batch(last_id, expire_all_before, expire_read_before)
+                if done:
+                    break
+                if self.pause_seconds:
+                    time.sleep(self.pause_seconds)
+            self.progress["duration_seconds"] = round(time.monotonic() - started, 3)
+            self.last_run = self.progress
+            self.runs += 1
+            logger.info(f"[Retention] Removed {self.progress['removed']} of {self.progress['scanned']} scanned notifications ({self.mode})")
+            return self.last_run
+        finally:
+            self.running = False
+            self._run_lock.release()
+
+    def _run_batch(self, last_id, expire_all_before, expire_read_before):
+        """Process the next PK range; returns (new last_id, whether the walk is finished)"""
+        db = SessionLocal()
+        try:
+            fetched = db.execute(
+                select(*(getattr(Notification, column) for column in ROW_COLUMNS))
+                .where(Notification.id > last_id)
+                .order_by(Notification.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            # ids grow with created_at, so nothing past the first young row can be expired
+            rows = [row for row in fetched if row.created_at is None or row.created_at < expire_read_before]
+            if not rows:
+                db.rollback()
+                return last_id, True
+            watermarks = dict(
+                db.query(Worker.id, Worker.last_read_notification_id)
+                .filter(Worker.id.in_({row.worker_id for row in rows}))
+                .all()
+            )
+            expired = [
+                row for row in rows
+                if row.created_at is None
+                or row.created_at < expire_all_before
+                or row.is_read
+                or row.id <= watermarks.get(row.worker_id, 0)
+            ]
+            if expired:
+                self._remove(db, expired)
+            db.commit()
+        finally:
+            db.close()
+
+        new_last_id = rows[-1].id
+        self.progress["last_id"] = new_last_id
+        self.progress["scanned"] += len(rows)
+        self.progress["removed"] += len(expired)
+        self.progress["batches"] += 1
+        self.totals["scanned"] += len(rows)
+        self.totals["removed"] += len(expired)
+        self.totals["batches"] += 1
+        return new_last_id, len(fetched) < self.batch_size or len(rows) < len(fetched)
+
+    def _remove(self, db, rows):
+        ids = [row.id for row in rows]
+        if self.mode == "archive":
+            archived_at = datetime.utcnow()
+            db.execute(insert(NotificationArchive).values([dict(row._mapping, archived_at=archived_at) for row in rows]))
+        elif self.mode == "export":
+            self._export(rows)
+        db.execute(delete(Notification).where(Notification.id.in_(ids)))
+
+    def _export(self, rows):
+        """Append rows to today's gzip file and flush it to disk before they are deleted"""
+        os.makedirs(self.export_dir, exist_ok=True)
+        path = os.path.join(self.export_dir, f"notifications-{datetime.utcnow():%Y%m%d}.jsonl.gz")
+        # Each append adds a gzip member; gzip readers concatenate members transparently
+        with open(path, "ab") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as out:
+            for row in rows:
+                record = dict(row._mapping)
+                record["created_at"] = record["created_at"].isoformat() if record["created_at"] else None
+                out.write((json.dumps(record) + "\n").encode())
+            out.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "retention_days": self.retention_days,
+            "read_retention_days": self.read_retention_days,
+            "running": self.running,
+            "runs": self.runs,
+            "current_or_last_run": dict(self.progress),
+            "totals": dict(self.totals),
+        }
+
+
+notification_retention = NotificationRetention()
+register_metrics("notification_retention", notification_retention.stats)
+
+
+async def run_retention_periodically(interval=NOTIFICATION_RETENTION_INTERVAL_SECONDS):
+    """Background loop: purge expired notifications every interval"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(notification_retention.run_once)
+        except Exception as e:
+            logger.error(f"Notification retention run failed: {e}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(notification_retention.run_once(), indent=2))
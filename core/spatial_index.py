@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+
+import h3
+
+from core.database import SessionLocal
+from core.metrics import register_metrics
+from models.worker import Worker
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_INTERVAL_SECONDS = int(os.environ.get("WORKBEE_WORKER_INDEX_RECONCILE_SECONDS", "300"))
+LOAD_BATCH_SIZE = 10000
+
+
+class WorkerSpatialIndex:
+    """
+    In-memory map of H3 cell -> worker ids (plus each worker's FCM token) for job fan-out.
+
+    Cells are stored as 64-bit ints and each cell's members as an array('q'), so the index
+    stays compact even with hundreds of thousands of workers. The worker routes keep it
+    current incrementally; reconcile() rebuilds it from the database to pick up changes made
+    by other processes or outside the API.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cells = {}    # cell int -> array('q') of worker ids
+        self._workers = {}  # worker id -> (cell int, fcm_token)
+        self._journal = None  # writes made while a reconcile snapshot is being read
+        self.ready = False
+        self.loaded_at = None
+        self.last_reconcile_at = None
+        self.last_reconcile_changes = 0
+        self.reconcile_count = 0
+
+    @staticmethod
+    def _snapshot(db):
+        """Stream every located worker from the database into fresh cell/worker maps"""
+        cells, workers = {}, {}
+        rows = (
+            db.query(Worker.id, Worker.h3_cell, Worker.fcm_token)
+            .filter(Worker.h3_cell.isnot(None))
+            .execution_options(stream_results=True)
+            .yield_per(LOAD_BATCH_SIZE)
+        )
+        for worker_id, cell, fcm_token in rows:
+            WorkerSpatialIndex._add_to(cells, workers, worker_id, h3.str_to_int(cell), fcm_token)
+        return cells, workers
+
+    def load(self, db):
+        """Replace the index contents with the current database state"""
+        started = time.perf_counter()
+        cells, workers = self._snapshot(db)
+        with self._lock:
+            self._cells, self._workers = cells, workers
+            self.ready = True
+            self.loaded_at = time.time()
+        logger.info(f"Worker spatial index loaded {len(workers)} workers in {len(cells)} cells ({time.perf_counter() - started:.2f}s)")
+
+    def reconcile(self, db):
+        """Rebuild from the database and report how many workers had drifted"""
+        with self._lock:
+            self._journal = []
+        try:
+            cells, workers = self._snapshot(db)
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            # Writes that raced with the snapshot win over it
+            for worker_id, entry in self._journal:
+                self._discard_from(cells, workers, worker_id)
+                if entry is not None:
+                    self._add_to(cells, workers, worker_id, *entry)
+            self._journal = None
+            changes = sum(1 for worker_id, entry in workers.items() if self._workers.get(worker_id) != entry)
+            changes += sum(1 for worker_id in self._workers if worker_id not in workers)
+            self._cells, self._workers = cells, workers
+            self.ready = True
+            self.last_reconcile_at = time.time()
+            self.last_reconcile_changes = changes
+            self.reconcile_count += 1
+        if changes:
+            logger.info(f"Worker spatial index reconcile corrected {changes} workers")
+        return changes
+
+    @staticmethod
+    def _discard_from(cells, workers, worker_id):
+        entry = workers.pop(worker_id, None)
+        if entry is None:
+            return
+        members = cells.get(entry[0])
+        if members is not None:
+            try:
+                members.remove(worker_id)
+            except ValueError:
+                pass
+            if not members:
+                del cells[entry[0]]
+
+    @staticmethod
+    def _add_to(cells, workers, worker_id, cell_int, fcm_token):
+        members = cells.get(cell_int)
+        if members is None:
+            members = cells[cell_int] = array("q")
+        members.append(worker_id)
+        workers[worker_id] = (cell_int, fcm_token)
+
+    def upsert(self, worker_id, cell, fcm_token):
+        """Record a worker's current cell and token; a worker without a cell is dropped"""
+        entry = (h3.str_to_int(cell), fcm_token) if cell is not None else None
+        with self._lock:
+            self._discard_from(self._cells, self._workers, worker_id)
+            if entry is not None:
+                self._add_to(self._cells, self._workers, worker_id, *entry)
+            if self._journal is not None:
+                self._journal.append((worker_id, entry))
+
+    def remove(self, worker_id):
+        with self._lock:
+            self._discard_from(self._cells, self._workers, worker_id)
+            if self._journal is not None:
+                self._journal.append((worker_id, None))
+
+    def workers_in_cells(self, cells):
+        """(worker_id, fcm_token) for every indexed worker located in any of the given cells"""
+        recipients = []
+        with self._lock:
+            for cell in cells:
+                members = self._cells.get(h3.str_to_int(cell))
+                if members is None:
+                    continue
+                for worker_id in members:
+                    recipients.append((worker_id, self._workers[worker_id][1]))
+        return recipients
+
+    def stats(self):
+        with self._lock:
+            id_bytes = sum(members.buffer_info()[1] * members.itemsize for members in self._cells.values())
+            container_bytes = sys.getsizeof(self._cells) + sys.getsizeof(self._workers)
+            container_bytes += sum(sys.getsizeof(members) for members in self._cells.values())
+            token_bytes = sum(sys.getsizeof(entry[1]) for entry in self._workers.values() if entry[1])
+            return {
+                "ready": self.ready,
+                "workers": len(self._workers),
+                "cells": len(self._cells),
+                "id_array_bytes": id_bytes,
+                "approx_memory_bytes": container_bytes + token_bytes,
+                "loaded_at": self.loaded_at,
+                "last_reconcile_at": self.last_reconcile_at,
+                "last_reconcile_changes": self.last_reconcile_changes,
+                "reconcile_count": self.reconcile_count,
+            }
+
+
+worker_index = WorkerSpatialIndex()
+register_metrics("worker_spatial_index", worker_index.stats)
+
+
+def load_worker_index():
+    db = SessionLocal()
+    try:
+        worker_index.load(db)
+    finally:
+        db.close()
+
+
+def reconcile_worker_index():
+    db = SessionLocal()
+    try:
+        return worker_index.reconcile(db)
+    finally:
+        db.close()
+
+
+async def reconcile_worker_index_periodically(interval=RECONCILE_INTERVAL_SECONDS):
+    """Background loop: periodically re-sync the index with the database"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(reconcile_worker_index)
+        except Exception as e:
+            logger.error(f"Worker spatial index reconcile failed: {e}")
@@ -0,0 +1,375 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from core.backplane import build_backplane
+from core.metrics import register_metrics
+
+try:
+    import msgpack
+except ImportError:  # Optional: clients can only negotiate JSON frames without it
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+WS_QUEUE_SIZE = int(os.environ.get("WORKBEE_WS_QUEUE_SIZE", "100"))
+WS_SLOW_CONSUMER_POLICY = os.environ.get("WORKBEE_WS_SLOW_CONSUMER_POLICY", "drop")  # "drop" or "disconnect"
+# App-level pings and idle eviction, only for sockets that opt in with ?heartbeat=true. Every socket
+# is kept alive by uvicorn's protocol-level ping/pong (--ws-ping-interval / --ws-ping-timeout)
+WS_HEARTBEAT_SECONDS = float(os.environ.get("WORKBEE_WS_HEARTBEAT_SECONDS", "25"))
+WS_IDLE_TIMEOUT_SECONDS = float(os.environ.get("WORKBEE_WS_IDLE_TIMEOUT_SECONDS", "90"))
+WS_SEND_TIMEOUT_SECONDS = float(os.environ.get("WORKBEE_WS_SEND_TIMEOUT_SECONDS", "10"))
+
+# WebSocket close code 1013: "Try Again Later"
+CLOSE_SLOW_CONSUMER = 1013
+
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+
+
+def available_encodings():
+    return (ENCODING_JSON, ENCODING_MSGPACK) if msgpack is not None else (ENCODING_JSON,)
+
+
+class Frame:
+    """
+    One outgoing message. The JSON text is what the backplane carries; other encodings are
+    computed on first use and cached, so a frame fanned out to many sockets is serialized
+    at most once per encoding.
+    """
+
+    __slots__ = ("text", "seq", "_msgpack")
+
+    def __init__(self, text, seq=None):
+        self.text = text
+        self.seq = seq
+        self._msgpack = None
+
+    def encode(self, encoding):
+        if encoding == ENCODING_MSGPACK:
+            if self._msgpack is None:
+                try:
+                    value = json.loads(self.text)
+                except ValueError:
+                    value = self.text  # Plain-text frames are sent as a msgpack string
+                self._msgpack = msgpack.packb(value)
+            return self._msgpack
+        return self.text
+
+
+PING_FRAME = Frame(json.dumps({"type": "ping"}))
+
+
+class Connection:
+    """One client socket with its own bounded outgoing queue, drained by a dedicated writer task"""
+
+    __slots__ = ("websocket", "worker_id", "encoding", "heartbeat", "queue", "writer", "last_seen", "dropped", "closed",
+                 "ready", "replayed_through")
+
+    def __init__(self, websocket, worker_id, queue_size, encoding=ENCODING_JSON, heartbeat=False):
+        self.websocket = websocket
+        self.worker_id = worker_id
+        self.encoding = encoding
+        # Opted in to app-level ping frames and idle eviction
+        self.heartbeat = heartbeat
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.writer = None
+        self.last_seen = time.monotonic()
+        self.dropped = 0
+        self.closed = False
+        # The writer waits on this while missed notifications are replayed
+        self.ready = asyncio.Event()
+        # Live frames with seq <= this were already sent by the replay
+        self.replayed_through = 0
+
+
+class WorkerSignal:
+    """Lets long-poll requests park on an asyncio.Condition until a frame for the worker arrives"""
+
+    __slots__ = ("worker_id", "condition", "version", "waiters")
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.condition = asyncio.Condition()
+        self.version = 0  # Bumped for every frame delivered to the worker in this process
+        self.waiters = 0
+
+    async def wait(self, seen_version, timeout):
+        """Wait until version moves past seen_version; returns False on timeout"""
+        async with self.condition:
+            try:
+                await asyncio.wait_for(self.condition.wait_for(lambda: self.version > seen_version), timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+    async def _notify(self):
+        async with self.condition:
+            self.condition.notify_all()
+
+
+class ConnectionHub:
+    """
+    Registry of live WebSocket connections keyed by worker id.
+
+    Sending never awaits a socket: frames are put on each connection's queue and written by
+    that connection's writer task, so one slow client cannot hold up anyone else. When a
+    queue is full the hub either drops the oldest frame or disconnects the client, depending
+    on slow_consumer_policy. All methods must run on the event loop that owns the sockets.
+
+    send_to_worker only reaches sockets held by this process; publish goes through the
+    backplane and reaches the worker wherever its sockets live.
+
+    Besides sockets, the hub serves streams without a socket (attach/next_frame, used by
+    SSE) and parked long-poll requests (watch/unwatch).
+    """
+
+    def __init__(self, queue_size=WS_QUEUE_SIZE, slow_consumer_policy=WS_SLOW_CONSUMER_POLICY,
+                 heartbeat_seconds=WS_HEARTBEAT_SECONDS, idle_timeout_seconds=WS_IDLE_TIMEOUT_SECONDS,
+                 send_timeout_seconds=WS_SEND_TIMEOUT_SECONDS, backplane=None):
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.heartbeat_seconds = heartbeat_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.send_timeout_seconds = send_timeout_seconds
+        self._connections = {}  # worker id -> set of Connection
+        self._signals = {}  # worker id -> WorkerSignal, while long-poll requests wait
+        self.backplane = backplane or build_backplane()
+        self.frames_queued = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.slow_disconnects = 0
+        self.idle_evictions = 0
+        self.send_failures = 0
+        self.bytes_sent = {encoding: 0 for encoding in (ENCODING_JSON, ENCODING_MSGPACK)}
+
+    async def connect(self, websocket, worker_id, hold=False, encoding=ENCODING_JSON, heartbeat=False):
+        """
+        Accept and register a socket; returns its Connection.
+
+        With hold=True live frames are queued but not written until release(), so the caller
+        can first send a replay directly on the socket. With heartbeat=True the socket gets
+        run_heartbeat's ping frames and is evicted when the client goes quiet.
+        """
+        await websocket.accept()
+        connection = self._register(Connection(websocket, worker_id, self.queue_size, encoding, heartbeat), hold)
+        connection.writer = asyncio.create_task(self._write_loop(connection))
+        return connection
+
+    def attach(self, worker_id, hold=False):
+        """Register a socketless stream whose consumer pulls frames with next_frame()"""
+        return self._register(Connection(None, worker_id, self.queue_size), hold)
+
+    async def next_frame(self, connection, timeout):
+        """Next frame for an attached stream, or None if nothing arrived within timeout"""
+        await connection.ready.wait()
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                frame = await asyncio.wait_for(connection.queue.get(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                return None
+            if frame.seq is None or frame.seq > connection.replayed_through:
+                self.frames_sent += 1
+                return frame
+
+    def _register(self, connection, hold):
+        if not hold:
+            connection.ready.set()
+        if not self._has_local_interest(connection.worker_id):
+            self.backplane.subscribe(connection.worker_id)
+        self._connections.setdefault(connection.worker_id, set()).add(connection)
+        return connection
+
+    def _has_local_interest(self, worker_id):
+        return worker_id in self._connections or worker_id in self._signals
+
+    def watch(self, worker_id):
+        """Signal for a parked long-poll request; pair every call with unwatch()"""
+        signal = self._signals.get(worker_id)
+        if signal is None:
+            if not self._has_local_interest(worker_id):
+                self.backplane.subscribe(worker_id)
+            signal = self._signals[worker_id] = WorkerSignal(worker_id)
+        signal.waiters += 1
+        return signal
+
+    def unwatch(self, signal):
+        signal.waiters -= 1
+        if signal.waiters <= 0 and self._signals.get(signal.worker_id) is signal:
+            del self._signals[signal.worker_id]
+            if not self._has_local_interest(signal.worker_id):
+                self.backplane.unsubscribe(signal.worker_id)
+
+    def _unregister(self, connection):
+        """Remove a connection from the registry; returns False if it was already gone"""
+        if connection.closed:
+            return False
+        connection.closed = True
+        connections = self._connections.get(connection.worker_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self._connections[connection.worker_id]
+                if not self._has_local_interest(connection.worker_id):
+                    self.backplane.unsubscribe(connection.worker_id)
+        return True
+
+    async def _close(self, connection, code):
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+        if connection.websocket is None:
+            return
+        try:
+            await connection.websocket.close(code=code)
+        except Exception:
+            pass  # Already closed by the client
+
+    async def disconnect(self, connection, code=1000):
+        """Unregister a connection, stop its writer and close the socket (idempotent)"""
+        if self._unregister(connection):
+            await self._close(connection, code)
+
+    def release(self, connection, replayed_through=0):
+        """Start writing live frames, skipping any the replay already covered"""
+        connection.replayed_through = replayed_through
+        connection.ready.set()
+
+    def touch(self, connection):
+        """Record client activity (pong or any inbound frame)"""
+        connection.last_seen = time.monotonic()
+
+    def _offer(self, connection, frame):
+        if connection.closed:
+            return False
+        try:
+            connection.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            if self.slow_consumer_policy == "disconnect":
+                if self._unregister(connection):
+                    self.slow_disconnects += 1
+                    asyncio.ensure_future(self._close(connection, CLOSE_SLOW_CONSUMER))
+                return False
+            # Drop the oldest frame to make room for the newest
+            connection.queue.get_nowait()
+            connection.queue.put_nowait(frame)
+            connection.dropped += 1
+            self.frames_dropped += 1
+        self.frames_queued += 1
+        return True
+
+    def send_to_worker(self, worker_id, message, exclude=None, seq=None):
+        """Queue a frame (JSON text or Frame) for every connection of a worker; returns how many accepted it"""
+        frame = message if isinstance(message, Frame) else Frame(message, seq)
+        queued = 0
+        for connection in list(self._connections.get(worker_id, ())):
+            if connection is not exclude and self._offer(connection, frame):
+                queued += 1
+        signal = self._signals.get(worker_id)
+        if signal is not None:
+            signal.version += 1
+            asyncio.ensure_future(signal._notify())
+            queued += signal.waiters
+        return queued
+
+    async def publish(self, worker_id, message, seq=None):
+        """Send a frame to a worker's sockets in any process; returns how many processes hold one"""
+        return await self.backplane.publish(worker_id, message, seq)
+
+    def _deliver_local(self, worker_id, message, seq=None):
+        return self.send_to_worker(worker_id, message, seq=seq)
+
+    async def start_backplane(self):
+        await self.backplane.start(self._deliver_local)
+
+    async def stop_backplane(self):
+        await self.backplane.stop()
+
+    def broadcast(self, worker_ids, message):
+        """Queue the same frame for many workers and return immediately; it is encoded once per encoding"""
+        frame = message if isinstance(message, Frame) else Frame(message)
+        return sum(self.send_to_worker(worker_id, frame) for worker_id in worker_ids)
+
+    async def send_direct(self, connection, frame):
+        """Write a frame on the socket now, bypassing the queue (used for replay while the writer is held)"""
+        await self._write(connection, frame if isinstance(frame, Frame) else Frame(frame))
+
+    async def _write(self, connection, frame):
+        payload = frame.encode(connection.encoding)
+        if connection.encoding == ENCODING_MSGPACK:
+            send = connection.websocket.send_bytes(payload)
+        else:
+            send = connection.websocket.send_text(payload)
+        await asyncio.wait_for(send, self.send_timeout_seconds)
+        self.bytes_sent[connection.encoding] += len(payload)
+        self.frames_sent += 1
+
+    def is_connected(self, worker_id):
+        return self._has_local_interest(worker_id)
+
+    def connection_count(self, worker_id):
+        return len(self._connections.get(worker_id, ()))
+
+    def connected_workers(self):
+        return list(self._connections.keys())
+
+    async def _write_loop(self, connection):
+        try:
+            await connection.ready.wait()
+            while True:
+                frame = await connection.queue.get()
+                if frame.seq is not None and frame.seq <= connection.replayed_through:
+                    continue
+                await self._write(connection, frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.send_failures += 1
+            logger.info(f"Dropping WebSocket for worker {connection.worker_id} after failed send: {e!r}")
+            await self.disconnect(connection, code=1011)
+
+    async def run_heartbeat(self):
+        """
+        Background loop: ping the connections that opted in to heartbeats and evict the ones
+        that have gone quiet. Other sockets never see a ping frame, so receive-only clients
+        are neither confused by one nor evicted for not sending anything.
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            now = time.monotonic()
+            for connections in list(self._connections.values()):
+                for connection in list(connections):
+                    if not connection.heartbeat:
+                        continue
+                    if now - connection.last_seen > self.idle_timeout_seconds:
+                        self.idle_evictions += 1
+                        await self.disconnect(connection, code=1001)
+                    else:
+                        self._offer(connection, PING_FRAME)
+
+    def stats(self):
+        return {
+            "connected_workers": len(self._connections),
+            "long_poll_waiters": sum(signal.waiters for signal in self._signals.values()),
+            "connections": sum(len(connections) for connections in self._connections.values()),
+            "queued_frames": sum(c.queue.qsize() for connections in self._connections.values() for c in connections),
+            "frames_queued": self.frames_queued,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "slow_consumer_disconnects": self.slow_disconnects,
+            "idle_evictions": self.idle_evictions,
+            "send_failures": self.send_failures,
+            "slow_consumer_policy": self.slow_consumer_policy,
+            "bytes_sent": dict(self.bytes_sent),
+            "connections_by_encoding": {
+                encoding: sum(1 for connections in self._connections.values() for c in connections if c.encoding == encoding)
+                for encoding in self.bytes_sent
+            },
+            "backplane": self.backplane.stats(),
+        }
+
+
+hub = ConnectionHub()
+register_metrics("websocket_hub", hub.stats)
@@ -3,17 +3,29 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import ValidationError
-from core.database import engine, Base
+from core.database import engine, async_engine, Base
+from core.db_routing import read_your_writes_middleware, replica_set
 # Import all models so SQLAlchemy knows about them
 from models.user import User
 from models.business_owner import BusinessOwner
 from models.worker import Worker
 from models.job import Job
 from models.job_application import JobApplication
-from api import user_routes, business_owner_routes, worker_routes, job_routes, application_routes, notification_routes, notification_ws
+from models.notification import Notification
+from models.outbox import OutboxMessage
+from models.notification_archive import NotificationArchive
+from api import user_routes, business_owner_routes, worker_routes, job_routes, application_routes, notification_routes, notification_ws, notification_stream, metrics_routes
 from api.auth import router as auth_router
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy import text
+from core.spatial_index import load_worker_index, reconcile_worker_index_periodically
+from core.outbox import outbox_relay
+from core.ws_hub import hub
+from core.retention import run_retention_periodically
+from core.presence import presence, flush_presence_periodically
+from core.fcm_topics import topic_subscriptions, sync_topic_subscriptions_periodically
+from core.fcm_tokens import token_pruner, prune_tokens_periodically
+import asyncio
 import logging
 
 # Configure logging
@@ -35,6 +47,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.middleware("http")(read_your_writes_middleware)
 
 # Remove Base.metadata.create_all for Alembic migrations
 # Base.metadata.create_all(bind=engine)
@@ -49,6 +62,43 @@ def check_db():
         print("Database connection failed:", e)
         raise e  # This will stop the app if DB is not reachable
 
+# Long-running background tasks started at startup, cancelled at shutdown
+background_loops = []
+
+@app.on_event("startup")
+async def start_worker_index():
+    """Bulk-load the in-memory worker spatial index and keep it reconciled with the database"""
+    await asyncio.to_thread(load_worker_index)
+    background_loops.append(asyncio.create_task(reconcile_worker_index_periodically()))
+
+@app.on_event("startup")
+async def start_notification_delivery():
+    await hub.start_backplane()
+    outbox_relay.start(asyncio.get_running_loop())
+    background_loops.append(asyncio.create_task(hub.run_heartbeat()))
+    background_loops.append(asyncio.create_task(run_retention_periodically()))
+    background_loops.append(asyncio.create_task(flush_presence_periodically()))
+    background_loops.append(asyncio.create_task(prune_tokens_periodically()))
+    if topic_subscriptions.enabled:
+        background_loops.append(asyncio.create_task(sync_topic_subscriptions_periodically()))
+
+@app.on_event("shutdown")
+async def stop_background_loops():
+    for task in background_loops:
+        task.cancel()
+    await asyncio.gather(*background_loops, return_exceptions=True)
+    background_loops.clear()
+    # Let the relay finish the batches it has claimed before the process exits
+    await asyncio.to_thread(outbox_relay.stop)
+    await hub.stop_backplane()
+    await asyncio.to_thread(presence.flush)
+    await asyncio.to_thread(token_pruner.flush)
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica in replica_set.replicas:
+        if replica.async_engine is not None:
+            await replica.async_engine.dispose()
+
 # Global exception handlers
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -169,4 +219,6 @@ app.include_router(job_routes.router)
 app.include_router(application_routes.router) 
 app.include_router(notification_routes.router)
 app.include_router(notification_ws.router)
+app.include_router(notification_stream.router)
+app.include_router(metrics_routes.router)
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"]) 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from core.database import Base
 
 class BusinessOwner(Base):
@@ -15,4 +15,13 @@ class BusinessOwner(Base):
     state = Column(String(50))
     city = Column(String(50))
     pincode = Column(String(20))
-    year_established = Column(Integer) 
\ No newline at end of file
+    year_established = Column(Integer)
+
+    __table_args__ = (
+        # List pages: WHERE <filter> = ? ORDER BY id, or ORDER BY <sort>, id, see BUSINESS_OWNER_SORTS
+        Index("ix_business_owners_business_name_id", "business_name", "id"),
+        Index("ix_business_owners_year_established_id", "year_established", "id"),
+        Index("ix_business_owners_city_id", "city", "id"),
+        Index("ix_business_owners_state_id", "state", "id"),
+        Index("ix_business_owners_industry_id", "industry", "id"),
+    ) 
\ No newline at end of file
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index, event
 from core.database import Base
+from core.geo import sync_h3_cell
 from datetime import datetime
 
 class Job(Base):
@@ -23,4 +24,24 @@ class Job(Base):
     contact_phone = Column(String(20))
     contact_email = Column(String(100))
     latitude = Column(Float)
-    longitude = Column(Float) 
\ No newline at end of file
+    longitude = Column(Float)
+    h3_cell = Column(String(16), index=True)  # Derived from latitude/longitude
+    # Parent cells of h3_cell for multi-resolution region covers
+    h3_cell_r4 = Column(String(16), index=True)
+    h3_cell_r5 = Column(String(16), index=True)
+    h3_cell_r6 = Column(String(16), index=True)
+    h3_cell_r7 = Column(String(16), index=True)
+
+    __table_args__ = (
+        # List pages: WHERE <filter> = ? ORDER BY id, or ORDER BY <sort>, id, see core.pagination.Keyset
+        Index("ix_jobs_business_owner_id_id", "business_owner_id", "id"),
+        Index("ix_jobs_status_id", "status", "id"),
+        Index("ix_jobs_city_id", "city", "id"),
+        Index("ix_jobs_posted_date_id", "posted_date", "id"),
+        Index("ix_jobs_start_date_id", "start_date", "id"),
+        # Range scans for min_hourly_rate / max_hourly_rate; not a sort, see JOB_SORTS
+        Index("ix_jobs_hourly_rate_id", "hourly_rate", "id"),
+    )
+
+event.listen(Job, "before_insert", sync_h3_cell)
+event.listen(Job, "before_update", sync_h3_cell) 
\ No newline at end of file
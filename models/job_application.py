@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, UniqueConstraint
 from core.database import Base
 from datetime import datetime
 
@@ -15,4 +15,8 @@ class JobApplication(Base):
     # Add unique constraint to prevent duplicate applications
     __table_args__ = (
         UniqueConstraint('job_id', 'worker_id', name='unique_job_worker_application'),
+        # The unique constraint serves job_id lookups; these serve the other list pages
+        Index("ix_job_applications_worker_id_id", "worker_id", "id"),
+        Index("ix_job_applications_status_id", "status", "id"),
+        Index("ix_job_applications_applied_date_id", "applied_date", "id"),
     ) 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, SmallInteger, Text, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from core.database import Base
@@ -8,9 +8,19 @@ class Notification(Base):
     id = Column(Integer, primary_key=True, index=True)
     worker_id = Column(Integer, ForeignKey('workers.id', ondelete="CASCADE"), nullable=False)
     job_id = Column(Integer, ForeignKey('jobs.id', ondelete="CASCADE"), nullable=False)
-    message = Column(String, nullable=False)
+    # Text is rendered on read from core.notification_templates; only custom notifications store a message
+    type_code = Column(SmallInteger, nullable=False, default=0, server_default="0")
+    params = Column(Text, nullable=True)  # JSON template parameters beyond job_id
+    message = Column(Text, nullable=True)
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     worker = relationship('Worker')
-    job = relationship('Job') 
\ No newline at end of file
+    job = relationship('Job')
+
+    __table_args__ = (
+        # Inbox pages: WHERE worker_id = ? AND id < ? ORDER BY id DESC LIMIT ?
+        Index("ix_notifications_worker_id_id", "worker_id", "id"),
+        # Unread badge: index-only COUNT(*) WHERE worker_id = ? AND is_read = false
+        Index("ix_notifications_worker_unread", "worker_id", "is_read"),
+    ) 
\ No newline at end of file
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, SmallInteger, Text, Boolean, DateTime, Index
+from datetime import datetime
+from core.database import Base
+
+class NotificationArchive(Base):
+    """Notifications moved out of the hot table by core.retention; no foreign keys so jobs and workers can be deleted"""
+    __tablename__ = 'notifications_archive'
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Same id as in notifications
+    worker_id = Column(Integer, nullable=False)
+    job_id = Column(Integer, nullable=False)
+    type_code = Column(SmallInteger, nullable=False, default=0)
+    params = Column(Text, nullable=True)
+    message = Column(Text, nullable=True)
+    is_read = Column(Boolean, default=False)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_notifications_archive_worker_id_id", "worker_id", "id"),
+    )
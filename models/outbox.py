@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+from core.database import Base
+
+class OutboxMessage(Base):
+    __tablename__ = "notification_outbox"
+    id = Column(Integer, primary_key=True, index=True)
+    channel = Column(String(20), nullable=False)  # "ws", "fcm" or "fcm_topic"
+    worker_id = Column(Integer, nullable=False)  # 0 for fcm_topic rows
+    payload = Column(Text, nullable=False)  # JSON
+    status = Column(String(20), nullable=False, default="pending")  # pending, dead (delivered rows are deleted)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # next claim / retry time
+    last_error = Column(String(500))
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_notification_outbox_claim", "status", "channel", "available_at"),
+        # Finds a worker's other pending rows when coalescing FCM pushes into a digest
+        Index("ix_notification_outbox_worker", "worker_id", "channel", "status"),
+    )
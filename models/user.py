@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index
 from core.database import Base
 
 class User(Base):
@@ -7,4 +7,10 @@ class User(Base):
     username = Column(String(50), unique=True, nullable=False)
     email = Column(String(100), unique=True, nullable=False)
     password_hash = Column(String(128), nullable=False)
-    role = Column(String(20), nullable=False) 
\ No newline at end of file
+    role = Column(String(20), nullable=False)
+
+    __table_args__ = (
+        # List pages: WHERE role = ? ORDER BY id, or ORDER BY username, id, see USER_SORTS
+        Index("ix_users_username_id", "username", "id"),
+        Index("ix_users_role_id", "role", "id"),
+    ) 
\ No newline at end of file
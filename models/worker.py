@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Index, event
 from core.database import Base
+from core.geo import sync_h3_cell
 
 class Worker(Base):
     __tablename__ = "workers"
@@ -16,4 +17,28 @@ class Worker(Base):
     pincode = Column(String(20))
     latitude = Column(Float)
     longitude = Column(Float)
-    fcm_token = Column(String(256), nullable=True) 
\ No newline at end of file
+    fcm_token = Column(String(256), nullable=True, index=True)  # one worker per token, see core.fcm_tokens
+    h3_cell = Column(String(16), index=True)  # Derived from latitude/longitude
+    # Parent cells of h3_cell for multi-resolution region covers
+    h3_cell_r4 = Column(String(16), index=True)
+    h3_cell_r5 = Column(String(16), index=True)
+    h3_cell_r6 = Column(String(16), index=True)
+    h3_cell_r7 = Column(String(16), index=True)
+    # Every notification with id <= this is read; notifications.is_read only marks reads above it
+    last_read_notification_id = Column(Integer, nullable=False, default=0, server_default="0")
+    # Written in batches by core.presence: highest notification a live socket acked, and until when a socket is live
+    last_acked_notification_id = Column(Integer, nullable=False, default=0, server_default="0")
+    presence_expires_at = Column(DateTime, nullable=True)
+    # Cell whose FCM topic fcm_token is subscribed to (core.fcm_topics); differs from h3_cell while a resync is due
+    fcm_topic_cell = Column(String(16), nullable=True)
+
+    __table_args__ = (
+        # List pages: WHERE <filter> = ? ORDER BY id, or ORDER BY <sort>, id, see WORKER_SORTS
+        Index("ix_workers_name_id", "name", "id"),
+        Index("ix_workers_years_of_experience_id", "years_of_experience", "id"),
+        Index("ix_workers_city_id", "city", "id"),
+        Index("ix_workers_state_id", "state", "id"),
+    )
+
+event.listen(Worker, "before_insert", sync_h3_cell)
+event.listen(Worker, "before_update", sync_h3_cell) 
\ No newline at end of file
@@ -77,6 +77,13 @@ class JobResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class NearbyJobResponse(JobResponse):
+    distance_km: float
+
+class NearbyJobsPage(BaseModel):
+    items: list[NearbyJobResponse]
+    next_cursor: Optional[str] = None
+
 class JobUpdate(BaseModel):
     business_owner_id: Optional[int] = None
     title: Optional[str] = None
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
 
 class NotificationBase(BaseModel):
     worker_id: int
@@ -11,11 +12,22 @@ class NotificationCreate(NotificationBase):
 
 class NotificationResponse(NotificationBase):
     id: int
+    type_code: int = 0
     is_read: bool
     created_at: datetime
 
     class Config:
         from_attributes = True
 
+class NotificationPage(BaseModel):
+    items: list[NotificationResponse]
+    unread_count: int
+    next_before_id: Optional[int] = None  # pass as before_id to fetch the next (older) page
+
 class NotificationMarkRead(BaseModel):
-    notification_ids: list[int] 
\ No newline at end of file
+    notification_ids: list[int]
+    worker_id: int  # only this worker's notifications are updated
+
+class NotificationReadWatermark(BaseModel):
+    worker_id: int
+    last_read_notification_id: int 
\ No newline at end of file
@@ -154,11 +154,11 @@ def main():
     # 14. Get notifications for worker
     resp = session.get(f"{BASE_URL}/notifications/{created['worker_id']}")
     record_result("Get Notifications for Worker", resp, 200)
-    notif_ids = [n.get("id") for n in resp.json()] if resp.ok else []
+    notif_ids = [n.get("id") for n in resp.json()["items"]] if resp.ok else []
 
     # 15. Mark notifications as read
     if notif_ids:
-        resp = session.post(f"{BASE_URL}/notifications/mark_read", json={"notification_ids": notif_ids})
+        resp = session.post(f"{BASE_URL}/notifications/mark_read", json={"notification_ids": notif_ids, "worker_id": created["worker_id"]})
         record_result("Mark Notifications as Read", resp, 200)
 
     # 16. Force FCM notification (should succeed)
@@ -182,7 +182,7 @@ def main():
     notif_ids = []
     resp = session.get(f"{BASE_URL}/notifications/{created['worker_id']}")
     if resp.ok:
-        notif_ids = [n.get("id") for n in resp.json()]
+        notif_ids = [n.get("id") for n in resp.json()["items"]]
         for notif_id in notif_ids:
             del_resp = session.delete(f"{BASE_URL}/notifications/id/{notif_id}")
             record_result(f"Delete Notification {notif_id} (Cleanup)", del_resp, 200)
@@ -246,7 +246,7 @@ def main():
     record_result("Apply for job with non-existent job (Expect 400 or 404)", resp, 404 if resp.status_code == 404 else 400)
 
     # 32. Mark non-existent notification as read
-    resp = session.post(f"{BASE_URL}/notifications/mark_read", json={"notification_ids": [999999]})
+    resp = session.post(f"{BASE_URL}/notifications/mark_read", json={"notification_ids": [999999], "worker_id": created["worker_id"]})
     record_result("Mark non-existent notification as read (Expect 404, 400, or 200)", resp, 200 if resp.status_code == 200 else (404 if resp.status_code == 404 else 400))
 
     # 33. Delete already deleted job
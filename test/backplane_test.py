@@ -0,0 +1,122 @@
+"""
+Backplane test: a frame published in one process reaches the process that holds the worker's
+socket through the Unix-socket broker, and only that process.
+
+Starts the broker and a subscriber process, and publishes from this one.
+
+    python test/backplane_test.py
+    python -m pytest test/backplane_test.py
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SOCKET_PATH = os.path.join(tempfile.gettempdir(), f"workbee_backplane_test_{os.getpid()}.sock")
+sys.path.insert(0, ROOT)
+
+from core.backplane import UnixSocketBackplane
+from core.ws_hub import ConnectionHub
+
+# Holds worker 7's "socket": prints each frame delivered to it, exits after the first
+SUBSCRIBER = """
+import asyncio, sys
+from core.backplane import UnixSocketBackplane
+
+async def main():
+    delivered = asyncio.Event()
+    def on_deliver(worker_id, message, seq):
+        print(worker_id, seq, message, flush=True)
+        delivered.set()
+    backplane = UnixSocketBackplane(sys.argv[1])
+    await backplane.start(on_deliver)
+    backplane.subscribe(7)
+    print("subscribed", flush=True)
+    await asyncio.wait_for(delivered.wait(), 10)
+    await backplane.stop()
+
+asyncio.run(main())
+"""
+
+broker = None
+
+
+def setup_module(module=None):
+    global broker
+    broker = subprocess.Popen([sys.executable, "-m", "core.backplane", SOCKET_PATH], cwd=ROOT)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(SOCKET_PATH):
+        assert time.monotonic() < deadline and broker.poll() is None, "backplane broker did not start"
+        time.sleep(0.05)
+
+
+def teardown_module(module=None):
+    broker.terminate()
+    broker.wait(10)
+    if os.path.exists(SOCKET_PATH):
+        os.remove(SOCKET_PATH)
+
+
+async def publish_until_routed(publisher, worker_id, message, seq):
+    """The broker handles each client's lines in order, so a subscription may land just after a publish"""
+    for _ in range(100):
+        routed = await publisher.publish(worker_id, message, seq)
+        if routed:
+            return routed
+        await asyncio.sleep(0.05)
+    return 0
+
+
+def test_publish_reaches_another_process():
+    subscriber = subprocess.Popen([sys.executable, "-c", SUBSCRIBER, SOCKET_PATH], cwd=ROOT,
+                                  stdout=subprocess.PIPE, text=True)
+    try:
+        assert subscriber.stdout.readline().strip() == "subscribed"
+
+        async def scenario():
+            backplane = UnixSocketBackplane(SOCKET_PATH)
+            await backplane.start(lambda worker_id, message, seq: None)
+            try:
+                assert await backplane.publish(8, "nobody holds worker 8", 1) == 0
+                return await publish_until_routed(backplane, 7, json.dumps({"job_id": 1}), 42)
+            finally:
+                await backplane.stop()
+
+        assert asyncio.run(scenario()) == 1
+        output, _ = subscriber.communicate(timeout=10)
+    finally:
+        subscriber.kill()
+    assert output.splitlines() == ['7 42 {"job_id": 1}']
+
+
+def test_hub_publish_reaches_a_stream_held_by_another_hub():
+    async def scenario():
+        holder = ConnectionHub(backplane=UnixSocketBackplane(SOCKET_PATH))
+        sender = ConnectionHub(backplane=UnixSocketBackplane(SOCKET_PATH))
+        await holder.start_backplane()
+        await sender.start_backplane()
+        try:
+            stream = holder.attach(9)
+            assert sender.connection_count(9) == 0
+            assert await publish_until_routed(sender, 9, "hello", 5) == 1
+            frame = await holder.next_frame(stream, timeout=5)
+            assert (frame.text, frame.seq) == ("hello", 5)
+        finally:
+            await holder.stop_backplane()
+            await sender.stop_backplane()
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    setup_module()
+    try:
+        test_publish_reaches_another_process()
+        test_hub_publish_reaches_a_stream_held_by_another_hub()
+    finally:
+        teardown_module()
+    print("backplane ok")
@@ -0,0 +1,97 @@
+"""
+Read watermark test: mark_all_read marks what the worker has, never notifications sent later.
+
+Calls the route through the app against a temporary SQLite database.
+
+    python test/notification_read_test.py
+    python -m pytest test/notification_read_test.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DB_PATH = os.path.join(tempfile.gettempdir(), "workbee_notification_read_test.db")
+
+os.environ["WORKBEE_DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["WORKBEE_DATABASE_REPLICA_URLS"] = ""
+os.environ["WORKBEE_DB_MODE"] = "sync"
+os.environ["WORKBEE_FCM_TRANSPORT"] = "fake"
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", os.path.join(ROOT, "firebase-service-account.json"))
+sys.path.insert(0, ROOT)
+if os.path.exists(DB_PATH):
+    os.remove(DB_PATH)
+
+from sqlalchemy import delete, insert
+
+# Ids clear of the rows other test modules seed when pytest runs them on one database
+USER_ID = WORKER_ID = OWNER_ID = JOB_ID = 9100
+
+
+def setup_module(module=None):
+    """Import the app on first use rather than at collection; see outbox_test.setup_module"""
+    global main, engine, Notification, BusinessOwner, Job, User, Worker
+    import main
+    from core.database import Base, engine
+    from models.business_owner import BusinessOwner
+    from models.job import Job
+    from models.notification import Notification
+    from models.user import User
+    from models.worker import Worker
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": USER_ID + i, "username": f"watermark{i}", "email": f"watermark{i}@example.com",
+             "password_hash": "x", "role": "seeker"}
+            for i in (0, 1)
+        ])
+        conn.execute(insert(Worker).values(id=WORKER_ID, user_id=USER_ID, name="Watermark"))
+        conn.execute(insert(BusinessOwner).values(id=OWNER_ID, user_id=USER_ID + 1, business_name="Watermark"))
+        conn.execute(insert(Job).values(id=JOB_ID, business_owner_id=OWNER_ID, title="Watermark"))
+
+
+def teardown_module(module=None):
+    """Remove the rows again: later modules seed with autoincrement ids that start after the highest one"""
+    with engine.begin() as conn:
+        conn.execute(delete(Notification).where(Notification.worker_id == WORKER_ID))
+        conn.execute(delete(Job).where(Job.id == JOB_ID))
+        conn.execute(delete(BusinessOwner).where(BusinessOwner.id == OWNER_ID))
+        conn.execute(delete(Worker).where(Worker.id == WORKER_ID))
+        conn.execute(delete(User).where(User.id.in_([USER_ID, USER_ID + 1])))
+
+
+def notify(count):
+    """Insert count notifications for the worker; returns their ids"""
+    with engine.begin() as conn:
+        return [
+            conn.execute(insert(Notification).values(worker_id=WORKER_ID, job_id=JOB_ID, type_code=0, message="watermark",
+                                                     is_read=False, created_at=datetime.utcnow())).inserted_primary_key[0]
+            for _ in range(count)
+        ]
+
+
+def test_watermark_stops_at_newest_notification():
+    from fastapi.testclient import TestClient
+    client = TestClient(main.app)
+    ids = notify(3)
+
+    response = client.post(f"/notifications/{WORKER_ID}/mark_all_read", params={"up_to_id": 999999999})
+    assert response.status_code == 200
+    assert response.json()["last_read_notification_id"] == ids[-1]
+
+    later = notify(2)
+    page = client.get(f"/notifications/{WORKER_ID}").json()
+    assert page["unread_count"] == 2
+    assert {item["id"] for item in page["items"] if not item["is_read"]} == set(later)
+
+    response = client.post(f"/notifications/{WORKER_ID}/mark_all_read")
+    assert response.json()["last_read_notification_id"] == later[-1]
+    assert client.get(f"/notifications/{WORKER_ID}").json()["unread_count"] == 0
+
+
+if __name__ == "__main__":
+    setup_module()
+    test_watermark_stops_at_newest_notification()
+    teardown_module()
+    print("notification read ok")
@@ -0,0 +1,109 @@
+"""
+Reconnect replay test: a WebSocket opened with last_seen_id first gets only the notifications it
+missed, then live frames, skipping live frames the replay already covered.
+
+Connects to /ws/notifications/{worker_id} through the app against a temporary SQLite database.
+
+    python test/notification_replay_test.py
+    python -m pytest test/notification_replay_test.py
+"""
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DB_PATH = os.path.join(tempfile.gettempdir(), "workbee_notification_replay_test.db")
+
+os.environ["WORKBEE_DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["WORKBEE_DATABASE_REPLICA_URLS"] = ""
+os.environ["WORKBEE_DB_MODE"] = "sync"
+os.environ["WORKBEE_FCM_TRANSPORT"] = "fake"
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", os.path.join(ROOT, "firebase-service-account.json"))
+sys.path.insert(0, ROOT)
+if os.path.exists(DB_PATH):
+    os.remove(DB_PATH)
+
+from sqlalchemy import delete, insert
+
+# Ids clear of the rows other test modules seed when pytest runs them on one database
+USER_ID = WORKER_ID = OWNER_ID = JOB_ID = 9200
+notification_ids = []
+
+
+def setup_module(module=None):
+    """Import the app on first use rather than at collection; see outbox_test.setup_module"""
+    global main, engine, hub, load_missed_notifications, Notification, BusinessOwner, Job, User, Worker
+    import main
+    from api.notification_ws import load_missed_notifications
+    from core.database import Base, engine
+    from core.ws_hub import hub
+    from models.business_owner import BusinessOwner
+    from models.job import Job
+    from models.notification import Notification
+    from models.user import User
+    from models.worker import Worker
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": USER_ID + i, "username": f"replay{i}", "email": f"replay{i}@example.com",
+             "password_hash": "x", "role": "seeker"}
+            for i in (0, 1)
+        ])
+        conn.execute(insert(Worker).values(id=WORKER_ID, user_id=USER_ID, name="Replay"))
+        conn.execute(insert(BusinessOwner).values(id=OWNER_ID, user_id=USER_ID + 1, business_name="Replay"))
+        conn.execute(insert(Job).values(id=JOB_ID, business_owner_id=OWNER_ID, title="Replay"))
+        notification_ids[:] = [
+            conn.execute(insert(Notification).values(worker_id=WORKER_ID, job_id=JOB_ID, type_code=0,
+                                                     message=f"replay {n}", is_read=False,
+                                                     created_at=datetime.utcnow())).inserted_primary_key[0]
+            for n in range(5)
+        ]
+
+
+def teardown_module(module=None):
+    """Remove the rows again: later modules seed with autoincrement ids that start after the highest one"""
+    with engine.begin() as conn:
+        conn.execute(delete(Notification).where(Notification.worker_id == WORKER_ID))
+        conn.execute(delete(Job).where(Job.id == JOB_ID))
+        conn.execute(delete(BusinessOwner).where(BusinessOwner.id == OWNER_ID))
+        conn.execute(delete(Worker).where(Worker.id == WORKER_ID))
+        conn.execute(delete(User).where(User.id.in_([USER_ID, USER_ID + 1])))
+
+
+def test_reconnect_replays_missed_then_goes_live():
+    from fastapi.testclient import TestClient
+    last_seen_id = notification_ids[1]
+    # As a context manager, so the socket and the hub share the app's event loop
+    with TestClient(main.app) as client:
+        with client.websocket_connect(f"/ws/notifications/{WORKER_ID}?last_seen_id={last_seen_id}") as websocket:
+            replayed = [websocket.receive_json() for _ in notification_ids[2:]]
+            assert [frame["seq"] for frame in replayed] == notification_ids[2:]
+            assert all(frame["replay"] for frame in replayed)
+            assert replayed[0]["message"] == "replay 2"
+            assert websocket.receive_json() == {"type": "replay_complete", "count": 3,
+                                                "last_seen_id": notification_ids[-1], "truncated": False}
+
+            # A live frame the replay already sent is skipped; the next one goes out
+            for seq in (notification_ids[-1], notification_ids[-1] + 1):
+                client.portal.call(hub.send_to_worker, WORKER_ID, json.dumps({"seq": seq}), None, seq)
+            assert websocket.receive_json() == {"seq": notification_ids[-1] + 1}
+
+
+def test_replay_keeps_the_newest_when_truncated():
+    frames, truncated = load_missed_notifications(WORKER_ID, 0, limit=3)
+    assert [frame["seq"] for frame in frames] == notification_ids[-3:]
+    assert truncated
+    frames, truncated = load_missed_notifications(WORKER_ID, notification_ids[-1])
+    assert (frames, truncated) == ([], False)
+
+
+if __name__ == "__main__":
+    setup_module()
+    try:
+        test_reconnect_replays_missed_then_goes_live()
+        test_replay_keeps_the_newest_when_truncated()
+    finally:
+        teardown_module()
+    print("notification replay ok")
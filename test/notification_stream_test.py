@@ -0,0 +1,154 @@
+"""
+SSE and long-poll test: a parked long-poll request and an open event stream wake up as soon as
+the hub delivers a frame for their worker, and a poll that sees nothing times out empty.
+
+Calls the route coroutines of api/notification_stream.py on an event loop with the app's hub,
+against a temporary SQLite database. The test client is not used because it reads a streaming
+response only after the stream ends.
+
+    python test/notification_stream_test.py
+    python -m pytest test/notification_stream_test.py
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DB_PATH = os.path.join(tempfile.gettempdir(), "workbee_notification_stream_test.db")
+
+os.environ["WORKBEE_DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["WORKBEE_DATABASE_REPLICA_URLS"] = ""
+os.environ["WORKBEE_DB_MODE"] = "sync"
+os.environ["WORKBEE_FCM_TRANSPORT"] = "fake"
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", os.path.join(ROOT, "firebase-service-account.json"))
+sys.path.insert(0, ROOT)
+if os.path.exists(DB_PATH):
+    os.remove(DB_PATH)
+
+from sqlalchemy import delete, insert
+
+# Ids clear of the rows other test modules seed when pytest runs them on one database
+USER_ID = WORKER_ID = OWNER_ID = JOB_ID = 9300
+
+
+def setup_module(module=None):
+    """Import the app on first use rather than at collection; see outbox_test.setup_module"""
+    global engine, hub, poll_notifications, stream_notifications, Notification, BusinessOwner, Job, User, Worker
+    import main  # noqa: F401  registers every model on Base
+    from api.notification_stream import poll_notifications, stream_notifications
+    from core.database import Base, engine
+    from core.ws_hub import hub
+    from models.business_owner import BusinessOwner
+    from models.job import Job
+    from models.notification import Notification
+    from models.user import User
+    from models.worker import Worker
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": USER_ID + i, "username": f"stream{i}", "email": f"stream{i}@example.com",
+             "password_hash": "x", "role": "seeker"}
+            for i in (0, 1)
+        ])
+        conn.execute(insert(Worker).values(id=WORKER_ID, user_id=USER_ID, name="Stream"))
+        conn.execute(insert(BusinessOwner).values(id=OWNER_ID, user_id=USER_ID + 1, business_name="Stream"))
+        conn.execute(insert(Job).values(id=JOB_ID, business_owner_id=OWNER_ID, title="Stream"))
+
+
+def teardown_module(module=None):
+    """Remove the rows again: later modules seed with autoincrement ids that start after the highest one"""
+    with engine.begin() as conn:
+        conn.execute(delete(Notification).where(Notification.worker_id == WORKER_ID))
+        conn.execute(delete(Job).where(Job.id == JOB_ID))
+        conn.execute(delete(BusinessOwner).where(BusinessOwner.id == OWNER_ID))
+        conn.execute(delete(Worker).where(Worker.id == WORKER_ID))
+        conn.execute(delete(User).where(User.id.in_([USER_ID, USER_ID + 1])))
+
+
+def notify(message):
+    """Insert a notification for the worker; returns its id"""
+    with engine.begin() as conn:
+        return conn.execute(insert(Notification).values(worker_id=WORKER_ID, job_id=JOB_ID, type_code=0, message=message,
+                                                        is_read=False, created_at=datetime.utcnow())).inserted_primary_key[0]
+
+
+async def deliver(message):
+    """What the outbox relay does for a new notification: write the row, then hand its frame to the hub"""
+    notification_id = await asyncio.to_thread(notify, message)
+    hub.send_to_worker(WORKER_ID, json.dumps({"seq": notification_id, "message": message}), seq=notification_id)
+    return notification_id
+
+
+async def until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_long_poll_wakes_when_a_frame_arrives():
+    async def scenario():
+        since_id = await asyncio.to_thread(notify, "already seen")
+        started = time.monotonic()
+        poll = asyncio.create_task(poll_notifications(WORKER_ID, since_id=since_id, timeout=30, limit=100))
+        await until(lambda: hub.stats()["long_poll_waiters"] == 1)
+        await asyncio.sleep(0.2)  # past its first query: now parked on the hub, not on the database
+        notification_id = await deliver("long poll")
+        result = await asyncio.wait_for(poll, 5)
+        assert time.monotonic() - started < 5
+        assert [frame["seq"] for frame in result["items"]] == [notification_id]
+        assert result["items"][0]["message"] == "long poll"
+        assert (result["last_id"], result["has_more"]) == (notification_id, False)
+        assert hub.stats()["long_poll_waiters"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_long_poll_times_out_empty():
+    async def scenario():
+        since_id = await asyncio.to_thread(notify, "already seen")
+        result = await poll_notifications(WORKER_ID, since_id=since_id, timeout=0.2, limit=100)
+        assert result == {"items": [], "last_id": since_id, "has_more": False}
+        assert hub.stats()["long_poll_waiters"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_sse_resumes_then_streams_live_frames():
+    async def scenario():
+        seen_id = await asyncio.to_thread(notify, "seen")
+        missed_id = await asyncio.to_thread(notify, "missed")
+        response = await stream_notifications(WORKER_ID, since_id=None, last_event_id=str(seen_id))
+        events = response.body_iterator
+        try:
+            assert await anext(events) == "retry: 3000\n\n"
+            replayed = await anext(events)
+            assert replayed.startswith(f"id: {missed_id}\ndata: ") and '"replay": true' in replayed
+            assert (await anext(events)).startswith("event: replay_complete\n")
+
+            next_event = asyncio.create_task(anext(events))
+            await asyncio.sleep(0.05)
+            assert not next_event.done()  # waiting on the hub
+            notification_id = await deliver("live")
+            event = await asyncio.wait_for(next_event, 5)
+            assert event == f'id: {notification_id}\ndata: {{"seq": {notification_id}, "message": "live"}}\n\n'
+        finally:
+            await events.aclose()
+        assert hub.connection_count(WORKER_ID) == 0
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    setup_module()
+    try:
+        test_long_poll_wakes_when_a_frame_arrives()
+        test_long_poll_times_out_empty()
+        test_sse_resumes_then_streams_live_frames()
+    finally:
+        teardown_module()
+    print("notification stream ok")
@@ -0,0 +1,149 @@
+"""
+Outbox relay test: FCM rows are delivered, retried with backoff, and marked dead.
+
+Runs the relay's passes by hand (OutboxRelay.run_once) against a temporary SQLite database,
+with the fake FCM transport standing in for Firebase, then starts two relay threads on one
+table to check that no row is claimed, and pushed, twice.
+
+    python test/outbox_test.py
+    python -m pytest test/outbox_test.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DB_PATH = os.path.join(tempfile.gettempdir(), "workbee_outbox_test.db")
+
+os.environ["WORKBEE_DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["WORKBEE_DATABASE_REPLICA_URLS"] = ""
+os.environ["WORKBEE_DB_MODE"] = "sync"
+os.environ["WORKBEE_FCM_TRANSPORT"] = "fake"
+os.environ["WORKBEE_FCM_MIN_PUSH_INTERVAL_SECONDS"] = "0"
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", os.path.join(ROOT, "firebase-service-account.json"))
+sys.path.insert(0, ROOT)
+if os.path.exists(DB_PATH):
+    os.remove(DB_PATH)
+
+from sqlalchemy import delete, update
+
+PAYLOAD = {"title": "New Job Nearby!", "body": "New job: Outbox", "data": {"job_id": "1"}, "job_title": "Outbox"}
+
+
+def setup_module(module=None):
+    """
+    Import the app on first use rather than at collection, so that under pytest a test module
+    collected later (query_plan_test picks its own database) still configures core.database
+    """
+    global SessionLocal, fcm_dispatcher, OUTBOX_MAX_ATTEMPTS, OutboxRelay, enqueue_outbox, OutboxMessage
+    import main  # noqa: F401  registers every model on Base
+    from core.database import Base, SessionLocal, engine
+    from core.fcm_dispatch import fcm_dispatcher
+    from core.outbox import OUTBOX_MAX_ATTEMPTS, OutboxRelay, enqueue_outbox
+    from models.outbox import OutboxMessage
+    Base.metadata.create_all(bind=engine)
+
+
+def enqueue(worker_id, token):
+    enqueue_many([(worker_id, token)])
+
+
+def enqueue_many(recipients):
+    db = SessionLocal()
+    try:
+        db.execute(delete(OutboxMessage))
+        enqueue_outbox(db, "fcm", [(worker_id, dict(PAYLOAD, token=token)) for worker_id, token in recipients])
+        db.commit()
+    finally:
+        db.close()
+
+
+def outbox_row():
+    db = SessionLocal()
+    try:
+        return db.query(OutboxMessage).one_or_none()
+    finally:
+        db.close()
+
+
+def make_due():
+    db = SessionLocal()
+    try:
+        db.execute(update(OutboxMessage).values(available_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_delivered_row_is_deleted():
+    transport = fcm_dispatcher.transport
+    enqueue(1, "outbox-good")
+    relay = OutboxRelay(workers=0)
+    assert relay.run_once()
+    assert outbox_row() is None
+    assert [message.token for message in transport.sent][-1] == "outbox-good"
+    assert relay.stats()["channels"]["fcm"]["delivered"] == 1
+
+
+def test_failed_row_backs_off_then_dies():
+    fcm_dispatcher.transport.fail_tokens.add("outbox-failing")
+    enqueue(2, "outbox-failing")
+    relay = OutboxRelay(workers=0)
+
+    relay.run_once()
+    row = outbox_row()
+    assert (row.status, row.attempts) == ("pending", 1)
+    assert "Fake send failure" in row.last_error
+    first_delay = (row.available_at - datetime.utcnow()).total_seconds()
+    assert 1 <= first_delay <= 3  # OUTBOX_BACKOFF_BASE_SECONDS with jitter
+    assert not relay.run_once()  # not due yet
+
+    make_due()
+    relay.run_once()
+    row = outbox_row()
+    assert (row.status, row.attempts) == ("pending", 2)
+    assert (row.available_at - datetime.utcnow()).total_seconds() > first_delay
+
+    db = SessionLocal()
+    try:
+        db.execute(update(OutboxMessage).values(attempts=OUTBOX_MAX_ATTEMPTS - 1))
+        db.commit()
+    finally:
+        db.close()
+    make_due()
+    relay.run_once()
+    row = outbox_row()
+    assert (row.status, row.attempts) == ("dead", OUTBOX_MAX_ATTEMPTS)
+    assert json.loads(row.payload)["token"] == "outbox-failing"
+    assert not relay.run_once()  # dead rows are never claimed again
+    counts = relay.stats()["channels"]["fcm"]
+    assert (counts["retried"], counts["dead"], counts["delivered"]) == (2, 1, 0)
+
+
+def test_relay_threads_claim_each_row_once():
+    transport = fcm_dispatcher.transport
+    enqueue_many((worker_id, f"outbox-race-{worker_id}") for worker_id in range(1000, 1300))
+    relay = OutboxRelay(workers=2, batch_size=20, poll_seconds=0.01)
+    relay.start(None)  # FCM rows only; WebSocket delivery would need the app's event loop
+    try:
+        deadline = time.monotonic() + 30
+        while relay.stats()["channels"]["fcm"]["delivered"] < 300 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        relay.stop()
+    pushes = Counter(message.token for message in transport.sent if message.token.startswith("outbox-race-"))
+    assert len(pushes) == 300
+    assert [token for token, count in pushes.items() if count > 1] == []
+    assert relay.stats()["channels"]["fcm"]["delivered"] == 300
+
+
+if __name__ == "__main__":
+    setup_module()
+    test_delivered_row_is_deleted()
+    test_failed_row_backs_off_then_dies()
+    test_relay_threads_claim_each_row_once()
+    print("outbox ok")
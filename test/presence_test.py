@@ -0,0 +1,157 @@
+"""
+Presence test: the outbox relay skips FCM pushes a live socket acked, holds pushes to a present
+worker until the ack deadline, and pushes everyone else.
+
+Records connects and acks in a PresenceRegistry, flushes them to a temporary SQLite database, and
+runs the relay's passes by hand with the fake FCM transport.
+
+    python test/presence_test.py
+    python -m pytest test/presence_test.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DB_PATH = os.path.join(tempfile.gettempdir(), "workbee_presence_test.db")
+
+os.environ["WORKBEE_DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["WORKBEE_DATABASE_REPLICA_URLS"] = ""
+os.environ["WORKBEE_DB_MODE"] = "sync"
+os.environ["WORKBEE_FCM_TRANSPORT"] = "fake"
+os.environ["WORKBEE_FCM_MIN_PUSH_INTERVAL_SECONDS"] = "0"
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", os.path.join(ROOT, "firebase-service-account.json"))
+sys.path.insert(0, ROOT)
+if os.path.exists(DB_PATH):
+    os.remove(DB_PATH)
+
+from sqlalchemy import delete, insert, update
+
+# Ids clear of the rows other test modules seed when pytest runs them on one database
+ACKED, PRESENT, ABSENT = WORKERS = (9400, 9401, 9402)
+PAYLOAD = {"title": "New Job Nearby!", "body": "New job: Presence", "data": {"job_id": "1"}, "job_title": "Presence"}
+
+
+def setup_module(module=None):
+    """Import the app on first use rather than at collection; see outbox_test.setup_module"""
+    global engine, SessionLocal, fcm_dispatcher, OutboxRelay, enqueue_outbox, PresenceRegistry
+    global PRESENCE_ACK_DEADLINE_SECONDS, OutboxMessage, User, Worker
+    import main  # noqa: F401  registers every model on Base
+    from core.database import Base, SessionLocal, engine
+    from core.fcm_dispatch import fcm_dispatcher
+    from core.outbox import OutboxRelay, enqueue_outbox
+    from core.presence import PRESENCE_ACK_DEADLINE_SECONDS, PresenceRegistry
+    from models.outbox import OutboxMessage
+    from models.user import User
+    from models.worker import Worker
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": worker_id, "username": f"presence{worker_id}", "email": f"presence{worker_id}@example.com",
+             "password_hash": "x", "role": "seeker"}
+            for worker_id in WORKERS
+        ])
+        conn.execute(insert(Worker), [
+            {"id": worker_id, "user_id": worker_id, "name": "Presence", "fcm_token": token(worker_id)}
+            for worker_id in WORKERS
+        ])
+
+
+def teardown_module(module=None):
+    """Remove the rows again: later modules seed with autoincrement ids that start after the highest one"""
+    with engine.begin() as conn:
+        conn.execute(delete(OutboxMessage).where(OutboxMessage.worker_id.in_(WORKERS)))
+        conn.execute(delete(Worker).where(Worker.id.in_(WORKERS)))
+        conn.execute(delete(User).where(User.id.in_(WORKERS)))
+
+
+def token(worker_id):
+    return f"presence-{worker_id}"
+
+
+def enqueue(notifications, created_at=None):
+    """Queue an FCM row per (worker_id, notification_id), as fan-out does for a new job"""
+    created_at = created_at or datetime.utcnow()
+    db = SessionLocal()
+    try:
+        enqueue_outbox(db, "fcm", [
+            (worker_id, dict(PAYLOAD, token=token(worker_id), notification_id=notification_id,
+                             created_at=created_at.isoformat()))
+            for worker_id, notification_id in notifications
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def pending_rows():
+    db = SessionLocal()
+    try:
+        return db.query(OutboxMessage).filter(OutboxMessage.worker_id.in_(WORKERS)).all()
+    finally:
+        db.close()
+
+
+def make_due():
+    db = SessionLocal()
+    try:
+        db.execute(update(OutboxMessage).where(OutboxMessage.worker_id.in_(WORKERS))
+                   .values(available_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def pushed_since(start):
+    return [message.token for message in fcm_dispatcher.transport.sent[start:] if message.token.startswith("presence-")]
+
+
+def test_acked_rows_are_not_pushed():
+    presence = PresenceRegistry()
+    presence.connected(ACKED)
+    presence.connected(PRESENT)
+    presence.ack(ACKED, 101)
+    presence.flush()
+    enqueue([(ACKED, 101), (PRESENT, 102), (ABSENT, 103)])
+    relay = OutboxRelay(workers=0)
+    start = len(fcm_dispatcher.transport.sent)
+
+    assert relay.run_once()
+    # Acked: dropped without a push. Present but not acked yet: waits for the ack. Absent: pushed
+    assert pushed_since(start) == [token(ABSENT)]
+    [row] = pending_rows()
+    assert (row.worker_id, row.attempts) == (PRESENT, 0)
+    counts = relay.stats()["channels"]["fcm"]
+    assert (counts["suppressed"], counts["deferred"], counts["delivered"]) == (1, 1, 2)
+
+    # The socket acks before the deadline, so the held push never goes out
+    presence.ack(PRESENT, 102)
+    presence.flush()
+    make_due()
+    relay.run_once()
+    assert pushed_since(start) == [token(ABSENT)]
+    assert pending_rows() == []
+
+
+def test_unacked_push_goes_out_after_the_deadline():
+    presence = PresenceRegistry()
+    presence.connected(PRESENT)
+    presence.flush()
+    created_at = datetime.utcnow() - timedelta(seconds=PRESENCE_ACK_DEADLINE_SECONDS + 1)
+    enqueue([(PRESENT, 104)], created_at)
+    start = len(fcm_dispatcher.transport.sent)
+
+    OutboxRelay(workers=0).run_once()
+    assert pushed_since(start) == [token(PRESENT)]
+    assert pending_rows() == []
+
+
+if __name__ == "__main__":
+    setup_module()
+    try:
+        test_acked_rows_are_not_pushed()
+        test_unacked_push_goes_out_after_the_deadline()
+    finally:
+        teardown_module()
+    print("presence ok")
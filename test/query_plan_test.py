@@ -0,0 +1,265 @@
+"""
+Query-plan regression test: the hot read routes must not fall back to full table scans.
+
+Builds a scratch database from the models, which declare the same indexes as the migrations,
+and seeds a few rows. It then calls every route in CALLS through the app while a
+before_cursor_execute listener records each SELECT the route issues, and EXPLAINs every recorded
+statement. A call fails when one of its statements scans a whole HOT_TABLES table (or a whole
+index of one). The exception is an unfiltered list page (ordered=True): its scan follows the
+ORDER BY and stops at the LIMIT. Such a page still fails if it needs a sort pass, which means the
+sort column has no index. List pages are fetched twice, the second time with next_cursor, so the
+keyset conditions are checked too.
+
+Each sort in WALKS is then paged to the end through next_cursor, two rows at a time, across
+runs of tied sort values and NULLs. The walk must return the same rows in the same order as one
+big page. A cursor whose value does not round-trip through the database fails here: the next
+page repeats the tied rows instead of moving on. An example is a single-precision FLOAT on MySQL.
+
+    python test/query_plan_test.py              # prints every plan, exits 1 on a regression
+    python -m pytest test/query_plan_test.py
+
+It uses a temporary SQLite file by default. To check MySQL's plans and cursors, set
+WORKBEE_QUERY_PLAN_DATABASE_URL to an empty scratch MySQL database; the test creates its tables there.
+"""
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DB_PATH = os.path.join(tempfile.gettempdir(), "workbee_query_plan_test.db")
+
+os.environ["WORKBEE_DATABASE_URL"] = os.environ.get("WORKBEE_QUERY_PLAN_DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ["WORKBEE_DATABASE_REPLICA_URLS"] = ""
+os.environ["WORKBEE_DB_MODE"] = "sync"  # plans do not depend on the driver; one engine to listen on
+os.environ.setdefault("WORKBEE_FCM_TRANSPORT", "fake")
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", os.path.join(ROOT, "firebase-service-account.json"))
+sys.path.insert(0, ROOT)
+if os.environ["WORKBEE_DATABASE_URL"] == f"sqlite:///{DB_PATH}" and os.path.exists(DB_PATH):
+    os.remove(DB_PATH)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+
+import main
+from core.database import Base, SessionLocal, engine
+from core.pagination import LIST_LIMIT_MAX
+from models.business_owner import BusinessOwner
+from models.job import Job
+from models.job_application import JobApplication
+from models.notification import Notification
+from models.user import User
+from models.worker import Worker
+
+HOT_TABLES = {"jobs", "job_applications", "notifications", "workers", "business_owners", "users"}
+ORIGIN = (19.0760, 72.8777)  # Mumbai
+POSTED = datetime(2026, 1, 1)
+
+# (path, query params, ordered): ordered marks an unfiltered page that may walk a table in ORDER BY order
+CALLS = [
+    ("/jobs/1", {}, False),
+    ("/jobs/", {}, True),
+    *[("/jobs/", {"sort": sort}, True) for sort in ("id", "posted_date", "-posted_date", "start_date", "-start_date")],
+    ("/jobs/", {"status": "open"}, False),
+    ("/jobs/", {"city": "Pune"}, False),
+    ("/jobs/", {"min_hourly_rate": 10, "max_hourly_rate": 20}, False),
+    ("/jobs/", {"posted_after": (POSTED + timedelta(hours=10)).isoformat(), "sort": "-posted_date"}, False),
+    ("/jobs/business/1", {}, False),
+    ("/jobs/business/1", {"status": "open"}, False),
+    ("/jobs/nearby", {"lat": ORIGIN[0], "lng": ORIGIN[1], "radius_km": 5}, False),
+    ("/notifications/1", {}, False),
+    ("/applications/", {}, True),
+    ("/applications/", {"sort": "applied_date"}, True),
+    ("/applications/", {"sort": "-applied_date"}, True),
+    ("/applications/", {"status": "pending"}, False),
+    ("/applications/job/1", {}, False),
+    ("/applications/worker/1", {}, False),
+    ("/applications/1", {}, False),
+    ("/workers/1", {}, False),
+    ("/workers/", {}, True),
+    *[("/workers/", {"sort": sort}, True) for sort in ("name", "-name", "years_of_experience", "-years_of_experience")],
+    ("/workers/", {"city": "Pune"}, False),
+    ("/workers/", {"state": "Maharashtra"}, False),
+    ("/workers/", {"min_years_of_experience": 3, "sort": "years_of_experience"}, False),
+    ("/business-owners/1", {}, False),
+    ("/business-owners/", {}, True),
+    *[("/business-owners/", {"sort": sort}, True)
+      for sort in ("business_name", "-business_name", "year_established", "-year_established")],
+    ("/business-owners/", {"city": "Pune"}, False),
+    ("/business-owners/", {"state": "Maharashtra"}, False),
+    ("/business-owners/", {"industry": "Retail"}, False),
+    ("/users/1", {}, False),
+    ("/users/", {}, True),
+    *[("/users/", {"sort": sort}, True) for sort in ("username", "-username")],
+    ("/users/", {"role": "poster"}, False),
+]
+
+# (path, query params) of sorts to page through to the end; the seed gives them tied values and NULLs
+WALKS = [
+    *[("/jobs/", {"sort": sort}) for sort in ("posted_date", "-posted_date", "start_date", "-start_date")],
+    ("/jobs/", {"status": "open", "sort": "-posted_date"}),
+    *[("/applications/", {"sort": sort}) for sort in ("applied_date", "-applied_date")],
+    *[("/workers/", {"sort": sort}) for sort in ("name", "-name", "years_of_experience", "-years_of_experience")],
+    ("/workers/", {"city": "Pune", "sort": "-years_of_experience"}),
+    *[("/business-owners/", {"sort": sort})
+      for sort in ("business_name", "-business_name", "year_established", "-year_established")],
+    *[("/users/", {"sort": sort}) for sort in ("username", "-username")],
+    ("/users/", {"role": "seeker", "sort": "-username"}),
+]
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # Users 1-7 are workers and 8-14 business owners; profiles repeat names, years and places
+        conn.execute(insert(User), [
+            {"id": i, "username": f"plan{i}", "email": f"plan{i}@example.com", "password_hash": "x",
+             "role": ("seeker", "poster")[i > 7]}
+            for i in range(1, 15)
+        ])
+        conn.execute(insert(BusinessOwner), [
+            {"id": i, "user_id": 7 + i, "business_name": ("Plan", "Acme")[i % 2],
+             "year_established": (None, 2001, 2010)[i % 3], "city": ("Mumbai", "Pune")[i % 2],
+             "state": "Maharashtra", "industry": ("Retail", "Hospitality")[i % 2]}
+            for i in range(1, 8)
+        ])
+        conn.execute(insert(Worker).values(id=1, user_id=1, name="Plan", latitude=ORIGIN[0], longitude=ORIGIN[1]))
+        conn.execute(insert(Worker), [
+            {"id": i, "user_id": i, "name": ("Plan", "Asha")[i % 2], "years_of_experience": (None, 2, 5)[i % 3],
+             "city": ("Mumbai", "Pune")[i % 2], "state": "Maharashtra"}
+            for i in range(2, 8)
+        ])
+    # Through the ORM, so the mapper hooks fill the H3 cells
+    db = SessionLocal()
+    try:
+        for i in range(30):
+            db.add(Job(business_owner_id=1, title=f"Plan job {i}", status=("open", "closed")[i % 2],
+                       city=("Mumbai", "Pune")[i % 3 == 0], hourly_rate=(None, 10.0, 15.0, 25.0)[i % 4],
+                       posted_date=POSTED + timedelta(hours=i // 3), start_date=(None, POSTED)[i % 2],
+                       latitude=ORIGIN[0] + i * 0.001, longitude=ORIGIN[1]))
+        db.flush()
+        db.add_all(JobApplication(job_id=job_id, worker_id=1, status=("pending", "accepted")[job_id % 2])
+                   for job_id in range(1, 11))
+        db.add_all(Notification(worker_id=1, job_id=job_id, type_code=1, is_read=False) for job_id in range(1, 21))
+        db.commit()
+    finally:
+        db.close()
+
+
+captured = []
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith("SELECT"):
+        captured.append((statement, parameters))
+
+
+def explain(conn, statement, parameters):
+    """Plan lines plus (scanned tables, sorted tables) for one statement"""
+    if conn.dialect.name == "sqlite":
+        lines = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+        scans = {match.group(1) for line in lines if (match := re.match(r"SCAN (?:TABLE )?(\w+)", line))}
+        sorts = set()
+        if any(line.startswith("USE TEMP B-TREE FOR") and "ORDER BY" in line for line in lines):
+            sorts = {match.group(1) for line in lines if (match := re.match(r"(?:SCAN|SEARCH) (?:TABLE )?(\w+)", line))}
+        return lines, scans, sorts
+    rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).mappings().all()
+    lines = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {row['Extra'] or ''}" for row in rows]
+    scans = {row["table"] for row in rows if row["type"] in ("ALL", "index")}
+    sorts = {row["table"] for row in rows if "Using filesort" in (row["Extra"] or "")}
+    return lines, scans, sorts
+
+
+def check_call(client, conn, path, params, ordered, verbose):
+    """Failures for one route call and, for list pages, the page after it"""
+    failures = []
+    params = dict(params, limit=2)  # routes without paging ignore it
+    captured.clear()
+    response = client.get(path, params=params)
+    assert response.status_code == 200, (path, response.status_code, response.text)
+    body = response.json()
+    if isinstance(body, dict) and body.get("next_cursor"):
+        response = client.get(path, params=dict(params, cursor=body["next_cursor"]))
+        assert response.status_code == 200, (path, response.status_code, response.text)
+    label = f"GET {path} {params}"
+    for statement, parameters in list(captured):
+        lines, scans, sorts = explain(conn, statement, parameters)
+        bad = [f"full scan of {table}" for table in sorted(scans & HOT_TABLES) if not ordered]
+        bad += [f"sort pass over {table}" for table in sorted(sorts & HOT_TABLES) if ordered]
+        if verbose or bad:
+            print(f"{'FAIL' if bad else 'ok  '} {label}\n     {' '.join(statement.split())[:160]}")
+            for line in lines:
+                print(f"       {line}")
+        failures += [f"{label}: {problem}" for problem in bad]
+    return failures
+
+
+def check_walk(client, path, params, verbose):
+    """Failures for paging through a sort with next_cursor, compared to the same sort in one page"""
+    response = client.get(path, params=dict(params, limit=LIST_LIMIT_MAX))
+    assert response.status_code == 200, (path, response.status_code, response.text)
+    expected = [item["id"] for item in response.json()["items"]]
+    walked, cursor = [], None
+    for _ in range(len(expected) + 1):
+        response = client.get(path, params=dict(params, limit=2, **({"cursor": cursor} if cursor else {})))
+        assert response.status_code == 200, (path, response.status_code, response.text)
+        body = response.json()
+        walked += [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    label = f"GET {path} {params}"
+    if verbose:
+        print(f"{'ok  ' if walked == expected else 'FAIL'} walk {label}: {len(walked)} of {len(expected)} rows")
+    if walked == expected:
+        return []
+    if cursor is not None:
+        return [f"{label}: next_cursor did not reach the end in {len(expected) + 1} pages"]
+    return [f"{label}: cursor walk returned {walked}, one page returned {expected}"]
+
+
+def run(verbose=False):
+    seed()
+    client = TestClient(main.app)
+    failures = []
+    with engine.connect() as conn:
+        for path, params, ordered in CALLS:
+            failures += check_call(client, conn, path, params, ordered, verbose)
+    for path, params in WALKS:
+        failures += check_walk(client, path, params, verbose)
+    return failures
+
+
+def unindexed_sorts():
+    """Whitelisted sort columns that lead no index; CALLS only catches the sorts it lists"""
+    from api.application_routes import APPLICATION_SORTS
+    from api.business_owner_routes import BUSINESS_OWNER_SORTS
+    from api.job_routes import JOB_SORTS
+    from api.user_routes import USER_SORTS
+    from api.worker_routes import WORKER_SORTS
+    missing = []
+    for sorts in (APPLICATION_SORTS, BUSINESS_OWNER_SORTS, JOB_SORTS, USER_SORTS, WORKER_SORTS):
+        for name, column in sorts.items():
+            leading = {next(iter(index.columns)).name for index in column.table.indexes}
+            if not column.primary_key and column.name not in leading:
+                missing.append(f"{column.table.name}.{column.name} (sort {name})")
+    return missing
+
+
+def test_sorts_are_indexed():
+    assert not unindexed_sorts(), unindexed_sorts()
+
+
+def test_hot_queries_use_indexes():
+    failures = run()
+    assert not failures, "\n".join(failures)
+
+
+if __name__ == "__main__":
+    failures = run(verbose=True) + [f"unindexed sort: {column}" for column in unindexed_sorts()]
+    print(f"\n{len(failures)} query plan and cursor walk regressions")
+    for failure in failures:
+        print(f"  {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,118 @@
+"""
+WebSocket hub test: a slow client loses its oldest frames or is disconnected without holding up
+anyone else, and quiet heartbeat sockets are evicted.
+
+Drives ConnectionHub on its own event loop with in-memory sockets; one of them stalls in send
+until the test lets it go.
+
+    python test/ws_hub_test.py
+    python -m pytest test/ws_hub_test.py
+"""
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.backplane import InProcessBackplane
+from core.ws_hub import CLOSE_SLOW_CONSUMER, ConnectionHub, PING_FRAME
+
+QUEUE_SIZE = 5
+FRAMES = [json.dumps({"n": n}) for n in range(20)]
+
+
+class MemorySocket:
+    """The parts of starlette's WebSocket the hub uses; a stalled socket blocks in send until released"""
+
+    def __init__(self, stalled=False):
+        self.sent = []
+        self.close_code = None
+        self.released = asyncio.Event()
+        if not stalled:
+            self.released.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.released.wait()
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+async def send_all(hub, worker_id, fast):
+    """Send FRAMES, each once the fast socket has written the one before"""
+    for count, frame in enumerate(FRAMES, 1):
+        hub.send_to_worker(worker_id, frame)
+        for _ in range(100):
+            if len(fast.sent) == count:
+                break
+            await asyncio.sleep(0)
+    await asyncio.sleep(0.05)
+
+
+def test_slow_consumer_drops_oldest_frames():
+    async def scenario():
+        hub = ConnectionHub(queue_size=QUEUE_SIZE, slow_consumer_policy="drop", backplane=InProcessBackplane())
+        fast, slow = MemorySocket(), MemorySocket(stalled=True)
+        await hub.connect(fast, 1)
+        slow_connection = await hub.connect(slow, 1)
+        await send_all(hub, 1, fast)
+        assert fast.sent == FRAMES  # never waited on the stalled socket
+        assert slow.sent == []
+
+        slow.released.set()
+        await asyncio.sleep(0.05)
+        # The frame stuck in send, then the newest QUEUE_SIZE; everything between was dropped
+        assert slow.sent == FRAMES[:1] + FRAMES[-QUEUE_SIZE:]
+        dropped = len(FRAMES) - 1 - QUEUE_SIZE
+        assert slow_connection.dropped == hub.frames_dropped == dropped
+        assert hub.connection_count(1) == 2
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_is_disconnected():
+    async def scenario():
+        hub = ConnectionHub(queue_size=QUEUE_SIZE, slow_consumer_policy="disconnect", backplane=InProcessBackplane())
+        fast, slow = MemorySocket(), MemorySocket(stalled=True)
+        await hub.connect(fast, 1)
+        await hub.connect(slow, 1)
+        await send_all(hub, 1, fast)
+        assert fast.sent == FRAMES
+        assert slow.close_code == CLOSE_SLOW_CONSUMER
+        assert hub.slow_disconnects == 1
+        assert hub.connection_count(1) == 1
+
+    asyncio.run(scenario())
+
+
+def test_heartbeat_evicts_quiet_sockets_only():
+    async def scenario():
+        hub = ConnectionHub(heartbeat_seconds=0.01, idle_timeout_seconds=0.1, backplane=InProcessBackplane())
+        quiet, plain = MemorySocket(), MemorySocket()
+        await hub.connect(quiet, 1, heartbeat=True)
+        await hub.connect(plain, 2)
+        heartbeat = asyncio.create_task(hub.run_heartbeat())
+        try:
+            await asyncio.sleep(0.3)
+        finally:
+            heartbeat.cancel()
+        assert PING_FRAME.text in quiet.sent
+        assert quiet.close_code == 1001
+        assert hub.idle_evictions == 1
+        # A socket that did not opt in sees no pings and is never evicted for being quiet
+        assert plain.sent == [] and plain.close_code is None
+        assert hub.connected_workers() == [2]
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_slow_consumer_drops_oldest_frames()
+    test_slow_consumer_is_disconnected()
+    test_heartbeat_evicts_quiet_sockets_only()
+    print("ws hub ok")